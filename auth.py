@@ -5,27 +5,38 @@
 
 import os
 import uuid
+from datetime import datetime
 from flask import Blueprint, request, redirect, url_for, session, flash, jsonify
 from flask_login import login_user, logout_user, login_required, current_user
-from authlib.integrations.flask_client import OAuth
-from models import db, User
+from models import db, User, UserIdentity
+from config.logging_config import debug_sampled
+from engine.cache import ResultCache
+from config.oidc import CACHE_SUBDIR, GOOGLE_ISSUER, DocumentCache, create_oauth, discovery_url
 import secrets
+import threading
 
 # 創建認證藍圖
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 def init_oauth(app):
-    """初始化 OAuth 配置"""
+    """
+    初始化 OAuth 配置
+
+    Authlib 只在需要登入時載入，不計入冷啟動時間；discovery 文件與 JWKS 快取於記憶體與磁碟。
+    OIDC_ISSUER 可改為本機的 OIDC 替身（離線測試與效能量測）。
+    """
     global oauth, google
     
-    oauth = OAuth(app)
+    cache_dir = os.getenv('OIDC_CACHE_DIR') or os.path.join(app.instance_path, CACHE_SUBDIR)
+    documents = DocumentCache(cache_dir)
+    oauth = create_oauth(app, documents)
     
     # 配置 Google OAuth
     google = oauth.register(
         name='google',
         client_id=os.getenv('GOOGLE_CLIENT_ID'),
         client_secret=os.getenv('GOOGLE_CLIENT_SECRET'),
-        server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+        server_metadata_url=discovery_url(os.getenv('OIDC_ISSUER', GOOGLE_ISSUER)),
         client_kwargs={
             'scope': 'openid email profile'
         }
@@ -33,13 +44,30 @@ def init_oauth(app):
     
     return oauth, google
 
-# 全域變數，將在 main.py 中初始化
+# 識別快取：user_id → 序列化的 UserIdentity，load_user 命中時不查詢資料庫
+# 每個行程各自一份；本行程的資料變更會立即更新快取，其他 worker 最多延遲 IDENTITY_CACHE_TTL 秒
+IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 300))
+identity_cache = ResultCache(max_entries=10000, max_bytes=8 * 1024 * 1024, ttl=IDENTITY_CACHE_TTL)
+
+# 全域變數，第一次使用時由 get_google() 初始化
 oauth = None
 google = None
+_oauth_lock = threading.Lock()
+
+def get_google():
+    """Google OAuth client（第一次登入或回調時才初始化）"""
+    from flask import current_app
+    
+    if google is None:
+        with _oauth_lock:
+            if google is None:
+                init_oauth(current_app._get_current_object())
+    return google
 
 @auth_bp.route('/login')
 def login():
     """開始 Google OAuth 登入流程"""
+    google = get_google()
     if not google:
         return jsonify({'error': '認證服務未正確配置'}), 500
     
@@ -64,9 +92,9 @@ def callback():
     """處理 Google OAuth 回調"""
     from flask import current_app
     
-    current_app.logger.info("OAuth 回調函數開始執行")
-    current_app.logger.info(f"接收到的參數: {dict(request.args)}")
+    current_app.logger.debug("OAuth 回調 - 參數: %s", sorted(request.args.keys()))
     
+    google = get_google()
     if not google:
         current_app.logger.error("Google OAuth 未正確配置")
         return jsonify({'error': '認證服務未正確配置'}), 500
@@ -74,92 +102,104 @@ def callback():
     # 檢查是否有錯誤參數
     error = request.args.get('error')
     if error:
-        current_app.logger.error(f"OAuth 錯誤: {error}")
+        current_app.logger.error("OAuth 錯誤: %s", error)
         error_description = request.args.get('error_description', '')
         flash(f'登入失敗：{error_description or error}', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     # 檢查是否有授權碼
     code = request.args.get('code')
     if not code:
         current_app.logger.error("缺少授權碼")
         flash('登入失敗：缺少授權碼', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     # 驗證 state 參數
     received_state = request.args.get('state')
     session_state = session.get('oauth_state')
-    current_app.logger.info(f"State 驗證 - 接收: {received_state}, 會話: {session_state}")
+    current_app.logger.debug("State 驗證 - 一致: %s", received_state == session_state)
     
     if received_state != session_state:
         current_app.logger.error("State 參數驗證失敗")
         flash('認證失敗：安全驗證錯誤', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     try:
-        current_app.logger.info("開始獲取 access token")
-        # 獲取 access token
+        # 獲取 access token（ID token 以快取的 JWKS 驗證）
         token = google.authorize_access_token()
-        current_app.logger.info(f"Token 獲取成功: {bool(token)}")
-        
-        # 獲取用戶資訊
         user_info = token.get('userinfo')
-        current_app.logger.info(f"用戶資訊: {user_info}")
+        current_app.logger.debug("用戶資訊欄位: %s", sorted(user_info.keys()) if user_info else None)
         
         if not user_info:
             current_app.logger.error("無法獲取用戶資訊")
             flash('認證失敗：無法獲取用戶資訊', 'error')
-            return redirect(url_for('index'))
-        
-        # 檢查用戶是否已存在
-        google_id = user_info['sub']
-        user = User.query.filter_by(google_id=google_id).first()
-        current_app.logger.info(f"檢查現有用戶 (Google ID: {google_id}): {bool(user)}")
+            return redirect(url_for('main.index'))
         
-        if not user:
-            # 創建新用戶
-            current_app.logger.info("創建新用戶")
-            user = User(
-                id=str(uuid.uuid4()),
-                google_id=user_info['sub'],
-                email=user_info['email'],
-                name=user_info['name'],
-                avatar_url=user_info.get('picture', '')
-            )
-            db.session.add(user)
-            db.session.commit()
-            current_app.logger.info(f"新用戶創建成功: {user.email}")
+        # 建立或更新用戶（單一 upsert）並登入
+        user, created = upsert_google_user(user_info)
+        cache_identity(user)
+        if created:
             flash(f'歡迎加入！{user.name}', 'success')
         else:
-            # 更新現有用戶資訊
-            current_app.logger.info("更新現有用戶資訊")
-            user.name = user_info['name']
-            user.avatar_url = user_info.get('picture', '')
-            db.session.commit()
-            current_app.logger.info(f"用戶資訊更新成功: {user.email}")
             flash(f'歡迎回來！{user.name}', 'success')
-        
-        # 登入用戶
-        current_app.logger.info("執行用戶登入")
-        # Flask-Login 會自動處理認證狀態，不需要手動設置
-        login_result = login_user(user, remember=True, duration=None, force=False, fresh=True)
-        current_app.logger.info(f"登入結果: {login_result}")
-        current_app.logger.info(f"會話中的用戶: {session.get('_user_id', 'None')}")
+        login_user(user, remember=True, duration=None, force=False, fresh=True)
+        current_app.logger.info("用戶登入成功 - 用戶ID: %s, 新用戶: %s", user.id, created)
         
         # 清除 OAuth state
         session.pop('oauth_state', None)
         
         # 重定向到原本要訪問的頁面或首頁，並添加登入成功參數
         next_page = request.args.get('next')
-        redirect_url = next_page if next_page else url_for('index', login='success')
-        current_app.logger.info(f"準備重定向到: {redirect_url}")
-        
+        redirect_url = next_page if next_page else url_for('main.index', login='success')
         return redirect(redirect_url)
         
     except Exception as e:
-        current_app.logger.error(f"OAuth 回調處理發生錯誤: {str(e)}", exc_info=True)
+        db.session.rollback()
+        current_app.logger.error("OAuth 回調處理發生錯誤: %s", e, exc_info=True)
         flash(f'登入失敗：{str(e)}', 'error')
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
+
+def upsert_google_user(user_info):
+    """
+    依 Google ID 建立或更新用戶（名稱與頭像），SQLite / PostgreSQL 以單一 INSERT ... ON CONFLICT 完成
+
+    Returns:
+        tuple: (User, 是否為新用戶)
+    """
+    new_id = str(uuid.uuid4())
+    values = {
+        'id': new_id,
+        'google_id': user_info['sub'],
+        'email': user_info['email'],
+        'name': user_info['name'],
+        'avatar_url': user_info.get('picture', ''),
+    }
+    dialect = db.engine.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        now = datetime.utcnow()
+        statement = insert(User).values(**values, created_at=now, updated_at=now)
+        statement = statement.on_conflict_do_update(
+            index_elements=[User.google_id],
+            set_={'name': values['name'], 'avatar_url': values['avatar_url'], 'updated_at': now},
+        ).returning(User)
+        user = db.session.scalars(statement, execution_options={'populate_existing': True}).one()
+        db.session.commit()
+        return user, user.id == new_id
+    
+    # 其他資料庫：查詢後新增或更新
+    user = User.query.filter_by(google_id=values['google_id']).first()
+    if user is None:
+        user = User(**values)
+        db.session.add(user)
+    else:
+        user.name = values['name']
+        user.avatar_url = values['avatar_url']
+    db.session.commit()
+    return user, user.id == new_id
 
 @auth_bp.route('/logout')
 @login_required
@@ -168,7 +208,7 @@ def logout():
     user_name = current_user.name
     logout_user()
     flash(f'再見！{user_name}', 'info')
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
 @auth_bp.route('/profile')
 @login_required
@@ -185,9 +225,12 @@ def update_profile():
         
         # 更新用戶偏好設定
         if 'preferences' in data:
-            current_user.set_preferences(data['preferences'])
+            # current_user 為快取的 UserIdentity，修改時查詢資料庫中的 User
+            user = db.session.get(User, current_user.id)
+            user.set_preferences(data['preferences'])
             db.session.commit()
-            return jsonify({'message': '偏好設定已更新', 'user': current_user.to_dict()})
+            cache_identity(user)
+            return jsonify({'message': '偏好設定已更新', 'user': user.to_dict()})
         
         return jsonify({'error': '無效的請求資料'}), 400
         
@@ -199,35 +242,44 @@ def status():
     """檢查用戶登入狀態"""
     from flask import current_app, session
     
-    current_app.logger.info(f"檢查認證狀態 - current_user: {current_user}")
-    current_app.logger.info(f"current_user.is_authenticated: {current_user.is_authenticated}")
-    current_app.logger.info(f"會話資料: {dict(session)}")
+    # 不記錄會話內容（含 OAuth state 與登入資訊）；只在 DEBUG 取樣時記錄鍵名
+    if debug_sampled(current_app.logger):
+        current_app.logger.debug("檢查認證狀態 - 已認證: %s, 會話鍵: %s",
+                                 current_user.is_authenticated, sorted(session.keys()))
     
     if current_user.is_authenticated:
-        current_app.logger.info(f"用戶已認證: {current_user.email}")
         return jsonify({
             'authenticated': True,
             'user': current_user.to_dict()
         })
     else:
-        current_app.logger.info("用戶未認證")
         return jsonify({
             'authenticated': False,
             'user': None
         })
 
+def cache_identity(user):
+    """以最新的用戶資料更新識別快取（登入與修改資料後呼叫，取代舊的快取內容）"""
+    identity = UserIdentity.from_user(user)
+    identity_cache.set(str(user.id), identity.to_cache())
+    return identity
+
 # 用戶載入回調函數
 def load_user(user_id):
-    """Flask-Login 用戶載入回調"""
+    """Flask-Login 用戶載入回調（先查識別快取，未命中時才查詢資料庫）"""
     from flask import current_app
-    current_app.logger.info(f"load_user 被調用，用戶ID: {user_id}")
-    
+    cached = identity_cache.get(user_id)
+    if cached is not None:
+        return UserIdentity.from_cache(cached)
     try:
-        user = User.query.get(user_id)
-        current_app.logger.info(f"load_user 結果: {user.email if user else None}")
-        return user
+        user = db.session.get(User, user_id)
+        if debug_sampled(current_app.logger):
+            current_app.logger.debug("load_user - 用戶ID: %s, 找到: %s", user_id, user is not None)
+        if user is None:
+            return None
+        return cache_identity(user)
     except Exception as e:
-        current_app.logger.error(f"load_user 錯誤: {str(e)}")
+        current_app.logger.error("load_user 錯誤: %s", e)
         return None
 
 # 未授權訪問處理
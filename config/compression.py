@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回應壓縮
+依 Accept-Encoding 協商 brotli / gzip，壓縮超過門檻的動態回應（HTML、JSON、JS、CSS…）
+
+有強 ETag 的回應（例如 /calculate 的快取結果）以 (ETag, 編碼) 快取壓縮後的內容，
+同一份結果只壓縮一次。靜態資源則使用建置時產生的 .br / .gz（見 config.static_assets）；
+內容固定的頁面（例如 SPA 外殼）以 PrecompressedPage 預先壓縮。
+"""
+
+import gzip
+import hashlib
+import os
+
+from flask import current_app, request
+
+from engine.cache import ResultCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 依部署環境而定
+    brotli = None
+
+# 小於此大小（bytes）的回應不壓縮：壓縮節省的傳輸量不及額外的 CPU 與標頭成本
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+# 可壓縮的內容類型（前綴比對）
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml',
+)
+
+# 支援的編碼，依偏好排序
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# 動態回應以速度優先的壓縮等級；靜態資源於建置時使用最高等級
+DYNAMIC_GZIP_LEVEL = 6
+DYNAMIC_BROTLI_QUALITY = 5
+
+# 已壓縮內容的快取（鍵為 ETag 與編碼）
+compressed_cache = ResultCache(max_entries=2000, max_bytes=16 * 1024 * 1024, ttl=3600)
+
+
+def is_compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate_encoding(accept_encodings, available=ENCODINGS):
+    """
+    從 Accept-Encoding 選出編碼
+
+    Args:
+        accept_encodings: werkzeug 的 request.accept_encodings
+        available: 可提供的編碼（依偏好排序）
+
+    Returns:
+        str | None: 'br'、'gzip'，或不壓縮時為 None
+    """
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, gzip_level=DYNAMIC_GZIP_LEVEL, brotli_quality=DYNAMIC_BROTLI_QUALITY):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    # mtime=0：相同內容得到相同的壓縮結果
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+class PrecompressedPage:
+    """
+    內容固定的回應：預先以最高等級壓縮各編碼版本，強 ETag 由內容計算
+
+    每個請求只需內容協商與條件式請求判斷（If-None-Match → 304），不再渲染或壓縮。
+    """
+
+    def __init__(self, body: bytes, mimetype='text/html'):
+        self.mimetype = mimetype
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {None: body}
+        for encoding in ENCODINGS:
+            compressed = compress(body, encoding, gzip_level=9, brotli_quality=11)
+            if len(compressed) < len(body):
+                self.variants[encoding] = compressed
+        self.encodings = tuple(encoding for encoding in ENCODINGS if encoding in self.variants)
+
+    def response(self, max_age=None):
+        encoding = negotiate_encoding(request.accept_encodings, self.encodings)
+        response = current_app.response_class(self.variants[encoding], mimetype=self.mimetype)
+        if encoding is None:
+            response.set_etag(self.etag)
+        else:
+            response.headers['Content-Encoding'] = encoding
+            response.set_etag(f'{self.etag}-{encoding}')
+        response.vary.add('Accept-Encoding')
+        if max_age is not None:
+            response.cache_control.max_age = max_age
+        return response.make_conditional(request)
+
+
+def setup_compression(app):
+    """壓縮動態回應並加上 Vary: Accept-Encoding"""
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or not is_compressible(response.mimetype)):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        if response.content_length is not None and response.content_length < COMPRESSION_MIN_SIZE:
+            return response
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        cache_key = f'{etag}:{encoding}' if etag and not weak else None
+        body = compressed_cache.get(cache_key) if cache_key else None
+        if body is None:
+            data = response.get_data()
+            if len(data) < COMPRESSION_MIN_SIZE:
+                return response
+            body = compress(data, encoding)
+            if cache_key:
+                compressed_cache.set(cache_key, body)
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # 不同編碼是不同的表示法，ETag 也必須不同
+            response.set_etag(f'{etag}-{encoding}', weak=weak)
+        return response
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料庫引擎設定
+依 DATABASE_URL 的資料庫種類套用引擎設定檔（DB_ENGINE_PROFILE）：
+
+- tuned（預設）
+  - SQLite：WAL 模式（讀取不阻擋寫入）、synchronous=NORMAL、mmap 與頁面快取、忙碌等待逾時，
+    gunicorn 多執行緒同時寫入時等待鎖而不是立即回報 database is locked
+  - PostgreSQL 等伺服器資料庫：連線池大小、溢出、回收與 pre-ping（取出連線前確認仍可用）
+- default：SQLAlchemy 預設值（比較效能或排除問題時使用）
+
+各設定檔的吞吐量可用 scripts/benchmarks/bench_database.py 量測。
+"""
+
+import logging
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ('tuned', 'default')
+DEFAULT_PROFILE = 'tuned'
+DEFAULT_DATABASE_URL = 'sqlite:///app.db'
+
+# SQLite
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+SQLITE_BUSY_TIMEOUT = float(os.environ.get('SQLITE_BUSY_TIMEOUT', 5))
+
+# 伺服器資料庫連線池（每個 worker 一個池；預設大小對應 gunicorn 的 --threads 8）
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 4))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+
+
+def get_profile(profile=None):
+    profile = (profile or os.environ.get('DB_ENGINE_PROFILE') or DEFAULT_PROFILE).lower()
+    if profile not in PROFILES:
+        raise ValueError(f"未知的 DB_ENGINE_PROFILE: {profile}（可用: {', '.join(PROFILES)}）")
+    return profile
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+def engine_options(url, profile=None):
+    """SQLALCHEMY_ENGINE_OPTIONS"""
+    if get_profile(profile) == 'default':
+        return {}
+    if is_sqlite(url):
+        # pysqlite 的 timeout 即 busy_timeout：等待其他連線釋放寫入鎖的秒數
+        return {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT}}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_pre_ping': True,
+    }
+
+
+def sqlite_pragmas(url, profile=None):
+    """每個新連線執行的 PRAGMA（非 SQLite 或 default 設定檔時為空）"""
+    if get_profile(profile) == 'default' or not is_sqlite(url):
+        return []
+    pragmas = [
+        ('synchronous', SQLITE_SYNCHRONOUS),
+        ('cache_size', -SQLITE_CACHE_SIZE_KB),  # 負值的單位為 KiB
+        ('mmap_size', SQLITE_MMAP_SIZE),
+        ('temp_store', 'MEMORY'),
+    ]
+    database = make_url(url).database
+    if database and database != ':memory:':
+        # WAL 記錄在資料庫檔案中，記憶體資料庫不適用
+        pragmas.insert(0, ('journal_mode', 'WAL'))
+    return pragmas
+
+
+def _apply_pragmas(engine, pragmas):
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+                if name == 'journal_mode' and str(cursor.fetchone()[0]).lower() != 'wal':
+                    # 例如位於網路檔案系統上，無法使用共享記憶體
+                    logger.warning("SQLite 無法切換為 WAL 模式，使用預設的 rollback journal")
+        finally:
+            cursor.close()
+
+
+def setup_database(app, db):
+    """設定資料庫連線並初始化 Flask-SQLAlchemy（資料表由 main.ensure_schema 建立）"""
+    url = os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL)
+    profile = get_profile()
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url, profile)
+    db.init_app(app)
+
+    pragmas = sqlite_pragmas(url, profile)
+    if pragmas:
+        # Flask-SQLAlchemy 在 init_app 時已建立引擎，尚未開啟任何連線
+        with app.app_context():
+            _apply_pragmas(db.engine, pragmas)
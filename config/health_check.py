@@ -4,27 +4,97 @@
 健康檢查和監控系統
 """
 
+import logging
 import os
+import threading
 import time
-import psutil
-import requests
 from datetime import datetime, timedelta
 from version import get_version_info
+from config.state_backend import SharedCounter, get_state_backend
+
+logger = logging.getLogger(__name__)
+
+# 背景取樣間隔（秒）；readiness 直接使用最近一次的快照
+HEALTH_SAMPLE_INTERVAL = float(os.environ.get('HEALTH_SAMPLE_INTERVAL', 15))
+# 快照超過幾個取樣間隔未更新即標示為過期
+STALE_AFTER_INTERVALS = 3
+# 外部依賴檢查的逾時秒數
+DEPENDENCY_TIMEOUT = 2
+
+
+class CircuitBreaker:
+    """
+    外部依賴的斷路器
+
+    連續失敗 failure_threshold 次後開啟，reset_timeout 秒內不再呼叫依賴；
+    之後放行一次試探（half-open），成功即關閉，失敗則重新計時。
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        return self.state != 'open'
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self._clock()
+
 
 class HealthChecker:
-    def __init__(self):
+    def __init__(self, backend=None, sample_interval=HEALTH_SAMPLE_INTERVAL):
         self.start_time = time.time()
-        self.request_count = 0
-        self.error_count = 0
+        self.sample_interval = sample_interval
+        # 背景取樣的快照（get_health_status 的內容）與取樣時間
+        self._snapshot = None
+        self._snapshot_at = None
+        self._sampler_pid = None
+        self._sampler_lock = threading.Lock()
+        self.breakers = {'google_analytics': CircuitBreaker()}
+        # 請求與錯誤總數存於狀態後端，多個 worker 時為全部 worker 的合計
+        backend = backend if backend is not None else get_state_backend()
+        self.requests = SharedCounter(backend, 'health:requests')
+        self.errors = SharedCounter(backend, 'health:errors')
         self.last_errors = []
+        # 其他模組（例如試算快取）提供的指標，名稱 → 返回 dict 的函式
+        self.metrics_providers = {}
+        
+    def register_metrics(self, name, provider):
+        """註冊額外的應用程式指標，顯示於 /health/detailed"""
+        self.metrics_providers[name] = provider
+        
+    @property
+    def request_count(self):
+        return self.requests.value
+
+    @property
+    def error_count(self):
+        return self.errors.value
         
     def record_request(self):
         """記錄請求"""
-        self.request_count += 1
+        self.requests.add()
     
     def record_error(self, error):
         """記錄錯誤"""
-        self.error_count += 1
+        self.errors.add()
         self.last_errors.append({
             'timestamp': datetime.utcnow().isoformat(),
             'error': str(error)
@@ -36,8 +106,11 @@ class HealthChecker:
     
     def get_system_metrics(self):
         """獲取系統指標"""
+        import psutil
+
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # 不阻塞：返回距上次呼叫（上一次取樣）期間的平均使用率
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             
@@ -55,14 +128,19 @@ class HealthChecker:
         """獲取應用程式指標"""
         uptime = time.time() - self.start_time
         
-        return {
+        request_count = self.request_count
+        error_count = self.error_count
+        metrics = {
             'uptime_seconds': uptime,
             'uptime_human': str(timedelta(seconds=int(uptime))),
-            'total_requests': self.request_count,
-            'total_errors': self.error_count,
-            'error_rate': (self.error_count / max(self.request_count, 1)) * 100,
+            'total_requests': request_count,
+            'total_errors': error_count,
+            'error_rate': (error_count / max(request_count, 1)) * 100,
             'last_errors': self.last_errors[-5:]  # 最近 5 個錯誤
         }
+        for name, provider in self.metrics_providers.items():
+            metrics[name] = provider()
+        return metrics
     
     def get_environment_info(self):
         """獲取環境資訊"""
@@ -79,10 +157,19 @@ class HealthChecker:
         dependencies = {}
         
         # 檢查 Google Analytics
+        breaker = self.breakers['google_analytics']
+        if not breaker.allow():
+            dependencies['google_analytics'] = {
+                'status': 'error',
+                'error': '斷路器開啟，暫停檢查',
+                'circuit': breaker.state
+            }
+            return dependencies
         try:
+            import requests
             response = requests.get(
                 'https://www.google-analytics.com/analytics.js',
-                timeout=5
+                timeout=DEPENDENCY_TIMEOUT
             )
             dependencies['google_analytics'] = {
                 'status': 'ok' if response.status_code == 200 else 'error',
@@ -93,16 +180,81 @@ class HealthChecker:
                 'status': 'error',
                 'error': str(e)
             }
+        if dependencies['google_analytics']['status'] == 'ok':
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+        dependencies['google_analytics']['circuit'] = breaker.state
         
         return dependencies
     
+    def start_sampler(self):
+        """
+        啟動背景取樣執行緒（每個行程一次）
+
+        在第一次健康檢查時才啟動，gunicorn fork 出的每個 worker 各自取樣。
+        """
+        with self._sampler_lock:
+            if self._sampler_pid == os.getpid():
+                return
+            self._sampler_pid = os.getpid()
+            # psutil 於第一次健康檢查時才載入；cpu_percent(interval=None) 的第一次呼叫沒有比較基準，先呼叫一次
+            import psutil
+            psutil.cpu_percent(interval=None)
+            threading.Thread(target=self._sample_loop, name='health-sampler', daemon=True).start()
+    
+    def _sample_loop(self):
+        # 連續失敗時只在第一次記錄完整例外，恢復後再記錄一次
+        failures = 0
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                if failures == 0:
+                    logger.exception("健康檢查背景取樣失敗，快照將停止更新直到恢復")
+                failures += 1
+            else:
+                if failures:
+                    logger.warning("健康檢查背景取樣已恢復（連續失敗 %d 次）", failures)
+                failures = 0
+            time.sleep(self.sample_interval)
+    
+    def refresh(self, initial=False):
+        """重新取樣並更新快照"""
+        snapshot = self._collect_health_status(initial)
+        self._snapshot, self._snapshot_at = snapshot, time.time()
+        return snapshot
+    
     def get_health_status(self):
-        """獲取完整健康狀態"""
+        """
+        獲取完整健康狀態（最近一次背景取樣的快照，不阻塞）
+
+        尚無快照時先同步取樣一次（不含外部依賴與 CPU 判斷，由背景執行緒補上）；
+        snapshot_age_seconds 與 stale 標示快照的新舊。
+        """
+        self.start_sampler()
+        snapshot, sampled_at = self._snapshot, self._snapshot_at
+        if snapshot is None:
+            snapshot, sampled_at = self.refresh(initial=True), time.time()
+        age = time.time() - sampled_at
+        return {
+            **snapshot,
+            'snapshot_age_seconds': age,
+            'stale': age > self.sample_interval * STALE_AFTER_INTERVALS
+        }
+    
+    def _collect_health_status(self, initial=False):
+        """
+        獲取完整健康狀態
+
+        initial 為 True 時（第一個快照）不檢查外部依賴，
+        且 CPU 使用率尚無完整取樣期間，不列入判斷。
+        """
         try:
             system_metrics = self.get_system_metrics()
             app_metrics = self.get_application_metrics()
             env_info = self.get_environment_info()
-            dependencies = self.check_external_dependencies()
+            dependencies = {} if initial else self.check_external_dependencies()
             version_info = get_version_info()
             
             # 判斷整體健康狀態
@@ -110,7 +262,7 @@ class HealthChecker:
             issues = []
             
             # 檢查 CPU 使用率
-            if 'cpu_usage' in system_metrics and system_metrics['cpu_usage'] > 80:
+            if not initial and 'cpu_usage' in system_metrics and system_metrics['cpu_usage'] > 80:
                 is_healthy = False
                 issues.append(f"CPU 使用率過高: {system_metrics['cpu_usage']:.1f}%")
             
@@ -172,11 +324,16 @@ def setup_health_endpoints(app):
     def readiness_probe():
         """Kubernetes readiness probe"""
         health_status = health_checker.get_health_status()
+        freshness = {
+            'snapshot_age_seconds': health_status['snapshot_age_seconds'],
+            'stale': health_status['stale'],
+        }
         
         if health_status['status'] == 'healthy':
-            return {'status': 'ready'}
+            return {'status': 'ready', **freshness}
         else:
-            return {'status': 'not_ready', 'issues': health_status.get('issues', [])}, 503
+            issues = health_status.get('issues', [])
+            return {'status': 'not_ready', 'issues': issues, **freshness}, 503
 
 def setup_request_tracking(app):
     """設定請求追蹤"""
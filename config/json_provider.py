@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON 序列化
+API 回應與資料模型共用；安裝 orjson 時使用 orjson，否則退回標準函式庫 json
+
+非有限浮點數（例如無貸款時 DSCR 為 inf）一律輸出為 null：
+標準函式庫預設輸出的 Infinity / NaN 不是合法 JSON，瀏覽器的 JSON.parse 會失敗。
+"""
+
+import json
+import math
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 依部署環境而定
+    orjson = None
+
+_fallback_default = DefaultJSONProvider.default
+
+
+def _finite(obj):
+    """將巢狀結構中的 inf / nan 換成 None（僅在標準函式庫路徑遇到時使用）"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+def _stdlib_dumps(obj, sort_keys=False, indent=None):
+    separators = None if indent else (',', ':')
+    try:
+        text = json.dumps(obj, default=_fallback_default, ensure_ascii=False, sort_keys=sort_keys,
+                          indent=indent, separators=separators, allow_nan=False)
+    except ValueError:
+        text = json.dumps(_finite(obj), default=_fallback_default, ensure_ascii=False,
+                          sort_keys=sort_keys, indent=indent, separators=separators)
+    return text.encode('utf-8')
+
+
+def dumps(obj, sort_keys=False, indent=None) -> bytes:
+    """序列化為 UTF-8 JSON bytes"""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=_fallback_default, option=option)
+        except TypeError:
+            # 非字串鍵、超過 64 位元的整數等 orjson 不支援的內容
+            pass
+    return _stdlib_dumps(obj, sort_keys, indent)
+
+
+def loads(data):
+    """解析 JSON（str 或 bytes）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider：jsonify、request.get_json 與 app.json 皆使用上方的 dumps / loads"""
+
+    def _indent(self):
+        compact = self.compact if self.compact is not None else not self._app.debug
+        return None if compact else 2
+
+    def dumps(self, obj, **kwargs):
+        sort_keys = kwargs.get('sort_keys', self.sort_keys)
+        return dumps(obj, sort_keys=sort_keys, indent=kwargs.get('indent')).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = dumps(obj, sort_keys=self.sort_keys, indent=self._indent())
+        if self._indent() is not None:
+            body += b'\n'
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -4,14 +4,103 @@
 日誌和錯誤監控配置
 """
 
+import atexit
+import json
 import logging
 import os
+import queue
+import random
 import sys
-from datetime import datetime
-from logging.handlers import RotatingFileHandler
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# 非同步日誌佇列上限；滿時丟棄新的紀錄而不阻塞請求
+LOG_QUEUE_SIZE = 10000
+
+# 逐請求診斷日誌（DEBUG）的取樣比例，0 ~ 1
+DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))
+
+# 不記錄請求日誌的路徑（健康檢查與指標抓取）
+REQUEST_LOG_SKIP_PREFIXES = ('/health', '/metrics', '/static/')
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """單行 JSON 日誌，欄位名稱符合 Cloud Logging 結構化日誌（severity、message、httpRequest）"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'severity': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    將紀錄放入佇列，由 listener 執行緒格式化與寫出
+
+    標準 QueueHandler 會在呼叫端執行緒先格式化訊息；這裡直接傳遞原始紀錄，
+    請求執行緒只付出一次 put_nowait。佇列滿時丟棄並計數（見 dropped_log_records）。
+    """
+
+    # 本行程累計的丟棄筆數，重新設定日誌（建立新的 handler）後延續
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DeferredQueueHandler.dropped += 1
+
+
+def dropped_log_records():
+    """佇列已滿而丟棄的日誌筆數，以 log_records_dropped_total 指標輸出"""
+    return DeferredQueueHandler.dropped
+
+
+def debug_sampled(logger):
+    """
+    逐請求診斷日誌是否輸出：logger 已啟用 DEBUG 且通過取樣
+
+    呼叫端以 `if debug_sampled(logger): logger.debug(...)` 包住，
+    未啟用時不會計算任何日誌參數。
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    return DEBUG_SAMPLE_RATE >= 1 or random.random() < DEBUG_SAMPLE_RATE
+
+
+def _stop_listener():
+    """停止背景寫出執行緒（寫完佇列中的日誌）；重新設定日誌與行程結束時呼叫"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
 
 def setup_logging(app):
-    """設定應用程式日誌"""
+    """
+    設定應用程式日誌
+
+    LOG_FORMAT=json 時輸出單行 JSON；LOG_ASYNC=false 時停用佇列，直接在請求執行緒寫出。
+    """
+    global _listener
     
     # 設定日誌等級
     log_level = os.environ.get('LOG_LEVEL', 'INFO').upper()
@@ -19,16 +108,21 @@ def setup_logging(app):
     
     # 移除預設的 handler
     app.logger.handlers.clear()
+    _stop_listener()
     
     # 建立格式化器
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
-    )
+    if os.environ.get('LOG_FORMAT', 'text').lower() == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
+        )
+    handlers = []
     
     # 控制台輸出
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    app.logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # 只在非 Cloud Run 環境寫入檔案日誌
     if not os.environ.get('K_SERVICE'):  # Cloud Run 環境變數
@@ -42,12 +136,59 @@ def setup_logging(app):
             backupCount=5
         )
         file_handler.setFormatter(formatter)
-        app.logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    if os.environ.get('LOG_ASYNC', 'true').lower() != 'false':
+        # 寫出（含檔案輪替）移到背景執行緒，請求執行緒不等待 I/O
+        queue_handler = DeferredQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        _listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        app.logger.addHandler(queue_handler)
+    else:
+        for handler in handlers:
+            app.logger.addHandler(handler)
     
     # 設定其他日誌器
     logging.getLogger('werkzeug').setLevel(logging.WARNING)
     
-    app.logger.info(f"日誌系統已啟動 - 等級: {log_level}")
+    app.logger.info("日誌系統已啟動 - 等級: %s", log_level)
+
+def setup_request_logging(app):
+    """每個請求輸出一行日誌（JSON 模式下為 Cloud Logging 的 httpRequest 欄位），含處理時間與各階段耗時"""
+    from flask import g, request
+    
+    request_logger = app.logger.getChild('request')
+    
+    @app.before_request
+    def start_request_timer():
+        g.log_start = time.perf_counter()
+    
+    @app.after_request
+    def log_request(response):
+        start = g.get('log_start')
+        if start is None or request.path.startswith(REQUEST_LOG_SKIP_PREFIXES):
+            return response
+        if not request_logger.isEnabledFor(logging.INFO):
+            return response
+        latency = time.perf_counter() - start
+        fields = {
+            'httpRequest': {
+                'requestMethod': request.method,
+                'requestUrl': request.path,
+                'status': response.status_code,
+                'responseSize': response.calculate_content_length(),
+                'latency': f'{latency:.6f}s',
+                'remoteIp': request.remote_addr,
+                'userAgent': request.headers.get('User-Agent', ''),
+            }
+        }
+        if 'X-Cache' in response.headers:
+            fields['cache'] = response.headers['X-Cache']
+        if 'Server-Timing' in response.headers:
+            fields['serverTiming'] = response.headers['Server-Timing']
+        request_logger.info('%s %s %s %.1fms', request.method, request.path, response.status_code,
+                            latency * 1000, extra={'fields': fields})
+        return response
 
 def log_error(app, error, request=None, additional_info=None):
     """統一錯誤日誌記錄"""
@@ -66,7 +207,7 @@ def log_error(app, error, request=None, additional_info=None):
             'user_agent': request.headers.get('User-Agent', '')
         })
     
-    app.logger.error(f"錯誤詳情: {error_info}")
+    app.logger.error("錯誤詳情: %s", error_info, extra={'fields': {'error': error_info}})
     
     # 在生產環境可以整合到外部監控系統
     environment = os.environ.get('ENVIRONMENT', 'development')
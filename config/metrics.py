@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+應用程式指標
+計數器與固定分箱延遲直方圖，以 Prometheus 文字格式輸出於 /metrics
+
+每個執行緒寫入自己的分片（per-thread shard），記錄時不需取鎖；
+只有讀取（抓取 /metrics）時合併所有分片，因此可在每個請求上記錄而幾乎沒有額外成本。
+執行緒結束時其分片併入共用的基底，每個請求一個執行緒的伺服器也不會累積分片。
+指標為單一行程的值，多個 worker 時由 Prometheus 依實例分別抓取。
+"""
+
+import math
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from functools import wraps
+
+from flask import Response, g, make_response, request
+
+from config.logging_config import dropped_log_records
+from engine.timing import stage_timing
+
+# 延遲直方圖預設分箱上限（秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+# 試算階段的分箱（單一試算通常在數十微秒到數毫秒之間）
+STAGE_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                 0.025, 0.1, 1.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 試算階段計時與 Server-Timing 標頭（STAGE_TIMING=false 時完全停用）
+STAGE_TIMING_ENABLED = os.environ.get('STAGE_TIMING', 'true').lower() != 'false'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{name}="{_escape_label_value(value)}"' for name, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+class _ShardOwner:
+    """存放於 threading.local，隨執行緒結束釋放，用來觸發分片回收"""
+    __slots__ = ('__weakref__',)
+
+
+class _Metric:
+    """分片儲存的指標基底：labels tuple → 值"""
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = {}       # id(分片) → 存活執行緒的分片
+        self._base = {}         # 已結束執行緒的累計值
+        # 回收可能在持有鎖的執行緒中由垃圾回收觸發，需可重入
+        self._lock = threading.RLock()
+
+    def _shard(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = {}
+            owner = _ShardOwner()
+            with self._lock:
+                self._shards[id(values)] = values
+            weakref.finalize(owner, self._retire, values)
+            self._local.owner = owner
+            self._local.values = values
+            return values
+
+    def _retire(self, values):
+        """執行緒結束：分片併入基底後移除"""
+        with self._lock:
+            self._merge(self._base, values)
+            del self._shards[id(values)]
+
+    def _merge(self, target, shard):
+        raise NotImplementedError
+
+    def _snapshots(self):
+        with self._lock:
+            shards = [self._base] + list(self._shards.values())
+            # 只有擁有者執行緒會寫入分片；dict 複製在 GIL 下為原子操作
+            return [dict(shard) for shard in shards]
+
+    def values(self):
+        """合併所有分片：labels tuple → 值"""
+        merged = {}
+        for shard in self._snapshots():
+            self._merge(merged, shard)
+        return merged
+
+    def clear(self):
+        with self._lock:
+            self._base.clear()
+            for shard in self._shards.values():
+                shard.clear()
+
+    def _header(self):
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+
+
+class Counter(_Metric):
+    """單調遞增計數器"""
+    type = 'counter'
+
+    def inc(self, *labels, amount=1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, target, shard):
+        for labels, value in shard.items():
+            target[labels] = target.get(labels, 0) + value
+
+    def render(self):
+        lines = self._header()
+        for labels, value in sorted(self.values().items()):
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}{label_text} {_format_value(value)}')
+        return lines
+
+
+class Histogram(_Metric):
+    """固定分箱直方圖；每個標籤組合為 [各分箱計數..., +Inf 計數, 總和]"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labels):
+        shard = self._shard()
+        cell = shard.get(labels)
+        if cell is None:
+            cell = shard[labels] = [0] * (len(self.buckets) + 2)
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def _merge(self, target, shard):
+        for labels, cell in shard.items():
+            cell = list(cell)
+            total = target.get(labels)
+            target[labels] = cell if total is None else [a + b for a, b in zip(total, cell)]
+
+    def values(self):
+        """合併所有分片：labels tuple → (非累計分箱計數, 總和, 次數)"""
+        merged = super().values()
+        return {labels: (cell[:-1], cell[-1], sum(cell[:-1])) for labels, cell in merged.items()}
+
+    def render(self):
+        lines = self._header()
+        for labels, (counts, total, count) in sorted(self.values().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                label_text = _format_labels(self.labelnames, labels, [('le', _format_value(bound))])
+                lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class CallbackMetric:
+    """抓取時才讀取的指標（例如快取統計），callback 返回數值"""
+
+    def __init__(self, name, documentation, metric_type, callback):
+        self.name = name
+        self.documentation = documentation
+        self.type = metric_type
+        self.callback = callback
+
+    def render(self):
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+            f'{self.name} {_format_value(self.callback())}',
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'指標名稱重複: {metric.name}')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, metric_type, callback):
+        return self._register(CallbackMetric(name, documentation, metric_type, callback))
+
+    def render(self):
+        """Prometheus 文字格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# 全域指標
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    'http_requests_total', 'HTTP 請求數', ('method', 'endpoint', 'status'))
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP 請求處理時間（秒）', ('method', 'endpoint', 'status'))
+rate_limit_rejections = registry.counter(
+    'rate_limit_rejections_total', '被頻率限制拒絕的請求數', ('limiter',))
+engine_stage_duration = registry.histogram(
+    'engine_stage_duration_seconds', '試算各階段耗時（秒）', ('stage',), buckets=STAGE_BUCKETS)
+db_queries = registry.counter(
+    'db_queries_total', '資料庫查詢數')
+db_query_duration = registry.histogram(
+    'db_query_duration_seconds', '資料庫查詢耗時（秒）')
+log_records_dropped = registry.callback(
+    'log_records_dropped_total', '日誌佇列已滿而丟棄的紀錄數', 'counter', dropped_log_records)
+
+
+def register_cache_metrics(prefix, stats):
+    """將快取的 stats() 註冊為指標（命中/未命中/淘汰數與目前用量）"""
+    for key, metric_type, documentation in (
+        ('hits', 'counter', '快取命中數'),
+        ('misses', 'counter', '快取未命中數'),
+        ('evictions', 'counter', '快取淘汰數'),
+        ('entries', 'gauge', '快取項目數'),
+        ('bytes', 'gauge', '快取使用位元組數'),
+        ('hit_rate', 'gauge', '快取命中率'),
+    ):
+        suffix = '_total' if metric_type == 'counter' else ''
+        registry.callback(f'{prefix}_{key}{suffix}', documentation, metric_type,
+                          lambda key=key: stats()[key])
+
+
+def server_timing(f):
+    """
+    為試算端點啟用階段計時：回應加上 Server-Timing 標頭，各階段耗時計入 engine_stage_duration
+
+    停用時直接返回原函式，不增加任何成本。
+    """
+    if not STAGE_TIMING_ENABLED:
+        return f
+
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        with stage_timing() as timer:
+            response = make_response(f(*args, **kwargs))
+        for stage, duration in timer.stages.items():
+            engine_stage_duration.observe(duration / 1e9, stage)
+        response.headers['Server-Timing'] = timer.server_timing()
+        return response
+    return wrapper
+
+
+_db_events_registered = False
+
+
+def _record_db_queries():
+    """以 SQLAlchemy 事件記錄所有引擎的查詢次數與耗時（每個行程註冊一次，多個 app 共用）"""
+    global _db_events_registered
+    if _db_events_registered:
+        return
+    _db_events_registered = True
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['metrics_query_start'] = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop('metrics_query_start', None)
+        db_queries.inc()
+        if start is not None:
+            db_query_duration.observe(time.perf_counter() - start)
+
+
+def setup_metrics(app):
+    """記錄每個請求的次數與延遲，並提供 /metrics 端點"""
+    _record_db_queries()
+    # 設定 METRICS_TOKEN 時，/metrics 需以 Authorization: Bearer <token> 存取；
+    # 生產環境未設定權杖時不公開（流量、錯誤次數與後端狀態不應對外暴露）
+    token = os.environ.get('METRICS_TOKEN')
+    require_token = bool(token) or os.environ.get('ENVIRONMENT') == 'production'
+    if require_token and not token:
+        app.logger.warning("生產環境未設定 METRICS_TOKEN，/metrics 已停用")
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.get('metrics_start')
+        if start is not None:
+            # 以路由規則為標籤（而非實際路徑），標籤數量有上限
+            endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+            labels = (request.method, endpoint, str(response.status_code))
+            http_requests.inc(*labels)
+            http_request_duration.observe(time.perf_counter() - start, *labels)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if require_token and (not token or request.headers.get('Authorization') != f'Bearer {token}'):
+            return Response('unauthorized\n', status=401, mimetype='text/plain')
+        return Response(registry.render(), content_type=CONTENT_TYPE)
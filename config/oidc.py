@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+OpenID Connect 中繼資料快取
+Google 的 discovery 文件與 JWKS 快取於記憶體與磁碟（同一台主機的 worker 與重啟後共用），
+過期後在寬限期內先返回舊資料並於背景更新（stale-while-revalidate），登入流程不等待網路。
+
+JWKS 決定哪些金鑰簽署的 ID token 可信，磁碟快取目錄預設位於應用程式的 instance 目錄，
+以 0o700 建立，且只在目錄屬於目前使用者、其他使用者無法寫入時使用。
+
+OIDC_ISSUER 可指向本機的 OIDC 替身（tests/oidc_server.py），不需連線 Google 即可測試與量測登入流程。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUER = 'https://accounts.google.com'
+# instance 目錄下的快取子目錄（未設定 OIDC_CACHE_DIR 時）
+CACHE_SUBDIR = 'oidc-cache'
+
+# 快取有效期間與過期後仍可先返回舊資料的寬限期間（秒）
+METADATA_TTL = int(os.environ.get('OIDC_METADATA_TTL', 6 * 3600))
+METADATA_STALE_TTL = int(os.environ.get('OIDC_METADATA_STALE_TTL', 7 * 86400))
+FETCH_TIMEOUT = 5
+
+
+def discovery_url(issuer):
+    return issuer.rstrip('/') + '/.well-known/openid-configuration'
+
+
+def _http_get_json(url):
+    import requests
+
+    response = requests.get(url, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+class DocumentCache:
+    """
+    JSON 文件快取（URL → 文件）
+
+    - 未過期：直接返回
+    - 過期但在寬限期內：返回舊文件，背景執行緒更新（同一 URL 同時只有一個更新）
+    - 超過寬限期或沒有快取：同步下載；下載失敗時仍有舊文件則返回舊文件
+    """
+
+    def __init__(self, cache_dir=None, ttl=METADATA_TTL, stale_ttl=METADATA_STALE_TTL,
+                 fetch=_http_get_json, clock=time.time):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._fetch = fetch
+        self._clock = clock
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._cache_dir_checked = False
+
+    def get(self, url, force=False):
+        """
+        Args:
+            force: 忽略快取重新下載（例如 JWKS 中找不到 ID token 的 kid，金鑰已輪替）
+        """
+        entry = None if force else self._load(url)
+        if entry is not None:
+            document, fetched_at = entry
+            age = self._clock() - fetched_at
+            # 取得時間在未來表示快取檔案不可信（或時鐘倒退），視為過期且不作為備援
+            if age < 0:
+                return self._refresh(url)
+            if age < self.ttl:
+                return document
+            if age < self.ttl + self.stale_ttl:
+                self._refresh_in_background(url)
+                return document
+        return self._refresh(url, fallback=entry)
+
+    def _refresh(self, url, fallback=None):
+        try:
+            document = self._fetch(url)
+        except Exception as e:
+            if fallback is None:
+                raise
+            logger.warning("OIDC 文件更新失敗，使用快取: %s (%s)", url, e)
+            return fallback[0]
+        self._store(url, document, self._clock())
+        return document
+
+    def _refresh_in_background(self, url):
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        def refresh():
+            try:
+                self._refresh(url, fallback=self._entries.get(url))
+            finally:
+                with self._lock:
+                    self._refreshing.discard(url)
+
+        threading.Thread(target=refresh, name='oidc-refresh', daemon=True).start()
+
+    def _secure_cache_dir(self):
+        """建立（0o700）並檢查磁碟快取目錄；不安全時停用磁碟快取，只使用記憶體"""
+        if self._cache_dir_checked:
+            return self.cache_dir
+        self._cache_dir_checked = True
+        if not self.cache_dir:
+            return None
+        try:
+            os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+            stat = os.stat(self.cache_dir)
+        except OSError as e:
+            logger.warning("OIDC 快取目錄無法使用: %s (%s)", self.cache_dir, e)
+            self.cache_dir = None
+            return None
+        getuid = getattr(os, 'getuid', None)
+        if (getuid is not None and stat.st_uid != getuid()) or stat.st_mode & 0o022:
+            logger.warning("OIDC 快取目錄不屬於目前使用者或可被其他使用者寫入，停用磁碟快取: %s",
+                           self.cache_dir)
+            self.cache_dir = None
+        return self.cache_dir
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.cache_dir, digest + '.json')
+
+    def _load(self, url):
+        entry = self._entries.get(url)
+        if entry is not None or not self._secure_cache_dir():
+            return entry
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            entry = (stored['document'], float(stored['fetched_at']))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        self._entries[url] = entry
+        return entry
+
+    def _store(self, url, document, fetched_at):
+        self._entries[url] = (document, fetched_at)
+        if not self._secure_cache_dir():
+            return
+        # 先寫入暫存檔再改名，其他 worker 不會讀到寫到一半的檔案
+        try:
+            fd, temporary = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'fetched_at': fetched_at, 'document': document}, f)
+            os.replace(temporary, self._path(url))
+        except OSError as e:
+            logger.warning("OIDC 快取寫入失敗: %s", e)
+
+
+def create_oauth(app, documents):
+    """
+    建立 Authlib OAuth registry，OAuth 2.0 client 的 discovery 文件與 JWKS 由 documents 提供
+
+    Authlib 在此時才載入（見 auth.get_google）。
+    """
+    from authlib.integrations.flask_client import FlaskOAuth2App, OAuth
+
+    class CachedMetadataOAuth2App(FlaskOAuth2App):
+        def load_server_metadata(self):
+            if self._server_metadata_url:
+                self.server_metadata.update(documents.get(self._server_metadata_url))
+            return self.server_metadata
+
+        def fetch_jwk_set(self, force=False):
+            jwks_uri = self.load_server_metadata().get('jwks_uri')
+            if not jwks_uri:
+                raise RuntimeError('Missing "jwks_uri" in metadata')
+            return documents.get(jwks_uri, force=force)
+
+    class CachedMetadataOAuth(OAuth):
+        oauth2_client_cls = CachedMetadataOAuth2App
+
+    return CachedMetadataOAuth(app)
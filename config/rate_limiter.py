@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+請求頻率限制器
+滑動視窗計數（sliding window counter）：每個來源只保存「上一個」與「目前」固定視窗的計數，
+以上一視窗計數依剩餘比例加權估算最近一個視窗內的請求數，每次檢查為 O(1)
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from config.state_backend import StateBackendError, get_state_backend, is_shared_backend
+
+logger = logging.getLogger(__name__)
+
+# 視窗長度（秒）
+RATE_LIMIT_WINDOW_SECONDS = 60
+# 追蹤的來源數上限，超過時淘汰最久未出現的來源
+MAX_TRACKED_KEYS = 10000
+
+
+class RateLimitDecision(NamedTuple):
+    """單次檢查的結果"""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int        # 被拒絕時建議的重試秒數，允許時為 0
+    reset_after: int        # 目前固定視窗結束前的秒數
+
+    def headers(self):
+        """X-RateLimit-* 與 Retry-After 標頭"""
+        headers = {
+            'X-RateLimit-Limit': str(self.limit),
+            'X-RateLimit-Remaining': str(self.remaining),
+            'X-RateLimit-Reset': str(self.reset_after),
+        }
+        if not self.allowed:
+            headers['Retry-After'] = str(self.retry_after)
+        return headers
+
+
+def _retry_after(window, previous, current, elapsed, limit):
+    """估計值降到可再接受一次請求所需的秒數"""
+    room = limit - 1
+    if current <= room and previous > 0:
+        # 目前視窗內，等上一視窗的權重衰減
+        wait = window * (1 - (room - current) / previous) - elapsed
+    else:
+        # 需等到下一個視窗，並讓目前視窗的計數衰減
+        wait = (window - elapsed) + (window * (1 - room / current) if current > 0 else 0)
+    return max(1, math.ceil(wait))
+
+
+class SlidingWindowRateLimiter:
+    """
+    執行緒安全的滑動視窗頻率限制器
+
+    來源依最後出現時間排序，過期的來源在每次檢查時從最舊的一端順帶清除（攤銷 O(1)），
+    不需要背景執行緒；追蹤數量超過 max_keys 時淘汰最久未出現的來源，記憶體有上限。
+    """
+
+    def __init__(self, window=RATE_LIMIT_WINDOW_SECONDS, max_keys=MAX_TRACKED_KEYS,
+                 clock=time.time):
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        self._counters = OrderedDict()  # key → [視窗起點, 上一視窗計數, 目前視窗計數]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._counters)
+
+    def hit(self, key, limit) -> RateLimitDecision:
+        """檢查並記錄一次請求；超過限制時不計入"""
+        now = self._clock()
+        window = self.window
+        window_start = now - (now % window)
+        elapsed = now - window_start
+
+        with self._lock:
+            self._expire(window_start)
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = [window_start, 0, 0]
+                self._counters[key] = counter
+                if len(self._counters) > self.max_keys:
+                    self._counters.popitem(last=False)
+            else:
+                self._counters.move_to_end(key)
+                if counter[0] != window_start:
+                    counter[1] = counter[2] if counter[0] == window_start - window else 0
+                    counter[2] = 0
+                    counter[0] = window_start
+
+            previous, current = counter[1], counter[2]
+            estimate = previous * (1 - elapsed / window) + current
+            allowed = estimate + 1 <= limit
+            if allowed:
+                counter[2] += 1
+                estimate += 1
+
+        reset_after = max(1, math.ceil(window - elapsed))
+        if allowed:
+            return RateLimitDecision(True, limit, max(0, int(limit - estimate)), 0, reset_after)
+        retry_after = _retry_after(window, previous, current, elapsed, limit)
+        return RateLimitDecision(False, limit, 0, retry_after, reset_after)
+
+    def _expire(self, window_start):
+        """移除兩個視窗內都沒有請求的來源（從最久未出現的一端開始）"""
+        stale_before = window_start - self.window
+        while self._counters:
+            key, counter = next(iter(self._counters.items()))
+            if counter[0] >= stale_before:
+                break
+            del self._counters[key]
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class SharedRateLimiter:
+    """
+    以共用狀態後端計數的滑動視窗頻率限制器，多個 worker 共用同一份配額
+
+    每個固定視窗一個計數鍵（兩個視窗後過期）：遞增目前視窗並同時讀取上一視窗，
+    一次後端往返；超過限制時扣回這次的計數。後端無法使用時放行（fail open），
+    避免共用狀態服務中斷時整個網站無法使用。
+    """
+
+    def __init__(self, backend, namespace, window=RATE_LIMIT_WINDOW_SECONDS, clock=time.time):
+        self.backend = backend
+        self.namespace = namespace
+        self.window = window
+        self._clock = clock
+
+    def hit(self, key, limit) -> RateLimitDecision:
+        """檢查並記錄一次請求；超過限制時不計入"""
+        now = self._clock()
+        window = self.window
+        index = int(now // window)
+        elapsed = now - index * window
+        reset_after = max(1, math.ceil(window - elapsed))
+        current_key = f'rl:{self.namespace}:{key}:{index}'
+        previous_key = f'rl:{self.namespace}:{key}:{index - 1}'
+
+        try:
+            current, (previous,) = self.backend.incr_and_read(
+                current_key, 1, ttl=2 * window, read_keys=(previous_key,))
+            estimate = previous * (1 - elapsed / window) + current
+            if estimate <= limit:
+                return RateLimitDecision(True, limit, max(0, int(limit - estimate)), 0, reset_after)
+            self.backend.incr_and_read(current_key, -1)
+        except StateBackendError as e:
+            logger.warning("頻率限制後端無法使用，暫時放行: %s", e)
+            return RateLimitDecision(True, limit, limit, 0, reset_after)
+
+        current -= 1
+        retry_after = _retry_after(window, previous, current, elapsed, limit)
+        return RateLimitDecision(False, limit, 0, retry_after, reset_after)
+
+
+def create_rate_limiter(namespace, backend=None, window=RATE_LIMIT_WINDOW_SECONDS):
+    """
+    依狀態後端建立頻率限制器
+
+    行程內後端使用 SlidingWindowRateLimiter（不需序列化鍵），共用後端使用 SharedRateLimiter。
+    """
+    backend = backend if backend is not None else get_state_backend()
+    if is_shared_backend(backend):
+        return SharedRateLimiter(backend, namespace, window)
+    return SlidingWindowRateLimiter(window)
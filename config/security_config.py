@@ -6,10 +6,14 @@
 
 import os
 import secrets
-from flask import request
+from flask import make_response, request
 import time
 from functools import wraps
 
+from config.metrics import rate_limit_rejections
+from config.rate_limiter import create_rate_limiter
+from engine.inputs import MAX_INVESTMENT_PERIOD
+
 # 安全性常數
 MAX_REQUESTS_PER_MINUTE = 60
 MAX_CALCULATION_REQUESTS_PER_MINUTE = 20
@@ -20,9 +24,10 @@ ALLOWED_ORIGINS = [
     'http://127.0.0.1:8080'
 ]
 
-# 請求限制追蹤
-request_counts = {}
-calculation_counts = {}
+# 請求限制追蹤（頁面與計算 API 分開計數，每個來源 IP 為 O(1) 狀態；
+# 設定 STATE_BACKEND_URL 時由所有 worker 共用）
+request_limiter = create_rate_limiter('requests')
+calculation_limiter = create_rate_limiter('calculations')
 
 def setup_security_headers(app):
     """設定安全性標頭"""
@@ -56,36 +61,27 @@ def setup_security_headers(app):
         
         return response
 
+def _limited(name, limiter, limit, error_message, f, args, kwargs):
+    """檢查頻率限制並在回應加上 X-RateLimit-* 標頭"""
+    decision = limiter.hit(request.remote_addr, limit)
+    if not decision.allowed:
+        rate_limit_rejections.inc(name)
+        return {
+            'error': error_message,
+            'retry_after': decision.retry_after
+        }, 429, decision.headers()
+
+    response = make_response(f(*args, **kwargs))
+    response.headers.extend(decision.headers())
+    return response
+
 def rate_limit(max_requests=MAX_REQUESTS_PER_MINUTE):
     """請求頻率限制裝飾器"""
     def decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
-            client_ip = request.remote_addr
-            current_time = time.time()
-            
-            # 清理舊記錄
-            cleanup_old_requests()
-            
-            # 檢查請求頻率
-            if client_ip in request_counts:
-                requests_in_minute = len([
-                    req_time for req_time in request_counts[client_ip]
-                    if current_time - req_time < 60
-                ])
-                
-                if requests_in_minute >= max_requests:
-                    return {
-                        'error': '請求過於頻繁，請稍後再試',
-                        'retry_after': 60
-                    }, 429
-            
-            # 記錄請求
-            if client_ip not in request_counts:
-                request_counts[client_ip] = []
-            request_counts[client_ip].append(current_time)
-            
-            return f(*args, **kwargs)
+            return _limited('requests', request_limiter, max_requests, '請求過於頻繁，請稍後再試',
+                            f, args, kwargs)
         return wrapper
     return decorator
 
@@ -93,57 +89,16 @@ def calculation_rate_limit(f):
     """計算 API 專用頻率限制"""
     @wraps(f)
     def wrapper(*args, **kwargs):
-        client_ip = request.remote_addr
-        current_time = time.time()
-        
-        # 清理舊記錄
-        cleanup_old_calculations()
-        
-        # 檢查計算請求頻率
-        if client_ip in calculation_counts:
-            calc_requests_in_minute = len([
-                req_time for req_time in calculation_counts[client_ip]
-                if current_time - req_time < 60
-            ])
-            
-            if calc_requests_in_minute >= MAX_CALCULATION_REQUESTS_PER_MINUTE:
-                return {
-                    'error': '計算請求過於頻繁，請稍後再試',
-                    'retry_after': 60
-                }, 429
-        
-        # 記錄計算請求
-        if client_ip not in calculation_counts:
-            calculation_counts[client_ip] = []
-        calculation_counts[client_ip].append(current_time)
-        
-        return f(*args, **kwargs)
+        return _limited('calculations', calculation_limiter, MAX_CALCULATION_REQUESTS_PER_MINUTE,
+                        '計算請求過於頻繁，請稍後再試', f, args, kwargs)
     return wrapper
 
-def cleanup_old_requests():
-    """清理超過一分鐘的請求記錄"""
-    current_time = time.time()
-    for client_ip in list(request_counts.keys()):
-        request_counts[client_ip] = [
-            req_time for req_time in request_counts[client_ip]
-            if current_time - req_time < 60
-        ]
-        if not request_counts[client_ip]:
-            del request_counts[client_ip]
-
-def cleanup_old_calculations():
-    """清理超過一分鐘的計算請求記錄"""
-    current_time = time.time()
-    for client_ip in list(calculation_counts.keys()):
-        calculation_counts[client_ip] = [
-            req_time for req_time in calculation_counts[client_ip]
-            if current_time - req_time < 60
-        ]
-        if not calculation_counts[client_ip]:
-            del calculation_counts[client_ip]
-
 def validate_request_data(data, required_fields):
     """驗證請求資料"""
+    # JSON 本體不是物件（例如陣列）時無法逐欄檢查
+    if not isinstance(data, dict):
+        return ["請求資料必須是 JSON 物件"]
+
     missing_fields = []
     invalid_fields = []
     
@@ -184,6 +139,14 @@ def validate_request_data(data, required_fields):
             elif num_value < 0:
                 invalid_fields.append(f"{field} 必須大於等於 0")
     
+    # 投資年數為選填，但決定現金流與批次試算的陣列大小，提供時必須在上限內
+    period = data.get('investmentPeriod')
+    if period is not None and period != '':
+        num_value = safe_float_check(period)
+        in_range = num_value is not None and 1 <= num_value <= MAX_INVESTMENT_PERIOD
+        if not in_range or num_value != int(num_value):
+            invalid_fields.append(f"investmentPeriod 必須是 1-{MAX_INVESTMENT_PERIOD} 之間的整數")
+    
     errors = []
     if missing_fields:
         errors.append(f"缺少必要欄位: {', '.join(missing_fields)}")
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共用狀態後端
+頻率限制與監控計數器的儲存位置，讓多個 gunicorn worker 共用同一份配額與指標
+
+STATE_BACKEND_URL 環境變數選擇後端：
+    memory://（預設）            單一行程內，worker 之間不共用
+    sqlite:////tmp/state.db      同一台主機上的多個 worker（WAL 模式）
+    redis://host:6379/0          跨主機，任何相容 Redis 協定的服務
+"""
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import unquote, urlsplit
+
+
+class StateBackendError(Exception):
+    """後端無法使用（連線失敗、逾時等）"""
+
+
+class StateBackendReplyError(StateBackendError):
+    """指令已送出但未取得回應（逾時、連線中斷），指令可能已執行"""
+
+
+class MemoryStateBackend:
+    """行程內的計數器（預設）"""
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._values = {}   # key → (value, expires_at)
+        self._lock = threading.Lock()
+
+    def _current(self, key, now):
+        entry = self._values.get(key)
+        if entry is None or (entry[1] is not None and entry[1] <= now):
+            return None
+        return entry
+
+    def incr_and_read(self, key, amount=1, ttl=None, read_keys=()):
+        """
+        將 key 加上 amount 並同時讀取 read_keys
+
+        ttl 只在計數器建立（或已過期）時設定。
+
+        Returns:
+            tuple: (新值, read_keys 的值列表，不存在時為 0)
+        """
+        now = self._clock()
+        with self._lock:
+            entry = self._current(key, now)
+            if entry is None:
+                entry = (0, now + ttl if ttl else None)
+            value = entry[0] + amount
+            self._values[key] = (value, entry[1])
+            others = [self._current(other, now) for other in read_keys]
+            if len(self._values) > 10000:
+                self._values = {k: v for k, v in self._values.items() if v[1] is None or v[1] > now}
+        return value, [other[0] if other else 0 for other in others]
+
+    def get_many(self, keys):
+        now = self._clock()
+        with self._lock:
+            entries = (self._current(key, now) for key in keys)
+            return [(entry[0] if entry else 0) for entry in entries]
+
+
+class SQLiteStateBackend:
+    """
+    SQLite（WAL 模式）計數器，供同一主機上的多個 worker 共用
+
+    每個執行緒使用各自的連線；UPSERT ... RETURNING 使遞增為單一原子操作。
+    """
+
+    CLEANUP_INTERVAL = 1000
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._local = threading.local()
+        self._writes = 0
+        self._connection()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS counters ('
+                'key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL)'
+            )
+            self._local.connection = connection
+        return connection
+
+    def incr_and_read(self, key, amount=1, ttl=None, read_keys=()):
+        now = self._clock()
+        expires_at = now + ttl if ttl else None
+        try:
+            connection = self._connection()
+            value = connection.execute(
+                'INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET '
+                'value = CASE WHEN counters.expires_at <= ? THEN excluded.value '
+                'ELSE counters.value + excluded.value END, '
+                'expires_at = CASE WHEN counters.expires_at <= ? THEN excluded.expires_at '
+                'ELSE counters.expires_at END '
+                'RETURNING value',
+                (key, amount, expires_at, now, now),
+            ).fetchone()[0]
+            others = self._read(connection, read_keys, now) if read_keys else []
+
+            self._writes += 1
+            if self._writes % self.CLEANUP_INTERVAL == 0:
+                connection.execute('DELETE FROM counters WHERE expires_at <= ?', (now,))
+        except sqlite3.Error as e:
+            raise StateBackendError(f'SQLite 狀態後端錯誤: {e}') from e
+        return value, others
+
+    def _read(self, connection, keys, now):
+        placeholders = ','.join('?' * len(keys))
+        rows = connection.execute(
+            f'SELECT key, value FROM counters WHERE key IN ({placeholders}) '
+            'AND (expires_at IS NULL OR expires_at > ?)',
+            (*keys, now),
+        ).fetchall()
+        values = dict(rows)
+        return [values.get(key, 0) for key in keys]
+
+    def get_many(self, keys):
+        try:
+            return self._read(self._connection(), list(keys), self._clock())
+        except sqlite3.Error as e:
+            raise StateBackendError(f'SQLite 狀態後端錯誤: {e}') from e
+
+
+def _counts(values):
+    """Redis 回覆的計數（不存在的鍵為 None）轉為整數"""
+    return [int(value) if value is not None else 0 for value in values]
+
+
+class RedisStateBackend:
+    """
+    Redis 協定（RESP）計數器
+
+    只使用 INCRBY / EXPIRE / MGET 等基本指令並以 pipeline 一次往返送出，
+    不依賴 redis 套件，任何相容 Redis 協定的服務皆可使用。
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, timeout=1.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @classmethod
+    def from_url(cls, url):
+        parts = urlsplit(url)
+        db = int(parts.path.lstrip('/') or 0)
+        password = unquote(parts.password) if parts.password else None
+        return cls(parts.hostname or 'localhost', parts.port or 6379, db, password)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile('rb')
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            try:
+                self._send(setup)
+            except StateBackendError:
+                # AUTH / SELECT 失敗的連線不可保留給之後的指令使用
+                self._close()
+                raise
+
+    def _close(self):
+        for name in ('reader', 'sock'):
+            resource = getattr(self._local, name, None)
+            if resource is not None:
+                try:
+                    resource.close()
+                except OSError:
+                    pass
+        self._local.sock = self._local.reader = None
+
+    @staticmethod
+    def _encode(command):
+        parts = [b'*%d\r\n' % len(command)]
+        for argument in command:
+            data = argument if isinstance(argument, bytes) else str(argument).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(data), data))
+        return b''.join(parts)
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError('連線已關閉')
+        prefix, payload = line[:1], line[1:-2]
+        try:
+            if prefix == b'+':
+                return payload.decode('utf-8')
+            if prefix == b'-':
+                # 錯誤回應不在此拋出，由 _send 讀完整個 pipeline 的回應後再拋出
+                return StateBackendError(f'Redis 錯誤: {payload.decode("utf-8")}')
+            if prefix == b':':
+                return int(payload)
+            if prefix == b'$':
+                length = int(payload)
+                if length < 0:
+                    return None
+                data = self._local.reader.read(length + 2)
+                if len(data) != length + 2:
+                    raise ConnectionError('回應不完整')
+                return data[:-2]
+            if prefix == b'*':
+                length = int(payload)
+                return None if length < 0 else [self._read_reply() for _ in range(length)]
+        except ValueError:
+            # 長度或整數欄位損毀（含無法解碼的文字），之後的資料無法對齊回應
+            raise StateBackendReplyError(f'無法解析的 Redis 回應: {line!r}') from None
+        raise StateBackendError(f'無法解析的 Redis 回應: {line!r}')
+
+    def _send(self, commands):
+        """送出 pipeline 並讀取所有回應"""
+        self._local.sock.sendall(b''.join(self._encode(command) for command in commands))
+        return self._read_replies(len(commands))
+
+    def _read_replies(self, count):
+        """
+        讀取 count 個回應
+
+        某個指令失敗時仍讀完其餘回應再拋出，連線上不會殘留未讀的回應；
+        無法解析回應時連線狀態未知，關閉連線。
+        """
+        try:
+            replies = [self._read_reply() for _ in range(count)]
+        except StateBackendError:
+            self._close()
+            raise
+        for reply in replies:
+            if isinstance(reply, StateBackendError):
+                raise reply
+        return replies
+
+    def execute(self, *commands):
+        """
+        以 pipeline 送出多個指令並返回各自的回應
+
+        連線或送出失敗時指令尚未送達，重新連線再送一次；送出後讀取回應失敗時指令可能已執行，
+        重送會重複計數，因此關閉連線並拋出 StateBackendReplyError。
+        """
+        payload = b''.join(self._encode(command) for command in commands)
+        for attempt in (1, 2):
+            try:
+                if getattr(self._local, 'sock', None) is None:
+                    self._connect()
+                self._local.sock.sendall(payload)
+                break
+            except (OSError, ConnectionError) as e:
+                self._close()
+                if attempt == 2:
+                    raise StateBackendError(f'無法連線至 Redis {self.host}:{self.port}: {e}') from e
+        try:
+            return self._read_replies(len(commands))
+        except (OSError, ConnectionError) as e:
+            self._close()
+            raise StateBackendReplyError(
+                f'讀取 Redis {self.host}:{self.port} 的回應失敗，指令可能已執行: {e}') from e
+
+    def incr_and_read(self, key, amount=1, ttl=None, read_keys=()):
+        commands = [('INCRBY', key, amount)]
+        if ttl:
+            # 每次都重設過期時間（EXPIRE NX 需 Redis 7 以上）；計數鍵依視窗區分，延長不影響結果
+            commands.append(('EXPIRE', key, int(ttl)))
+        if read_keys:
+            commands.append(('MGET', *read_keys))
+        replies = self.execute(*commands)
+        others = _counts(replies[-1]) if read_keys else []
+        return replies[0], others
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return []
+        return _counts(self.execute(('MGET', *keys))[0])
+
+
+def create_state_backend(url=None):
+    """依網址建立後端（預設讀取 STATE_BACKEND_URL，未設定時為行程內後端）"""
+    url = url if url is not None else os.environ.get('STATE_BACKEND_URL', '')
+    if not url or url.startswith('memory:'):
+        return MemoryStateBackend()
+    if url.startswith('sqlite:'):
+        # sqlite:///relative.db 或 sqlite:////absolute/path.db
+        path = url[len('sqlite:///'):] if url.startswith('sqlite:///') else url[len('sqlite:'):]
+        return SQLiteStateBackend(path)
+    if url.startswith('redis:'):
+        return RedisStateBackend.from_url(url)
+    raise ValueError(f'不支援的 STATE_BACKEND_URL: {url}')
+
+
+_state_backend = None
+_state_backend_lock = threading.Lock()
+
+
+def get_state_backend():
+    """行程內共用的後端實例（首次呼叫時依環境變數建立）"""
+    global _state_backend
+    if _state_backend is None:
+        with _state_backend_lock:
+            if _state_backend is None:
+                _state_backend = create_state_backend()
+    return _state_backend
+
+
+def is_shared_backend(backend):
+    """後端是否可跨 worker 共用"""
+    return not isinstance(backend, MemoryStateBackend)
+
+
+class SharedCounter:
+    """
+    緩衝寫入的共用計數器
+
+    遞增先累積在行程內，距上次寫入超過 flush_interval 秒或讀取時才送往後端，
+    避免每個請求都多一次 SQLite 寫入或 Redis 往返；後端無法使用時保留在本地，稍後再試。
+    """
+
+    def __init__(self, backend, key, flush_interval=1.0, clock=time.monotonic):
+        self.backend = backend
+        self.key = key
+        self.flush_interval = flush_interval
+        self._clock = clock
+        self._pending = 0
+        self._last_flush = clock()
+        self._local_total = 0
+        self._lock = threading.Lock()
+
+    def add(self, amount=1):
+        with self._lock:
+            self._pending += amount
+            self._local_total += amount
+            due = self._clock() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, 0
+            self._last_flush = self._clock()
+        if not pending:
+            return
+        try:
+            self.backend.incr_and_read(self.key, pending)
+        except StateBackendReplyError:
+            # 遞增可能已寫入，放回本地再送會重複計數；寧可少計
+            pass
+        except StateBackendError:
+            with self._lock:
+                self._pending += pending
+
+    @property
+    def value(self):
+        """所有 worker 的累計值；後端無法使用時返回本行程的累計值"""
+        self.flush()
+        try:
+            return self.backend.get_many([self.key])[0]
+        except StateBackendError:
+            return self._local_total
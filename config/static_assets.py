@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+靜態資源
+/static/<filename> 優先提供建置時預先壓縮的 .br / .gz（scripts/build/compress_static.py 產生，修改時間與原檔相同才視為有效），
+保留 send_file 的條件式請求（ETag / Last-Modified → 304）處理
+
+啟動時為每個檔案計算內容雜湊（asset manifest），模板以 asset_url() 產生含雜湊的網址，
+例如 js/main.js → /static/js/main.1a2b3c4d5e6f.js。內容變動時網址跟著變動，
+因此指紋網址可永久快取（immutable），重複造訪不需再請求靜態資源。
+"""
+
+import hashlib
+import mimetypes
+import os
+from functools import lru_cache
+
+from flask import current_app, request, send_from_directory, url_for
+
+from config.compression import ENCODINGS, is_compressible, negotiate_encoding
+
+# 預先壓縮檔案的副檔名
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# 指紋網址的快取設定：內容變動時網址也會變動，可永久快取
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# HTML 外殼（index.html）的快取時間（秒）：部署後最多這段時間內仍可能引用舊版資源網址
+HTML_SHELL_MAX_AGE = 300
+FINGERPRINT_LENGTH = 12
+
+
+def build_manifest(static_folder):
+    """
+    建立 asset manifest
+
+    Returns:
+        dict: 原始路徑 → 含內容雜湊的路徑，例如 'js/main.js' → 'js/main.1a2b3c4d5e6f.js'
+    """
+    manifest = {}
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if name.endswith(tuple(PRECOMPRESSED_SUFFIXES.values())):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()[:FINGERPRINT_LENGTH]
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            stem, extension = os.path.splitext(filename)
+            manifest[filename] = f'{stem}.{digest}{extension}'
+    return manifest
+
+
+def setup_static_assets(app):
+    """取代 Flask 內建 static 端點的處理函式（url_for('static', ...) 維持不變），並註冊模板函式 asset_url"""
+    static_folder = app.static_folder
+    has_folder = static_folder and os.path.isdir(static_folder)
+    manifest = build_manifest(static_folder) if has_folder else {}
+    originals = {fingerprinted: filename for filename, fingerprinted in manifest.items()}
+    app.extensions['static_manifest'] = manifest
+
+    @app.template_global()
+    def asset_url(filename):
+        """靜態資源網址；除錯模式下使用原始網址（修改檔案後不需重啟）"""
+        if not current_app.debug:
+            filename = manifest.get(filename, filename)
+        return url_for('static', filename=filename)
+
+    @lru_cache(maxsize=1024)
+    def _precompressed_encodings(filename, mtime_ns):
+        """filename 在修改時間為 mtime_ns（奈秒）時已有的預先壓縮版本（依偏好排序）"""
+        path = os.path.join(static_folder, filename)
+        available = []
+        for encoding in ENCODINGS:
+            try:
+                # 建置腳本讓壓縮檔與原檔的修改時間相同；不同表示原檔已修改、壓縮檔過期
+                if os.stat(path + PRECOMPRESSED_SUFFIXES[encoding]).st_mtime_ns == mtime_ns:
+                    available.append(encoding)
+            except OSError:
+                continue
+        return tuple(available)
+
+    def precompressed_encodings(filename):
+        """filename 目前仍有效的預先壓縮版本；以原檔修改時間為快取鍵，修改原檔後不會提供舊內容"""
+        try:
+            mtime_ns = os.stat(os.path.join(static_folder, filename)).st_mtime_ns
+        except OSError:
+            return ()
+        return _precompressed_encodings(filename, mtime_ns)
+
+    def static(filename):
+        original = originals.get(filename)
+        if original is not None:
+            filename = original
+        mimetype = mimetypes.guess_type(filename)[0]
+        encoding = None
+        if is_compressible(mimetype):
+            available = precompressed_encodings(filename)
+            encoding = negotiate_encoding(request.accept_encodings, available)
+
+        if encoding is None:
+            response = send_from_directory(static_folder, filename)
+        else:
+            response = send_from_directory(
+                static_folder, filename + PRECOMPRESSED_SUFFIXES[encoding],
+                mimetype=mimetype, download_name=os.path.basename(filename),
+            )
+            response.headers['Content-Encoding'] = encoding
+        if is_compressible(mimetype):
+            response.vary.add('Accept-Encoding')
+        if original is not None:
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    app.view_functions['static'] = static
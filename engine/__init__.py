@@ -0,0 +1,17 @@
+"""
+日本不動產投資分析工具 - 財務計算引擎
+純 Python 實作，不依賴 Flask / SQLAlchemy / Authlib
+
+    from engine import evaluate
+    result = evaluate(payload)
+    result.to_dict()
+"""
+
+from engine.inputs import CalculationInputs, MAN_EN, parse_inputs, safe_float, safe_int
+from engine.result import Result
+from engine.core import ENGINE_VERSION, compute_irr, evaluate
+
+__all__ = [
+    'CalculationInputs', 'ENGINE_VERSION', 'MAN_EN', 'Result',
+    'compute_irr', 'evaluate', 'parse_inputs', 'safe_float', 'safe_int',
+]
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+貸款攤還表
+以本息平均攤還的閉合公式直接求出各年末餘額、年度利息與本金，不需逐月迴圈
+"""
+
+from typing import List, NamedTuple
+
+
+def annuity_payment(principal, annual_rate, num_payments):
+    """本息平均攤還的每月還款額（利率為 0 時改為本金平均攤還）"""
+    if principal <= 0 or num_payments <= 0:
+        return 0
+    if annual_rate > 0:
+        monthly_rate = annual_rate / 12
+        growth = (1 + monthly_rate) ** num_payments
+        return principal * (monthly_rate * growth) / (growth - 1)
+    return principal / num_payments
+
+
+class AmortizationSchedule(NamedTuple):
+    """
+    年度攤還表
+
+    balances[y] 為第 y 年末的貸款餘額（balances[0] 為貸款金額），
+    interest_paid[y - 1] / principal_paid[y - 1] 為第 y 年支付的利息與本金。
+    """
+    monthly_payment: float
+    balances: List[float]
+    interest_paid: List[float]
+    principal_paid: List[float]
+
+
+def amortization_schedule(principal, annual_rate, term_years, years) -> AmortizationSchedule:
+    """
+    建立 years 年份的年度攤還表
+
+    第 k 個月末的餘額為 B_k = L·(1+r)^k - P·((1+r)^k - 1) / r，
+    年度本金即年初與年末餘額之差，年度利息為當年還款總額扣除本金。
+
+    Args:
+        principal: 貸款金額（日圓）
+        annual_rate: 年利率（小數）
+        term_years: 貸款年限
+        years: 需要的年數（通常為投資年數）
+    """
+    num_payments = term_years * 12
+    monthly_payment = annuity_payment(principal, annual_rate, num_payments) if term_years > 0 else 0
+
+    # 無需還款（無貸款或未設定年限）時餘額維持不變
+    if principal <= 0 or monthly_payment <= 0:
+        zeros = [0] * years
+        return AmortizationSchedule(monthly_payment, [principal] * (years + 1), zeros, list(zeros))
+
+    monthly_rate = annual_rate / 12
+    annual_growth = (1 + monthly_rate) ** 12
+    balances = [principal]
+    interest_paid = []
+    principal_paid = []
+    growth = 1.0
+    for year in range(1, years + 1):
+        months_paid = min(12, max(0, num_payments - 12 * (year - 1)))
+        if 12 * year >= num_payments:
+            balance = 0
+        elif monthly_rate > 0:
+            growth *= annual_growth
+            balance = max(0, principal * growth - monthly_payment * (growth - 1) / monthly_rate)
+        else:
+            balance = max(0, principal - monthly_payment * 12 * year)
+
+        repaid = balances[-1] - balance
+        balances.append(balance)
+        principal_paid.append(repaid)
+        interest_paid.append(monthly_payment * months_paid - repaid if monthly_rate > 0 else 0)
+
+    return AmortizationSchedule(monthly_payment, balances, interest_paid, principal_paid)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+試算結果快取
+以正規化後輸入的內容雜湊為鍵（content-addressed），
+LRU + TTL 淘汰並限制總位元組數；快取值為已序列化的回應內容
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from engine.core import ENGINE_VERSION
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 3600
+
+# 每筆快取除內容外的概估額外記憶體（鍵、OrderedDict 節點、tuple）
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def cache_key(*parts) -> str:
+    """
+    計算內容雜湊鍵
+
+    parts 應為正規化後的值（例如 CalculationInputs），因此語意相同的 payload 會得到同一個鍵；
+    鍵中加入 ENGINE_VERSION，公式變更後舊結果自動失效。
+    """
+    canonical = repr((ENGINE_VERSION,) + parts).encode('utf-8')
+    return hashlib.blake2b(canonical, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """執行緒安全的 LRU + TTL 快取，並限制總記憶體用量"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 ttl=DEFAULT_TTL_SECONDS, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()   # key → (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """取得快取值並標記為最近使用；不存在或已過期時返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[2] <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value: bytes):
+        """存入快取值，超過筆數或位元組上限時淘汰最久未使用的項目"""
+        size = len(value) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, self._clock() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        """命中率與用量指標"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'engine_version': ENGINE_VERSION,
+            }
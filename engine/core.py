@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+財務計算核心
+不依賴 Flask / SQLAlchemy，可直接在迴圈、批次或效能分析中呼叫
+"""
+
+from typing import Any, Mapping, Union
+
+from engine.amortization import amortization_schedule, annuity_payment
+from engine.inputs import CalculationInputs, parse_inputs
+from engine.irr import irr
+from engine.roots import DEFAULT_TOLERANCE
+from engine.result import Result
+from engine.timing import current_timer
+
+# 計算公式版本：任何會改變試算結果的修改都必須遞增，使快取的舊結果失效
+ENGINE_VERSION = 3
+
+# 出售時的仲介及相關費用比例
+SELLING_COST_RATIO = 0.03
+
+# 個人持有不動產的讓渡所得稅率（長期 / 短期，以 5 年為界）
+LONG_TERM_CAPITAL_GAINS_TAX_RATE = 0.20315
+SHORT_TERM_CAPITAL_GAINS_TAX_RATE = 0.3963
+LONG_TERM_HOLDING_YEARS = 5
+
+# 信用貸款（頭期款）固定 5 年攤還
+CREDIT_LOAN_PAYMENTS = 60
+
+
+def operating_revenue(inputs: CalculationInputs):
+    """
+    計算每月營運收入與支出
+
+    Returns:
+        tuple: (每月總收入, 每月營運支出, 一次性初始收入, 年度化續約費)
+    """
+    one_time_initial_income = 0
+    annual_renewal_fee = 0
+
+    if inputs.is_airbnb:
+        # 計算實際收入
+        max_possible_nights = min(365, inputs.operating_days_cap)
+        annual_booked_nights = max_possible_nights * inputs.occupancy_rate
+        monthly_booked_nights = annual_booked_nights / 12
+        total_effective_adr = inputs.daily_rate * (1 + inputs.peak_season_markup * 3 / 12) + \
+            max(0, inputs.avg_guests - inputs.base_occupancy_for_fee) * inputs.extra_guest_fee
+        monthly_gross_revenue = monthly_booked_nights * total_effective_adr
+        turnovers_per_month = 0
+        if inputs.avg_stay_duration > 0:
+            turnovers_per_month = monthly_booked_nights / inputs.avg_stay_duration
+        monthly_operating_expenses = monthly_gross_revenue * inputs.platform_fee_rate + \
+            turnovers_per_month * inputs.cleaning_fee + inputs.monthly_utilities
+    else:
+        monthly_rent = inputs.monthly_rent
+        if inputs.is_personal_lease:
+            frequency = inputs.lease_renewal_fee_frequency
+            amount = inputs.lease_renewal_fee_amount
+            if frequency > 0 and amount > 0:
+                annual_renewal_fee = (monthly_rent * amount) / frequency
+
+        monthly_gross_revenue = monthly_rent * (1 - inputs.vacancy_rate)
+        one_time_initial_income = monthly_rent * inputs.initial_lease_costs_ratio
+        monthly_operating_expenses = inputs.lease_utilities
+
+    return (monthly_gross_revenue, monthly_operating_expenses, one_time_initial_income,
+            annual_renewal_fee)
+
+
+def compute_irr(cash_flows, tolerance=DEFAULT_TOLERANCE):
+    """
+    計算 IRR (內部報酬率)
+
+    由 engine.irr 的 Newton / Brent 求解器計算，搜尋範圍內不存在 IRR 時返回 None
+    """
+    return irr(cash_flows, tolerance=tolerance)
+
+
+def sale_proceeds(inputs: CalculationInputs, year, loan_balance, annual_depreciation):
+    """
+    第 year 年末出售的淨收入（扣除仲介費、貸款餘額與資本利得稅）
+
+    法人以帳面價值（土地 + 建物扣除累計折舊）計算利得並適用法人稅率；
+    個人以購入成本計算，持有滿 LONG_TERM_HOLDING_YEARS 年適用長期稅率。
+    """
+    property_price = inputs.property_price
+    current_property_value = property_price * ((1 + inputs.annual_appreciation) ** year)
+    selling_costs = current_property_value * SELLING_COST_RATIO
+    final_loan_balance = max(0, loan_balance)
+
+    capital_gains_tax = 0
+    if inputs.is_corporate:
+        accumulated_depreciation = annual_depreciation * year
+        building_book_value = (property_price * inputs.building_ratio) - accumulated_depreciation
+        land_value = property_price * (1 - inputs.building_ratio)
+        book_value = building_book_value + land_value
+        capital_gain = current_property_value - book_value - selling_costs
+        if capital_gain > 0:
+            capital_gains_tax = capital_gain * inputs.corporate_tax_rate
+    else:  # Individual
+        total_upfront_costs = property_price * inputs.acquisition_cost_ratio
+        capital_gain = current_property_value - (property_price + total_upfront_costs)
+        if capital_gain > 0:
+            tax_rate = LONG_TERM_CAPITAL_GAINS_TAX_RATE if year >= LONG_TERM_HOLDING_YEARS \
+                else SHORT_TERM_CAPITAL_GAINS_TAX_RATE
+            capital_gains_tax = capital_gain * tax_rate
+
+    return current_property_value - selling_costs - final_loan_balance - capital_gains_tax
+
+
+def evaluate(params: Union[CalculationInputs, Mapping[str, Any]]) -> Result:
+    """
+    執行單一情境的完整財務試算
+
+    Args:
+        params: CalculationInputs，或 /calculate 的原始 payload
+
+    Returns:
+        Result: 試算結果
+    """
+    timer = current_timer()
+    inputs = params if isinstance(params, CalculationInputs) else parse_inputs(params)
+    if timer:
+        timer.mark('parse')
+
+    property_price = inputs.property_price
+    loan_interest_rate = inputs.loan_interest_rate
+    investment_period = inputs.investment_period
+
+    total_upfront_costs = property_price * inputs.acquisition_cost_ratio
+    down_payment_amount = property_price * inputs.down_payment_ratio
+    loan_amount = property_price - down_payment_amount
+
+    if inputs.loan_origin == 'mixed':
+        own_capital_for_down_payment_amount = min(inputs.own_capital_amount, down_payment_amount)
+        credit_loan_for_down_payment_amount = \
+            down_payment_amount - own_capital_for_down_payment_amount
+    else:
+        own_capital_for_down_payment_amount = down_payment_amount
+        credit_loan_for_down_payment_amount = 0
+
+    total_initial_investment = own_capital_for_down_payment_amount + total_upfront_costs + \
+        inputs.initial_furnishing_cost + inputs.corporate_setup_cost
+
+    (monthly_gross_revenue, monthly_operating_expenses, one_time_initial_income,
+     annual_renewal_fee) = operating_revenue(inputs)
+    if timer:
+        timer.mark('revenue')
+
+    # 年度攤還表由年度現金流、出售時餘額與年度預測共用
+    schedule = amortization_schedule(loan_amount, loan_interest_rate, inputs.loan_term,
+                                     investment_period)
+    monthly_payment = schedule.monthly_payment
+    if timer:
+        timer.mark('amortization')
+
+    credit_loan_payment = 0
+    if credit_loan_for_down_payment_amount > 0:
+        credit_loan_payment = annuity_payment(credit_loan_for_down_payment_amount,
+                                              inputs.credit_loan_rate, CREDIT_LOAN_PAYMENTS)
+
+    monthly_management_and_repairs = monthly_gross_revenue * inputs.management_fee_ratio
+    monthly_property_tax = (property_price * inputs.property_tax_rate) / 12
+    annual_insurance_cost = inputs.annual_insurance_cost
+    annual_tax_accountant_fee = inputs.annual_tax_accountant_fee
+    # 管理費、房屋稅、保險、會計師費等與融資無關的年度固定支出
+    annual_other_expenses = (monthly_management_and_repairs * 12) + (monthly_property_tax * 12) + \
+        annual_insurance_cost + annual_tax_accountant_fee
+
+    cash_flows = [-total_initial_investment]
+    useful_life = 22 if inputs.building_structure == 'wood' else 47
+    annual_depreciation = (property_price * inputs.building_ratio) / useful_life
+    annual_tax_y1 = 0
+    annual_tax_y2 = 0
+
+    # 追蹤實際利息支付
+    actual_interest_y1 = 0
+    actual_interest_y2 = 0
+    net_sale_proceeds = 0
+
+    for year in range(1, investment_period + 1):
+        is_renewal_year = (inputs.is_personal_lease and annual_renewal_fee > 0
+                           and year % inputs.lease_renewal_fee_frequency == 0)
+        current_year_renewal_fee = 0
+        if is_renewal_year:
+            current_year_renewal_fee = annual_renewal_fee * inputs.lease_renewal_fee_frequency
+
+        # 正確計算年度收入（EBITDA層級）
+        annual_gross_income = monthly_gross_revenue * 12 \
+            + (one_time_initial_income if year == 1 else 0) + current_year_renewal_fee
+        annual_operating_expenses = monthly_operating_expenses * 12
+        annual_ebitda = annual_gross_income - annual_operating_expenses
+
+        # 實際支付的貸款利息和本金
+        annual_interest_paid = schedule.interest_paid[year - 1]
+        annual_principal_paid = schedule.principal_paid[year - 1]
+
+        # 正確計算稅前現金流：EBITDA - 實際債務服務（本息攤還）- 管理費等其他費用
+        annual_debt_service_actual = \
+            annual_interest_paid + annual_principal_paid + (credit_loan_payment * 12)
+        pre_tax_cash_flow = annual_ebitda - annual_debt_service_actual - annual_other_expenses
+        post_tax_annual_cash_flow = pre_tax_cash_flow
+
+        if inputs.is_corporate:
+            # 法人稅計算：收入 - 各項費用 - 折舊
+            taxable_income = \
+                annual_ebitda - annual_interest_paid - annual_other_expenses - annual_depreciation
+            annual_tax = taxable_income * inputs.corporate_tax_rate if taxable_income > 0 else 0
+            if year == 1:
+                annual_tax_y1 = annual_tax
+            if year == 2:
+                annual_tax_y2 = annual_tax
+            post_tax_annual_cash_flow -= annual_tax
+
+        # 記錄實際利息支付
+        if year == 1:
+            actual_interest_y1 = annual_interest_paid
+        if year == 2:
+            actual_interest_y2 = annual_interest_paid
+
+        if year == investment_period:
+            net_sale_proceeds = sale_proceeds(inputs, year, schedule.balances[year],
+                                              annual_depreciation)
+            cash_flows.append(post_tax_annual_cash_flow + net_sale_proceeds)
+        else:
+            cash_flows.append(post_tax_annual_cash_flow)
+
+    # 年度預測：物業價值與年末貸款餘額
+    property_values = [property_price * ((1 + inputs.annual_appreciation) ** year)
+                       for year in range(1, investment_period + 1)]
+    if timer:
+        timer.mark('cash_flows')
+
+    irr_value = compute_irr(cash_flows)
+    if timer:
+        timer.mark('irr')
+
+    return Result(
+        inputs=inputs,
+        total_upfront_costs=total_upfront_costs,
+        total_initial_investment=total_initial_investment,
+        own_capital_for_down_payment=own_capital_for_down_payment_amount,
+        credit_loan_for_down_payment=credit_loan_for_down_payment_amount,
+        loan_amount=loan_amount,
+        monthly_gross_revenue=monthly_gross_revenue,
+        monthly_operating_expenses=monthly_operating_expenses,
+        one_time_initial_income=one_time_initial_income,
+        monthly_payment=monthly_payment,
+        credit_loan_payment=credit_loan_payment,
+        monthly_management_and_repairs=monthly_management_and_repairs,
+        monthly_property_tax=monthly_property_tax,
+        annual_depreciation=annual_depreciation,
+        annual_tax_y1=annual_tax_y1,
+        annual_tax_y2=annual_tax_y2,
+        actual_interest_y1=actual_interest_y1,
+        actual_interest_y2=actual_interest_y2,
+        net_sale_proceeds=net_sale_proceeds,
+        cash_flows=cash_flows,
+        irr=irr_value,
+        property_values=property_values,
+        loan_balances=schedule.balances[1:],
+    )
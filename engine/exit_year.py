@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+出場年度分析
+一次試算取得整個持有期間的營運現金流與攤還表，再逐年套用出售條件，
+得到每個出場年度的 IRR、權益乘數與出售淨收入，以及 IRR 最高的出場年度
+"""
+
+from typing import Any, List, Mapping, NamedTuple, Optional, Union
+
+from engine.core import evaluate, sale_proceeds
+from engine.inputs import MAX_INVESTMENT_PERIOD, CalculationInputs, MAN_EN, parse_inputs
+from engine.irr import irr
+
+# 出場年度分析的最長年數（與投資年數上限一致）
+MAX_EXIT_YEARS = MAX_INVESTMENT_PERIOD
+
+
+class ExitYear(NamedTuple):
+    """單一出場年度的結果（金額為日圓，IRR 為小數）"""
+    year: int
+    irr: Optional[float]
+    equity_multiple: float
+    net_sale_proceeds: float
+    cumulative_cash_flow: float     # 出場前累計營運現金流（不含出售收入）
+
+
+class ExitAnalysis(NamedTuple):
+    """各出場年度的分析結果"""
+    total_initial_investment: float
+    years: List[ExitYear]
+
+    @property
+    def optimal(self) -> Optional[ExitYear]:
+        """IRR 最高的出場年度（皆無解時為 None）"""
+        candidates = [exit_year for exit_year in self.years if exit_year.irr is not None]
+        return max(candidates, key=lambda exit_year: exit_year.irr, default=None)
+
+    def to_dict(self):
+        """轉換為 API 回應格式（萬円，IRR 為百分比）"""
+        optimal = self.optimal
+        return {
+            'optimal_exit_year': optimal.year if optimal else None,
+            'years': [
+                {
+                    'year': exit_year.year,
+                    'irr': exit_year.irr * 100 if exit_year.irr is not None else None,
+                    'equity_multiple': exit_year.equity_multiple,
+                    'net_sale_proceeds_jpy': exit_year.net_sale_proceeds / MAN_EN,
+                    'cumulative_cash_flow_jpy': exit_year.cumulative_cash_flow / MAN_EN,
+                }
+                for exit_year in self.years
+            ],
+        }
+
+    def to_compact_dict(self):
+        """精簡回應格式：各欄位為依年度排列的陣列（萬円，IRR 為百分比）"""
+        optimal = self.optimal
+        years = self.years
+        return {
+            'optimal_exit_year': optimal.year if optimal else None,
+            'year': [entry.year for entry in years],
+            'irr': [entry.irr * 100 if entry.irr is not None else None for entry in years],
+            'equity_multiple': [entry.equity_multiple for entry in years],
+            'net_sale_proceeds': [entry.net_sale_proceeds / MAN_EN for entry in years],
+            'cumulative_cash_flow': [entry.cumulative_cash_flow / MAN_EN for entry in years],
+        }
+
+
+def exit_year_analysis(params: Union[CalculationInputs, Mapping[str, Any]],
+                       max_years: int = None) -> ExitAnalysis:
+    """
+    試算第 1 ~ max_years 年出場的結果
+
+    營運現金流與出場年度無關，因此只需一次完整試算；每個出場年度的出售淨收入為 O(1)。
+    IRR 仍需對每個出場年度（現金流長度最多 N 年）各求解一次，整體為 O(N²) 的求解工作；
+    N 以 MAX_EXIT_YEARS（50 年）為上限，每次 NPV 評估最多約 1,300 項，成本可忽略。
+    每年都與 evaluate() 一樣從預設起始值求解：現金流多次變號時可能有多個 IRR，
+    沿用前一年度的解作為起始值會收斂到與 /calculate 不同的根。
+
+    Args:
+        params: CalculationInputs，或 /calculate 的原始 payload
+        max_years: 分析的最長持有年數，預設為投資年數
+
+    Returns:
+        ExitAnalysis: 各出場年度的結果
+    """
+    inputs = params if isinstance(params, CalculationInputs) else parse_inputs(params)
+    horizon = inputs.investment_period if max_years is None else max_years
+    if not 1 <= horizon <= MAX_EXIT_YEARS:
+        raise ValueError(f"出場年度分析的年數必須介於 1 與 {MAX_EXIT_YEARS} 之間")
+
+    result = evaluate(inputs.with_overrides(investment_period=horizon))
+    initial_investment = result.total_initial_investment
+    operating_cash_flows = result.cash_flows[1:]
+    operating_cash_flows[-1] -= result.net_sale_proceeds
+
+    years = []
+    cash_flows = [result.cash_flows[0]]
+    cumulative = 0.0
+    for year, operating_cash_flow in enumerate(operating_cash_flows, start=1):
+        proceeds = sale_proceeds(inputs, year, result.loan_balances[year - 1],
+                                 result.annual_depreciation)
+        cash_flows.append(operating_cash_flow + proceeds)
+        rate = irr(cash_flows)
+        cash_flows[-1] = operating_cash_flow
+
+        cumulative += operating_cash_flow
+        equity_multiple = 0
+        if initial_investment > 0:
+            equity_multiple = (cumulative + proceeds) / initial_investment
+        years.append(ExitYear(year, rate, equity_multiple, proceeds, cumulative))
+
+    return ExitAnalysis(initial_investment, years)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目標值反推（Goal Seek）
+對單一輸入參數求根，使指定 KPI 達到目標值，例如「IRR 8% 時最高可接受的房價」
+或「DSCR 1.3 所需的入住率」
+"""
+
+from typing import NamedTuple, Optional
+
+from engine.core import evaluate
+from engine.inputs import (
+    INTEGER_FIELDS, RATIO_FIELDS, SIGNED_FIELDS, CalculationInputs, resolve_payload_field,
+)
+from engine.result import Result
+from engine.roots import brent_root
+
+# IRR 無解（現金流始終未轉正）時 KPI 無定義，目標函數在該處視為缺口而不是固定值，
+# 以免在有定義與無定義的交界處產生假的變號
+GOAL_SEEK_KPIS = {
+    'irr': lambda result: result.irr * 100 if result.irr is not None else None,
+    'cash_on_cash_return': lambda result: result.cash_on_cash_return,
+    'dscr': lambda result: result.dscr,
+}
+
+# 達成值與目標值的容許差距，超過時（例如 KPI 在解附近不連續）不視為收斂
+KPI_TOLERANCES = {
+    'irr': 0.01,
+    'cash_on_cash_return': 0.01,
+    'dscr': 0.001,
+}
+
+# 未指定搜尋區間時，自基準值向兩側擴張的次數上限（每次寬度加倍）
+MAX_BRACKET_EXPANSIONS = 12
+# 逼近 KPI 無定義區域邊界的二分次數
+EDGE_BISECTIONS = 16
+MAX_EVALUATIONS = 100
+
+
+class _EvaluationLimit(Exception):
+    """試算次數超過上限"""
+
+
+class _UndefinedKPI(Exception):
+    """求根過程中 KPI 無定義"""
+
+
+class GoalSeekResult(NamedTuple):
+    """目標值反推結果（value 為 payload 單位，找不到時為 None）"""
+    key: str
+    kpi: str
+    target: float
+    base_value: float
+    value: Optional[float]
+    achieved: Optional[float]
+    evaluations: int
+    result: Optional[Result]
+    message: str = ''
+
+    @property
+    def converged(self):
+        if self.achieved is None:
+            return False
+        return abs(self.achieved - self.target) <= KPI_TOLERANCES[self.kpi]
+
+    def to_dict(self):
+        response = {
+            'field': self.key,
+            'kpi': self.kpi,
+            'target': self.target,
+            'base_value': self.base_value,
+            'value': self.value,
+            'achieved': self.achieved,
+            'converged': self.converged,
+            'evaluations': self.evaluations,
+        }
+        if self.result is not None:
+            response['kpi_at_solution'] = self.result.to_dict()['kpi']
+        if self.message:
+            response['message'] = self.message
+        return response
+
+
+def goal_seek(base: CalculationInputs, key: str, kpi: str, target: float, low: float = None,
+              high: float = None, tolerance: float = None) -> GoalSeekResult:
+    """
+    反推使 KPI 等於目標值的參數值
+
+    Args:
+        base: 基準輸入（parse_inputs() 的結果）
+        key: 要調整的 payload 欄位名稱（例如 propertyPrice、occupancyRate）
+        kpi: irr / cash_on_cash_return（百分比）或 dscr
+        target: 目標值
+        low / high: 搜尋區間（payload 單位）；省略時自基準值向兩側擴張直到 KPI 跨過目標值
+        tolerance: 參數值的容許誤差（payload 單位），預設為基準值的百萬分之一
+
+    Returns:
+        GoalSeekResult: 反推結果
+    """
+    if not isinstance(kpi, str) or kpi not in GOAL_SEEK_KPIS:
+        raise ValueError(f"kpi 必須是 {', '.join(GOAL_SEEK_KPIS)} 之一")
+    field, scale = resolve_payload_field(key, base)
+    if field in INTEGER_FIELDS:
+        raise ValueError(f"{key} 為整數參數，不支援反推")
+    if (low is None) != (high is None):
+        raise ValueError("low 與 high 必須同時指定")
+    lower_bound, upper_bound = _field_bounds(field)
+    if low is not None and not (lower_bound <= low and high <= upper_bound):
+        raise ValueError(f"{key} 的搜尋區間超出合理範圍")
+
+    kpi_of = GOAL_SEEK_KPIS[kpi]
+    base_value = getattr(base, field) / scale
+    if tolerance is None:
+        tolerance = 1e-6 * max(1.0, abs(base_value))
+
+    evaluated = {}
+
+    def objective(value):
+        """KPI 與目標值的差；KPI 無定義時返回 None"""
+        if value not in evaluated:
+            if len(evaluated) >= MAX_EVALUATIONS:
+                raise _EvaluationLimit()
+            try:
+                result = evaluate(base.with_overrides(**{field: value * scale}))
+            except OverflowError:
+                raise ValueError(f"{key} = {value} 超出可計算的範圍")
+            achieved = kpi_of(result)
+            evaluated[value] = (None if achieved is None else achieved - target, result)
+        return evaluated[value][0]
+
+    def defined_objective(value):
+        difference = objective(value)
+        if difference is None:
+            raise _UndefinedKPI()
+        return difference
+
+    def finish(value, message=''):
+        if value is None:
+            return GoalSeekResult(key, kpi, target, base_value, None, None, len(evaluated), None,
+                                  message)
+        objective(value)
+        result = evaluated[value][1]
+        goal = GoalSeekResult(key, kpi, target, base_value, value, kpi_of(result), len(evaluated),
+                              result)
+        if not goal.converged:
+            goal = goal._replace(message="KPI 在解附近不連續或無定義，無法精確達到目標值")
+        return goal
+
+    try:
+        if low is not None:
+            if low >= high:
+                raise ValueError("low 必須小於 high")
+            bracket = _sign_change(objective, low, high)
+            if bracket is None:
+                return finish(None, "搜尋區間內 KPI 未跨過目標值")
+        else:
+            bracket = _expand_bracket(objective, base_value, field)
+            if bracket is None:
+                return finish(None, "在合理範圍內找不到可達成目標的參數值")
+
+        a, b = bracket
+        value = brent_root(defined_objective, a, b, tolerance=tolerance,
+                           f_low=objective(a), f_high=objective(b))
+        if value is None:
+            return finish(None, "求根未在迭代上限內收斂")
+        return finish(value)
+    except _EvaluationLimit:
+        return finish(None, f"超過 {MAX_EVALUATIONS} 次試算仍未收斂")
+    except _UndefinedKPI:
+        return finish(None, "搜尋區間內有 KPI 無法計算的參數值")
+
+
+def _field_bounds(field):
+    """參數的合理範圍（payload 單位）"""
+    lower_bound = float('-inf') if field in SIGNED_FIELDS else 0.0
+    upper_bound = 100.0 if field in RATIO_FIELDS else float('inf')
+    return lower_bound, upper_bound
+
+
+def _expand_bracket(objective, base_value, field):
+    """自基準值向兩側加倍擴張，返回目標函數變號的區間；找不到時返回 None"""
+    lower_bound, upper_bound = _field_bounds(field)
+
+    if objective(base_value) == 0:
+        return base_value, base_value
+    # 每次只檢查新擴張的一段，基準值的 KPI 無定義時仍可在外側找到變號區間
+    inner_low = inner_high = base_value
+    width = max(abs(base_value) * 0.5, 1.0)
+    for _ in range(MAX_BRACKET_EXPANSIONS):
+        low = max(lower_bound, base_value - width)
+        high = min(upper_bound, base_value + width)
+        bracket = (_sign_change(objective, low, inner_low)
+                   or _sign_change(objective, inner_high, high))
+        if bracket is not None:
+            return bracket
+        if low == lower_bound and high == upper_bound:
+            break
+        inner_low, inner_high = low, high
+        width *= 2
+    return None
+
+
+def _sign_change(objective, low, high):
+    """
+    [low, high] 兩端目標函數變號時返回該區間
+
+    一端 KPI 無定義時，先以二分法逼近有定義區域的邊界，以邊界上的值判斷是否變號；
+    兩端皆無定義時返回 None。
+    """
+    if low == high:
+        return None
+    f_low, f_high = objective(low), objective(high)
+    if f_low is None and f_high is None:
+        return None
+    if f_low is None:
+        low = _defined_edge(objective, high, low)
+        f_low = objective(low)
+    elif f_high is None:
+        high = _defined_edge(objective, low, high)
+        f_high = objective(high)
+    if f_low * f_high <= 0:
+        return low, high
+    return None
+
+
+def _defined_edge(objective, defined, undefined):
+    """在 defined（KPI 有定義）與 undefined 之間二分，返回最接近無定義區域的有定義點"""
+    for _ in range(EDGE_BISECTIONS):
+        middle = (defined + undefined) / 2
+        if objective(middle) is None:
+            undefined = middle
+        else:
+            defined = middle
+    return defined
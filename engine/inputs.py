@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+計算引擎輸入參數
+將前端送來的原始 payload 轉換為正規化後、單位一致（日圓、小數比率）的輸入物件
+"""
+
+from typing import Any, Mapping, NamedTuple, Optional
+
+# 萬円換算
+MAN_EN = 10000
+
+# 投資（持有）年數上限：現金流與向量化試算的陣列大小與年數成正比
+MAX_INVESTMENT_PERIOD = 50
+
+# 營運模式
+AIRBNB = 'airbnb'
+PERSONAL_LEASE = 'personalLease'
+COMMERCIAL_LEASE = 'commercialLease'
+
+
+def safe_float(s, default=0.0):
+    try:
+        return float(s) if s else default
+    except (ValueError, TypeError):
+        return default
+
+
+def safe_int(s, default=0):
+    try:
+        return int(s) if s else default
+    except (ValueError, TypeError):
+        return default
+
+
+class CalculationInputs(NamedTuple):
+    """
+    正規化後的計算輸入
+
+    金額一律為日圓、比率一律為小數；與所選營運模式或貸款來源無關的欄位保持為 0，
+    因此兩個語意相同的 payload 會得到相等（且可雜湊）的輸入物件。
+    """
+    monetization_model: Optional[str] = None
+    purchase_type: Optional[str] = None
+    loan_origin: Optional[str] = None
+    building_structure: Optional[str] = None
+
+    # 購置與融資
+    property_price: float = 0.0
+    down_payment_ratio: float = 0.0
+    acquisition_cost_ratio: float = 0.0
+    exchange_rate: float = 0.0
+    initial_furnishing_cost: float = 0.0
+    loan_interest_rate: float = 0.0
+    loan_term: int = 0
+    credit_loan_rate: float = 0.0
+    own_capital_amount: float = 0.0
+
+    # 持有成本與稅務
+    management_fee_ratio: float = 0.0
+    property_tax_rate: float = 0.0
+    annual_appreciation: float = 0.0
+    investment_period: int = 0
+    building_ratio: float = 0.0
+    corporate_tax_rate: float = 0.0
+    annual_insurance_cost: float = 0.0
+    corporate_setup_cost: float = 0.0
+    annual_tax_accountant_fee: float = 0.0
+
+    # 民宿 (Airbnb) 模式
+    operating_days_cap: int = 0
+    occupancy_rate: float = 0.0
+    daily_rate: float = 0.0
+    platform_fee_rate: float = 0.0
+    cleaning_fee: float = 0.0
+    avg_stay_duration: float = 0.0
+    avg_guests: float = 0.0
+    base_occupancy_for_fee: float = 0.0
+    extra_guest_fee: float = 0.0
+    peak_season_markup: float = 0.0
+    monthly_utilities: float = 0.0
+
+    # 租賃模式（個人 / 商業）
+    monthly_rent: float = 0.0
+    vacancy_rate: float = 0.0
+    initial_lease_costs_ratio: float = 0.0
+    lease_utilities: float = 0.0
+    lease_renewal_fee_frequency: float = 0.0
+    lease_renewal_fee_amount: float = 0.0
+
+    @property
+    def is_airbnb(self) -> bool:
+        return self.monetization_model == AIRBNB
+
+    @property
+    def is_personal_lease(self) -> bool:
+        return self.monetization_model == PERSONAL_LEASE
+
+    @property
+    def is_corporate(self) -> bool:
+        return self.purchase_type == 'corporate'
+
+    def with_overrides(self, **changes) -> 'CalculationInputs':
+        """返回套用指定欄位變更後的新輸入物件"""
+        return self._replace(**changes)
+
+    def to_dict(self) -> dict:
+        """轉換為字典格式（欄位名稱為 snake_case）"""
+        return self._asdict()
+
+
+def parse_inputs(params: Mapping[str, Any]) -> CalculationInputs:
+    """
+    解析 /calculate 的原始參數
+
+    Args:
+        params: 前端送來的 payload（萬円 / 百分比單位）
+
+    Returns:
+        CalculationInputs: 正規化後的輸入
+    """
+    params = params or {}
+    monetization_model = params.get('monetizationModel')
+    purchase_type = params.get('purchaseType')
+    loan_origin = params.get('loanOrigin')
+    is_corporate = purchase_type == 'corporate'
+
+    values = {
+        'monetization_model': monetization_model,
+        'purchase_type': purchase_type,
+        'loan_origin': loan_origin,
+        'building_structure': params.get('buildingStructure'),
+        'property_price': safe_float(params.get('propertyPrice')) * MAN_EN,
+        'down_payment_ratio': safe_float(params.get('downPaymentRatio')) / 100,
+        'acquisition_cost_ratio': safe_float(params.get('acquisitionCostRatio')) / 100,
+        'exchange_rate': safe_float(params.get('exchangeRate')),
+        'initial_furnishing_cost': safe_float(params.get('initialFurnishingCost')) * MAN_EN,
+        'management_fee_ratio': safe_float(params.get('managementFeeRatio')) / 100,
+        'property_tax_rate': safe_float(params.get('propertyTaxRate')) / 100,
+        'annual_appreciation': safe_float(params.get('annualAppreciation')) / 100,
+        'investment_period': safe_int(params.get('investmentPeriod')),
+        'building_ratio': safe_float(params.get('buildingRatio')) / 100,
+        'corporate_tax_rate': safe_float(params.get('corporateTaxRate')) / 100,
+        'annual_insurance_cost': safe_float(params.get('annualInsuranceCost')) * MAN_EN,
+    }
+
+    # 貸款條件依貸款來源而定
+    if loan_origin == 'japan' or loan_origin == 'mixed':
+        values['loan_interest_rate'] = safe_float(params.get('japanLoanInterestRate')) / 100
+        values['loan_term'] = safe_int(params.get('japanLoanTerm'))
+    elif loan_origin == 'taiwan':
+        values['loan_interest_rate'] = safe_float(params.get('taiwanLoanInterestRate')) / 100
+        values['loan_term'] = safe_int(params.get('taiwanLoanTerm'))
+
+    if loan_origin == 'mixed':
+        values['own_capital_amount'] = safe_float(params.get('ownCapitalAmount')) * MAN_EN
+        values['credit_loan_rate'] = safe_float(params.get('creditLoanRate')) / 100
+
+    if is_corporate:
+        values['corporate_setup_cost'] = safe_float(params.get('corporateSetupCost')) * MAN_EN
+        values['annual_tax_accountant_fee'] = \
+            safe_float(params.get('annualTaxAccountantFee')) * MAN_EN
+
+    if monetization_model == AIRBNB:
+        values.update({
+            'operating_days_cap': safe_int(params.get('operatingDaysCap')),
+            'occupancy_rate': safe_float(params.get('occupancyRate')) / 100,
+            'daily_rate': safe_float(params.get('dailyRate')),
+            'platform_fee_rate': safe_float(params.get('platformFeeRate')) / 100,
+            'cleaning_fee': safe_float(params.get('cleaningFee')) * MAN_EN,
+            'avg_stay_duration': safe_float(params.get('avgStayDuration')),
+            'avg_guests': safe_float(params.get('avgGuests')),
+            'base_occupancy_for_fee': safe_float(params.get('baseOccupancyForFee')),
+            'extra_guest_fee': safe_float(params.get('extraGuestFee')) * MAN_EN,
+            'peak_season_markup': safe_float(params.get('peakSeasonMarkup')) / 100,
+            'monthly_utilities': safe_float(params.get('monthlyUtilities')) * MAN_EN,
+        })
+    elif monetization_model == PERSONAL_LEASE:
+        values.update({
+            'monthly_rent': safe_float(params.get('monthlyRent')) * MAN_EN,
+            'vacancy_rate': safe_float(params.get('vacancyRate')) / 100,
+            'initial_lease_costs_ratio': safe_float(params.get('initialLeaseCostsRatio')),
+            'lease_utilities': safe_float(params.get('leaseUtilities')) * MAN_EN,
+            'lease_renewal_fee_frequency': safe_float(params.get('leaseRenewalFeeFrequency')),
+            'lease_renewal_fee_amount': safe_float(params.get('leaseRenewalFeeAmount')),
+        })
+    else:  # Commercial Lease
+        values.update({
+            'monthly_rent': safe_float(params.get('monthlyRentCommercial')) * MAN_EN,
+            'vacancy_rate': safe_float(params.get('vacancyRateCommercial')) / 100,
+            'initial_lease_costs_ratio': safe_float(params.get('initialLeaseCostsRatioCommercial')),
+        })
+
+    return CalculationInputs(**values)
+
+
+# 前端 payload 數值欄位 → (CalculationInputs 欄位, 單位換算倍率)
+# 供模擬、敏感度分析等以 payload 名稱指定參數的功能使用；換算後即為 parse_inputs() 的結果
+PAYLOAD_FIELDS = {
+    'propertyPrice': ('property_price', MAN_EN),
+    'downPaymentRatio': ('down_payment_ratio', 0.01),
+    'acquisitionCostRatio': ('acquisition_cost_ratio', 0.01),
+    'exchangeRate': ('exchange_rate', 1),
+    'initialFurnishingCost': ('initial_furnishing_cost', MAN_EN),
+    'japanLoanInterestRate': ('loan_interest_rate', 0.01),
+    'taiwanLoanInterestRate': ('loan_interest_rate', 0.01),
+    'japanLoanTerm': ('loan_term', 1),
+    'taiwanLoanTerm': ('loan_term', 1),
+    'creditLoanRate': ('credit_loan_rate', 0.01),
+    'ownCapitalAmount': ('own_capital_amount', MAN_EN),
+    'managementFeeRatio': ('management_fee_ratio', 0.01),
+    'propertyTaxRate': ('property_tax_rate', 0.01),
+    'annualAppreciation': ('annual_appreciation', 0.01),
+    'investmentPeriod': ('investment_period', 1),
+    'buildingRatio': ('building_ratio', 0.01),
+    'corporateTaxRate': ('corporate_tax_rate', 0.01),
+    'annualInsuranceCost': ('annual_insurance_cost', MAN_EN),
+    'corporateSetupCost': ('corporate_setup_cost', MAN_EN),
+    'annualTaxAccountantFee': ('annual_tax_accountant_fee', MAN_EN),
+    'operatingDaysCap': ('operating_days_cap', 1),
+    'occupancyRate': ('occupancy_rate', 0.01),
+    'dailyRate': ('daily_rate', 1),
+    'platformFeeRate': ('platform_fee_rate', 0.01),
+    'cleaningFee': ('cleaning_fee', MAN_EN),
+    'avgStayDuration': ('avg_stay_duration', 1),
+    'avgGuests': ('avg_guests', 1),
+    'baseOccupancyForFee': ('base_occupancy_for_fee', 1),
+    'extraGuestFee': ('extra_guest_fee', MAN_EN),
+    'peakSeasonMarkup': ('peak_season_markup', 0.01),
+    'monthlyUtilities': ('monthly_utilities', MAN_EN),
+    'monthlyRent': ('monthly_rent', MAN_EN),
+    'vacancyRate': ('vacancy_rate', 0.01),
+    'initialLeaseCostsRatio': ('initial_lease_costs_ratio', 1),
+    'leaseUtilities': ('lease_utilities', MAN_EN),
+    'leaseRenewalFeeFrequency': ('lease_renewal_fee_frequency', 1),
+    'leaseRenewalFeeAmount': ('lease_renewal_fee_amount', 1),
+    'monthlyRentCommercial': ('monthly_rent', MAN_EN),
+    'vacancyRateCommercial': ('vacancy_rate', 0.01),
+    'initialLeaseCostsRatioCommercial': ('initial_lease_costs_ratio', 1),
+}
+
+# 整數欄位（年數、天數），不適合以連續分佈或小數步進調整
+INTEGER_FIELDS = frozenset(('loan_term', 'investment_period', 'operating_days_cap'))
+
+# 百分比欄位的合理上限（超過 100% 沒有意義）
+RATIO_FIELDS = frozenset(('occupancy_rate', 'vacancy_rate', 'down_payment_ratio', 'building_ratio'))
+# 允許為負值的欄位，其餘欄位皆不小於 0
+SIGNED_FIELDS = frozenset(('annual_appreciation',))
+
+_AIRBNB_KEYS = frozenset((
+    'operatingDaysCap', 'occupancyRate', 'dailyRate', 'platformFeeRate', 'cleaningFee',
+    'avgStayDuration', 'avgGuests', 'baseOccupancyForFee', 'extraGuestFee', 'peakSeasonMarkup',
+    'monthlyUtilities',
+))
+_PERSONAL_LEASE_KEYS = frozenset((
+    'monthlyRent', 'vacancyRate', 'initialLeaseCostsRatio', 'leaseUtilities',
+    'leaseRenewalFeeFrequency', 'leaseRenewalFeeAmount',
+))
+_COMMERCIAL_LEASE_KEYS = frozenset((
+    'monthlyRentCommercial', 'vacancyRateCommercial', 'initialLeaseCostsRatioCommercial',
+))
+
+
+def payload_field_applies(key: str, inputs: CalculationInputs) -> bool:
+    """payload 欄位在此輸入的營運模式、貸款來源與購買方式下是否會被 parse_inputs() 採用"""
+    if key in _AIRBNB_KEYS:
+        return inputs.is_airbnb
+    if key in _PERSONAL_LEASE_KEYS:
+        return inputs.is_personal_lease
+    if key in _COMMERCIAL_LEASE_KEYS:
+        return not inputs.is_airbnb and not inputs.is_personal_lease
+    if key in ('japanLoanInterestRate', 'japanLoanTerm'):
+        return inputs.loan_origin in ('japan', 'mixed')
+    if key in ('taiwanLoanInterestRate', 'taiwanLoanTerm'):
+        return inputs.loan_origin == 'taiwan'
+    if key in ('ownCapitalAmount', 'creditLoanRate'):
+        return inputs.loan_origin == 'mixed'
+    if key in ('corporateSetupCost', 'annualTaxAccountantFee'):
+        return inputs.is_corporate
+    return key in PAYLOAD_FIELDS
+
+
+def resolve_payload_field(key: str, inputs: CalculationInputs):
+    """
+    將 payload 欄位名稱轉為 (CalculationInputs 欄位, 單位換算倍率)
+
+    Raises:
+        ValueError: 未知欄位，或該欄位不適用於目前的營運模式 / 貸款設定
+    """
+    if key not in PAYLOAD_FIELDS:
+        raise ValueError(f"不支援的參數: {key}")
+    if not payload_field_applies(key, inputs):
+        raise ValueError(f"{key} 不適用於目前的營運模式或貸款設定")
+    return PAYLOAD_FIELDS[key]
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IRR (內部報酬率) 求解器
+
+以 Newton 法搭配 NPV 的解析導數求解，NPV 與導數以 Horner 法在折現因子 v = 1 / (1 + r)
+上同時計算，不需逐期計算 (1 + r) ** i；Newton 失敗時改用有界的 Brent 法。
+irr_matrix() 可一次求解整個現金流矩陣（每列一個情境）。
+"""
+
+import math
+
+from engine.roots import BRENT_MAX_ITERATIONS, DEFAULT_TOLERANCE, brent_root
+
+# IRR 搜尋範圍
+IRR_LOWER_BOUND = -0.99
+IRR_UPPER_BOUND = 10.0
+
+# 兩端 NPV 同號時（非典型現金流可能有多個根），依序在這些格點間尋找變號區間
+BRACKET_GRID = (-0.99, -0.9, -0.75, -0.5, -0.25, -0.1, 0.0, 0.05, 0.1, 0.2, 0.35, 0.5, 0.75,
+                1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0)
+
+NEWTON_MAX_ITERATIONS = 50
+
+
+def _npv_and_derivative(cash_flows, rate):
+    """以 Horner 法同時計算 NPV 與 dNPV/dr"""
+    discount = 1 / (1 + rate)
+    value = cash_flows[-1]
+    slope = 0.0
+    for index in range(len(cash_flows) - 2, -1, -1):
+        slope = slope * discount + value
+        value = value * discount + cash_flows[index]
+    # dv/dr = -v²
+    return value, -slope * discount * discount
+
+
+def npv(cash_flows, rate):
+    """計算 NPV（第 0 期不折現）"""
+    return _npv_and_derivative(cash_flows, rate)[0]
+
+
+def _last_period(cash_flows):
+    """最後一筆非零現金流的期數（忽略尾端補上的 0）"""
+    for index in range(len(cash_flows) - 1, 0, -1):
+        if cash_flows[index] != 0:
+            return index
+    return 1
+
+
+def initial_guess(cash_flows):
+    """以總流入 / 總流出的幾何平均報酬作為 Newton 法的起始值"""
+    inflow = sum(cf for cf in cash_flows if cf > 0)
+    outflow = -sum(cf for cf in cash_flows if cf < 0)
+    periods = _last_period(cash_flows)
+    if inflow <= 0 or outflow <= 0:
+        return 0.1
+    guess = (inflow / outflow) ** (1 / periods) - 1
+    return min(max(guess, IRR_LOWER_BOUND / 2), 1.0)
+
+
+def newton_irr(cash_flows, guess=None, tolerance=DEFAULT_TOLERANCE,
+               max_iterations=NEWTON_MAX_ITERATIONS):
+    """
+    Newton 法求 IRR
+
+    Returns:
+        float or None: 收斂時返回 IRR，發散或離開搜尋範圍時返回 None
+    """
+    rate = initial_guess(cash_flows) if guess is None else guess
+    for _ in range(max_iterations):
+        value, derivative = _npv_and_derivative(cash_flows, rate)
+        if derivative == 0 or not math.isfinite(derivative):
+            return None
+        step = value / derivative
+        rate -= step
+        if not (IRR_LOWER_BOUND < rate < IRR_UPPER_BOUND):
+            return None
+        if abs(step) <= tolerance * max(1.0, abs(rate)):
+            return rate
+    return None
+
+
+def find_bracket(cash_flows):
+    """
+    尋找 NPV 變號的區間，優先選擇最接近 0% 的區間
+
+    Returns:
+        tuple or None: (low, high)，找不到時返回 None
+    """
+    values = [npv(cash_flows, rate) for rate in BRACKET_GRID]
+    pairs = sorted(range(len(BRACKET_GRID) - 1),
+                   key=lambda i: min(abs(BRACKET_GRID[i]), abs(BRACKET_GRID[i + 1])))
+    for i in pairs:
+        if values[i] == 0 or values[i] * values[i + 1] < 0:
+            return BRACKET_GRID[i], BRACKET_GRID[i + 1]
+    if values[-1] == 0:
+        return BRACKET_GRID[-2], BRACKET_GRID[-1]
+    return None
+
+
+def brent_irr(cash_flows, low=IRR_LOWER_BOUND, high=IRR_UPPER_BOUND, tolerance=DEFAULT_TOLERANCE,
+              max_iterations=BRENT_MAX_ITERATIONS):
+    """
+    Brent 法在 [low, high] 內求 IRR
+
+    Returns:
+        float or None: 區間兩端 NPV 同號（無根）或未在 max_iterations 次內收斂時返回 None
+    """
+    return brent_root(lambda rate: npv(cash_flows, rate), low, high, tolerance, max_iterations)
+
+
+def irr(cash_flows, guess=None, tolerance=DEFAULT_TOLERANCE):
+    """
+    求解單一現金流序列的 IRR
+
+    Returns:
+        float or None: 搜尋範圍內不存在 IRR（例如現金流全為同號）時返回 None
+    """
+    cash_flows = [float(cf) for cf in cash_flows]
+    if not any(cf > 0 for cf in cash_flows) or not any(cf < 0 for cf in cash_flows):
+        return None
+    rate = newton_irr(cash_flows, guess, tolerance)
+    if rate is not None:
+        return rate
+    return _bracketed_irr(cash_flows, tolerance)
+
+
+def _bracketed_irr(cash_flows, tolerance):
+    """Newton 失敗時的備援：先在完整範圍內用 Brent 法，兩端同號時再搜尋變號區間"""
+    rate = brent_irr(cash_flows, tolerance=tolerance)
+    if rate is not None:
+        return rate
+    bracket = find_bracket(cash_flows)
+    if bracket is None:
+        return None
+    return brent_irr(cash_flows, bracket[0], bracket[1], tolerance=tolerance)
+
+
+def irr_matrix(cash_flows, guess=None, tolerance=DEFAULT_TOLERANCE,
+               max_iterations=NEWTON_MAX_ITERATIONS):
+    """
+    向量化求解現金流矩陣每一列的 IRR
+
+    所有列同時以 Newton 法迭代；未收斂的少數列改以 Brent 法逐列求解。
+
+    Args:
+        cash_flows: (情境數, 期數) 的現金流矩陣
+        guess: 起始值（純量或每列一個），預設依現金流估計
+
+    Returns:
+        np.ndarray: 每列的 IRR，無解時為 NaN
+    """
+    import numpy as np
+
+    cash_flows = np.asarray(cash_flows, dtype=np.float64)
+    if cash_flows.ndim == 1:
+        cash_flows = cash_flows[None, :]
+    size, periods = cash_flows.shape
+    result = np.full(size, np.nan)
+    if size == 0 or periods < 2:
+        return result
+
+    inflow = np.where(cash_flows > 0, cash_flows, 0).sum(axis=1)
+    outflow = -np.where(cash_flows < 0, cash_flows, 0).sum(axis=1)
+    solvable = (inflow > 0) & (outflow > 0)
+
+    if guess is None:
+        # 以最後一筆非零現金流的期數估計起始值，與逐列求解一致
+        nonzero = cash_flows[:, 1:] != 0
+        last_nonzero = periods - 1 - nonzero[:, ::-1].argmax(axis=1)
+        last_period = np.where(nonzero.any(axis=1), last_nonzero, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = (inflow / outflow) ** (1 / last_period) - 1
+        rate = np.clip(np.where(solvable, rate, 0.1), IRR_LOWER_BOUND / 2, 1.0)
+    else:
+        rate = np.broadcast_to(np.asarray(guess, dtype=np.float64), (size,)).copy()
+
+    # 每次迭代只計算尚未收斂的列，少數難收斂的列不會拖慢整體
+    active = np.flatnonzero(solvable)
+    flows = cash_flows[active]
+    rate = rate[active]
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for _ in range(max_iterations):
+            if active.size == 0:
+                break
+            discount = 1 / (1 + rate)
+            value = flows[:, -1].copy()
+            slope = np.zeros(active.size)
+            for column in range(periods - 2, -1, -1):
+                slope = slope * discount + value
+                value = value * discount + flows[:, column]
+            step = value / (-slope * discount * discount)
+            rate = rate - step
+
+            # 發散的列保留給 Brent 法
+            diverged = ~((rate > IRR_LOWER_BOUND) & (rate < IRR_UPPER_BOUND) & np.isfinite(rate))
+            converged = ~diverged & (np.abs(step) <= tolerance * np.maximum(1.0, np.abs(rate)))
+            result[active[converged]] = rate[converged]
+            keep = ~(converged | diverged)
+            if not keep.all():
+                active, flows, rate = active[keep], flows[keep], rate[keep]
+
+    for row in np.flatnonzero(solvable & np.isnan(result)):
+        rate = _bracketed_irr(cash_flows[row].tolist(), tolerance)
+        if rate is not None:
+            result[row] = rate
+    return result
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+蒙地卡羅風險模擬
+對入住率、房價 (ADR)、空置率、利率、增值率、匯率等假設抽樣，
+以向量化引擎一次試算所有路徑，彙整 IRR / CoCR / DSCR 的分佈
+
+注意：此模組會匯入 NumPy，僅供 API 路由延遲匯入使用
+"""
+
+import math
+from typing import Any, Mapping, NamedTuple
+
+import numpy as np
+
+from engine.inputs import (
+    INTEGER_FIELDS, PAYLOAD_FIELDS, RATIO_FIELDS, SIGNED_FIELDS, CalculationInputs,
+    resolve_payload_field,
+)
+from engine.irr import irr_matrix
+from engine.vectorized import BatchResult, broadcast_inputs, check_workload, evaluate_arrays
+
+DEFAULT_PATHS = 10000
+MIN_PATHS = 100
+MAX_PATHS = 100000
+DEFAULT_SEED = 0
+DEFAULT_BINS = 20
+MAX_BINS = 200
+
+PERCENTILES = (5, 10, 25, 50, 75, 90, 95)
+DISTRIBUTION_TYPES = ('normal', 'lognormal', 'uniform', 'triangular')
+
+
+class Distribution(NamedTuple):
+    """單一參數的抽樣分佈（payload 單位，例如百分比、萬円）"""
+    key: str
+    kind: str
+    params: tuple
+    low: float
+    high: float
+
+    @property
+    def field(self):
+        return PAYLOAD_FIELDS[self.key][0]
+
+    @property
+    def scale(self):
+        return PAYLOAD_FIELDS[self.key][1]
+
+    def sample(self, rng, size):
+        """抽樣並換算為引擎單位（日圓、小數比率）"""
+        if self.kind == 'normal':
+            values = rng.normal(self.params[0], self.params[1], size)
+        elif self.kind == 'lognormal':
+            # 以變數本身的平均與標準差參數化
+            mean, std = self.params
+            sigma2 = np.log1p((std / mean) ** 2)
+            values = rng.lognormal(np.log(mean) - sigma2 / 2, np.sqrt(sigma2), size)
+        elif self.kind == 'uniform':
+            values = rng.uniform(self.params[0], self.params[1], size)
+        else:
+            values = rng.triangular(self.params[0], self.params[1], self.params[2], size)
+        return np.clip(values, self.low, self.high) * self.scale
+
+
+def _number(spec, name, default=None):
+    """讀取分佈參數；省略時使用 default（min / max 的預設值可為無限大）"""
+    value = spec.get(name)
+    if value is None:
+        if default is None:
+            raise ValueError(f"缺少分佈參數: {name}")
+        return default
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"分佈參數必須是數字: {name}")
+    # float() 接受 "inf" / "nan"，會讓抽樣溢位或所有 KPI 變成 NaN
+    if not math.isfinite(value):
+        raise ValueError(f"分佈參數必須是有限數值: {name}")
+    return value
+
+
+def parse_distribution(key: str, spec: Mapping[str, Any], base: CalculationInputs) -> Distribution:
+    """
+    解析單一參數的分佈設定
+
+    格式（payload 單位）：
+        {"dist": "normal", "mean": 70, "std": 10}       # mean 省略時使用基準值
+        {"dist": "lognormal", "mean": 15000, "std": 3000}
+        {"dist": "uniform", "low": 1.0, "high": 2.5}
+        {"dist": "triangular", "low": 60, "mode": 75, "high": 85}
+    可另以 min / max 截斷抽樣結果。
+    """
+    field, scale = resolve_payload_field(key, base)
+    if field in INTEGER_FIELDS:
+        raise ValueError(f"{key} 為整數參數，不支援連續分佈")
+    if not isinstance(spec, Mapping):
+        raise ValueError(f"{key} 的分佈設定必須是物件")
+
+    kind = spec.get('dist', 'normal')
+    if kind not in DISTRIBUTION_TYPES:
+        raise ValueError(f"{key} 的分佈類型必須是 {', '.join(DISTRIBUTION_TYPES)} 之一")
+
+    base_value = getattr(base, field) / scale
+    if kind in ('normal', 'lognormal'):
+        mean = _number(spec, 'mean', base_value)
+        std = _number(spec, 'std')
+        if std < 0 or (kind == 'lognormal' and mean <= 0):
+            raise ValueError(f"{key} 的分佈參數不合理")
+        params = (mean, std)
+    elif kind == 'uniform':
+        params = (_number(spec, 'low'), _number(spec, 'high'))
+        if params[0] > params[1]:
+            raise ValueError(f"{key} 的 low 不可大於 high")
+    else:
+        params = (_number(spec, 'low'), _number(spec, 'mode', base_value), _number(spec, 'high'))
+        if not params[0] <= params[1] <= params[2] or params[0] == params[2]:
+            raise ValueError(f"{key} 必須滿足 low <= mode <= high")
+
+    low = -np.inf if field in SIGNED_FIELDS else 0.0
+    high = 100.0 if field in RATIO_FIELDS else np.inf
+    low = max(low, _number(spec, 'min', low))
+    high = min(high, _number(spec, 'max', high))
+    if low > high:
+        raise ValueError(f"{key} 的 min 不可大於 max")
+    return Distribution(key, kind, params, low, high)
+
+
+def summarize(values):
+    """平均、標準差與百分位數（忽略 NaN），全部無效時返回 None"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return None
+    summary = {'mean': float(values.mean()), 'std': float(values.std()),
+               'min': float(values.min()), 'max': float(values.max())}
+    for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f'p{percentile}'] = float(value)
+    return summary
+
+
+def histogram(values, bins=DEFAULT_BINS):
+    """直方圖（忽略 NaN），返回分箱邊界與次數"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return {'edges': [], 'counts': []}
+    counts, edges = np.histogram(values, bins=bins)
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+class MonteCarloResult(NamedTuple):
+    """模擬結果：各路徑的試算結果與抽樣值"""
+    seed: int
+    samples: dict                   # payload 欄位名稱 → 抽樣陣列（引擎單位）
+    batch: BatchResult
+    operating_cash_flows: np.ndarray  # (路徑數, 投資年數)，不含出售收入
+    irr_twd: Any                    # 以台幣計價的 IRR（有匯率分佈時），否則為 None
+
+    @property
+    def paths(self):
+        return len(self.batch)
+
+    def to_dict(self, bins=DEFAULT_BINS):
+        """彙整為 API 回應（IRR、CoCR 為百分比）"""
+        batch = self.batch
+        irr = batch.irr * 100
+        has_debt = batch.annual_debt_service > 0
+        # 投資年數為 0 時矩陣沒有欄位，any() 對每條路徑皆為 False
+        negative_year = (self.operating_cash_flows < 0).any(axis=1)
+
+        result = {
+            'paths': self.paths,
+            'seed': self.seed,
+            'simulated_fields': sorted(self.samples),
+            'kpi': {
+                'irr': summarize(irr),
+                'cash_on_cash_return': summarize(batch.cash_on_cash_return),
+                'dscr': summarize(batch.dscr[has_debt]) if has_debt.any() else None,
+            },
+            'probabilities': {
+                'negative_cash_flow': float(negative_year.mean()),
+                'negative_stable_cash_flow': float((batch.stable_cash_flow < 0).mean()),
+                # IRR 無解代表現金流始終未轉正，視為虧損
+                'negative_irr': float(((irr < 0) | np.isnan(irr)).mean()),
+                'dscr_below_one': float((has_debt & (batch.dscr < 1)).mean()),
+                'irr_undefined': float(np.isnan(irr).mean()),
+            },
+            'histograms': {
+                'irr': histogram(irr, bins),
+                'cash_on_cash_return': histogram(batch.cash_on_cash_return, bins),
+            },
+        }
+        if self.irr_twd is not None:
+            irr_twd = self.irr_twd * 100
+            result['kpi']['irr_twd'] = summarize(irr_twd)
+            result['histograms']['irr_twd'] = histogram(irr_twd, bins)
+        return result
+
+
+def simulate(base: CalculationInputs, distributions: Mapping[str, Mapping[str, Any]],
+             paths: int = DEFAULT_PATHS, seed: int = DEFAULT_SEED) -> MonteCarloResult:
+    """
+    執行蒙地卡羅模擬
+
+    相同的基準輸入、分佈設定與 seed 一定得到相同結果，因此結果可快取。
+
+    Args:
+        base: 基準輸入（parse_inputs() 的結果）
+        distributions: payload 欄位名稱 → 分佈設定，見 parse_distribution()
+        paths: 路徑數（路徑數 × 投資年數不可超過 engine.vectorized.MAX_CELLS）
+        seed: 亂數種子
+
+    Returns:
+        MonteCarloResult: 模擬結果
+    """
+    if not MIN_PATHS <= paths <= MAX_PATHS:
+        raise ValueError(f"路徑數必須介於 {MIN_PATHS} 與 {MAX_PATHS} 之間")
+    # 在抽樣與配置 paths × years 陣列之前檢查規模
+    check_workload(paths, max(base.investment_period, 0))
+    parsed = [parse_distribution(key, spec, base) for key, spec in distributions.items()]
+    fields = [distribution.field for distribution in parsed]
+    if len(set(fields)) != len(fields):
+        raise ValueError("同一個參數不可重複指定分佈")
+
+    # 依欄位名稱排序後抽樣，使結果不受 JSON 鍵順序影響
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for distribution in sorted(parsed, key=lambda d: d.key):
+        samples[distribution.key] = distribution.sample(rng, paths)
+
+    overrides = {PAYLOAD_FIELDS[key][0]: values for key, values in samples.items()}
+    if not overrides:
+        overrides = {'property_price': np.full(paths, base.property_price)}
+    batch = evaluate_arrays(broadcast_inputs(base, overrides))
+
+    years = max(base.investment_period, 0)
+    operating_cash_flows = batch.cash_flows[:, 1:years + 1].copy()
+    if years:
+        operating_cash_flows[:, years - 1] -= batch.net_sale_proceeds
+
+    # 匯率分佈代表出場時的匯率（台幣 / 日圓），期間以幾何內插，換算台幣計價的現金流
+    irr_twd = None
+    exchange_rate = overrides.get('exchange_rate')
+    if exchange_rate is not None and base.exchange_rate > 0 and years:
+        exit_rate = np.where(exchange_rate > 0, exchange_rate, base.exchange_rate)
+        progress = np.minimum(np.arange(batch.cash_flows.shape[1]) / years, 1.0)
+        rates = base.exchange_rate * (exit_rate / base.exchange_rate)[:, None] ** progress[None, :]
+        irr_twd = irr_matrix(batch.cash_flows * rates)
+
+    return MonteCarloResult(seed, samples, batch, operating_cash_flows, irr_twd)
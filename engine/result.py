@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+計算結果
+保存單一情境的中間數值與 KPI，並負責組裝 /calculate 的回應格式
+"""
+
+from typing import List, NamedTuple, Optional
+
+from engine.inputs import CalculationInputs, MAN_EN
+
+# 精簡回應（format=compact）的結構版本
+COMPACT_SCHEMA_VERSION = 2
+
+# 可用 fields 選取的回應區塊（舊版與精簡格式共用；suggestions 僅舊版有內容）
+RESPONSE_SECTIONS = (
+    'kpi', 'leverage_metrics', 'initial_investment', 'cash_flow', 'annual_projections',
+    'suggestions',
+)
+
+
+def get_health_rating(dcr, dscr, ltv, cocr):
+    """
+    根據關鍵指標計算投資健康度
+    返回: (rating, color, description)
+    """
+    danger_count = 0
+    warning_count = 0
+
+    # DCR 評估
+    if dcr < 1.10:
+        danger_count += 1
+    elif dcr < 1.25:
+        warning_count += 1
+
+    # DSCR 評估
+    if dscr < 1.15:
+        danger_count += 1
+    elif dscr < 1.30:
+        warning_count += 1
+
+    # LTV 評估
+    if ltv > 85:
+        danger_count += 1
+    elif ltv > 75:
+        warning_count += 1
+
+    # CoCR 評估
+    if cocr < 3:
+        danger_count += 1
+    elif cocr < 5:
+        warning_count += 1
+
+    if danger_count >= 2:
+        return ("危險", "danger", "多項關鍵指標低於安全標準，投資風險較高")
+    elif danger_count >= 1 or warning_count >= 3:
+        return ("警告", "warning", "部分指標需要關注，建議優化投資結構")
+    elif warning_count >= 1:
+        return ("良好", "good", "整體表現良好，少數指標有改善空間")
+    else:
+        return ("優秀", "excellent", "各項指標表現優異，投資結構健康")
+
+
+class Result(NamedTuple):
+    """單一情境的試算結果（金額單位皆為日圓）"""
+    inputs: CalculationInputs
+    total_upfront_costs: float
+    total_initial_investment: float
+    own_capital_for_down_payment: float
+    credit_loan_for_down_payment: float
+    loan_amount: float
+    monthly_gross_revenue: float
+    monthly_operating_expenses: float
+    one_time_initial_income: float
+    monthly_payment: float
+    credit_loan_payment: float
+    monthly_management_and_repairs: float
+    monthly_property_tax: float
+    annual_depreciation: float
+    annual_tax_y1: float
+    annual_tax_y2: float
+    actual_interest_y1: float
+    actual_interest_y2: float
+    net_sale_proceeds: float
+    cash_flows: List[float]
+    irr: Optional[float]
+    property_values: List[float]
+    loan_balances: List[float]
+
+    # --- 年度化數值 ---
+
+    @property
+    def annual_gross_revenue(self):
+        return self.monthly_gross_revenue * 12
+
+    @property
+    def annual_operating_expenses(self):
+        return self.monthly_operating_expenses * 12
+
+    @property
+    def annual_ebitda(self):
+        """穩定年度 EBITDA（不含一次性收入）"""
+        return (self.monthly_gross_revenue * 12) - (self.monthly_operating_expenses * 12)
+
+    @property
+    def annual_other_expenses(self):
+        """管理費、房屋稅、保險、會計師費"""
+        return (self.monthly_management_and_repairs * 12) + (self.monthly_property_tax * 12) + \
+            self.inputs.annual_insurance_cost + self.inputs.annual_tax_accountant_fee
+
+    @property
+    def annual_noi(self):
+        """淨營運收入：總收入 - 營運費用（不包含融資成本、折舊、稅務、會計師費）"""
+        return (self.monthly_gross_revenue * 12) - (self.monthly_operating_expenses * 12) - \
+            (self.monthly_management_and_repairs * 12) - (self.monthly_property_tax * 12) - \
+            self.inputs.annual_insurance_cost
+
+    @property
+    def annual_debt_service(self):
+        return (self.monthly_payment + self.credit_loan_payment) * 12
+
+    @property
+    def total_loan_amount(self):
+        return self.loan_amount + self.credit_loan_for_down_payment
+
+    # --- KPI ---
+
+    @property
+    def stable_cash_flow(self):
+        """穩定年度的稅後現金流，通常是第二年"""
+        cash_flows = self.cash_flows
+        if len(cash_flows) > 2:
+            return cash_flows[2]
+        return cash_flows[1] if len(cash_flows) > 1 else 0
+
+    @property
+    def cash_on_cash_return(self):
+        if self.total_initial_investment > 0:
+            return (self.stable_cash_flow / self.total_initial_investment) * 100
+        return 0
+
+    @property
+    def payback_period(self):
+        payback_period = 0
+        cumulative_cash_flow = 0
+        total_initial_investment = self.total_initial_investment
+        for i, cf in enumerate(self.cash_flows[1:], 1):  # 跳過初始投資
+            cumulative_cash_flow += cf
+            if cumulative_cash_flow >= total_initial_investment:
+                payback_period = i + (total_initial_investment - (cumulative_cash_flow - cf)) / cf
+                break
+        return payback_period
+
+    @property
+    def loan_to_value(self):
+        """僅計入主要貸款的 LTV（百分比）"""
+        property_price = self.inputs.property_price
+        return (self.loan_amount / property_price) * 100 if property_price > 0 else 0
+
+    @property
+    def ltv(self):
+        """含頭期款信用貸款的總 LTV（百分比）"""
+        property_price = self.inputs.property_price
+        return (self.total_loan_amount / property_price) * 100 if property_price > 0 else 0
+
+    @property
+    def dcr(self):
+        """DCR (Debt Coverage Ratio)：NOI / 年度債務服務，無貸款時為無限大"""
+        annual_debt_service = self.annual_debt_service
+        return self.annual_noi / annual_debt_service if annual_debt_service > 0 else float('inf')
+
+    @property
+    def dscr(self):
+        """DSCR：NOI / 年度債務服務，無貸款時為 0"""
+        annual_debt_service = self.annual_debt_service
+        return self.annual_noi / annual_debt_service if annual_debt_service > 0 else 0
+
+    @property
+    def ebitda_coverage(self):
+        """健康度評級使用的 EBITDA 覆蓋率，無貸款時為無限大"""
+        annual_debt_service = self.annual_debt_service
+        return self.annual_ebitda / annual_debt_service if annual_debt_service > 0 else float('inf')
+
+    @property
+    def health_rating(self):
+        return get_health_rating(self.dcr, self.ebitda_coverage, self.ltv, self.cash_on_cash_return)
+
+    # --- 回應組裝 ---
+
+    def annual_projections(self):
+        """年度預測（萬円 / 萬台幣）"""
+        exchange_rate = self.inputs.exchange_rate
+        cash_flows = self.cash_flows
+        projections = []
+        pairs = zip(self.property_values, self.loan_balances)
+        for index, (property_value, loan_balance) in enumerate(pairs):
+            year = index + 1
+            net_equity = property_value - loan_balance
+            projections.append({
+                "year": year,
+                "net_cash_flow": (cash_flows[year] if year < len(cash_flows) else 0) / MAN_EN,
+                "property_value": property_value / MAN_EN,  # 轉換為萬円
+                "loan_balance": loan_balance / MAN_EN,  # 轉換為萬円
+                "net_equity": net_equity / MAN_EN,  # 轉換為萬円
+                "net_equity_twd": (net_equity / MAN_EN) * exchange_rate  # 轉換為萬台幣
+            })
+        return projections
+
+    def to_dict(self, sections=None):
+        """
+        組裝 /calculate 的回應（萬円 / 萬台幣）
+
+        Args:
+            sections: 要輸出的區塊名稱集合（見 RESPONSE_SECTIONS），None 為全部；未選取的區塊不會組裝
+        """
+        builders = (
+            ("kpi", self._legacy_kpi),
+            ("leverage_metrics", self._legacy_leverage_metrics),
+            ("initial_investment", self._legacy_initial_investment),
+            ("cash_flow", self._legacy_cash_flow),
+            ("suggestions", list),  # 可以後續添加建議邏輯
+            ("annual_projections", self.annual_projections),
+        )
+        return {name: build() for name, build in builders if sections is None or name in sections}
+
+    def _jpy(self, value):
+        return value / MAN_EN
+
+    def _twd(self, value):
+        return (value / MAN_EN) * self.inputs.exchange_rate
+
+    def _legacy_kpi(self):
+        jpy = self._jpy
+        irr = self.irr
+        dscr = self.dscr
+        return {
+            "cash_on_cash_return": self.cash_on_cash_return,
+            "irr": irr * 100 if irr else 0,  # 轉換為百分比
+            "payback_period": self.payback_period,
+            "loan_to_value": self.loan_to_value,
+            "debt_coverage_ratio": dscr,
+            "dscr": dscr,
+            # 槓桿比率使用貸款價值比 (LTV)，槓桿後 ROE 與現金回報率相同
+            "leverage_ratio": self.loan_to_value / 100,
+            "leveraged_roe": self.cash_on_cash_return,
+            "annual_debt_service": jpy(self.annual_debt_service),
+            "noi": jpy(self.annual_noi)
+        }
+
+    def _legacy_leverage_metrics(self):
+        jpy, twd = self._jpy, self._twd
+        annual_debt_service = self.annual_debt_service
+        annual_noi = self.annual_noi
+        health_rating, health_color, health_description = self.health_rating
+        return {
+            "dcr": self.dcr,
+            "dscr": self.dscr,
+            "ltv": self.ltv,
+            "leverage_ratio": self.loan_to_value / 100,
+            "leveraged_roe": self.cash_on_cash_return,
+            "annual_debt_service_jpy": jpy(annual_debt_service),
+            "annual_debt_service_twd": twd(annual_debt_service),
+            "annual_noi_jpy": jpy(annual_noi),
+            "annual_noi_twd": twd(annual_noi),
+            "health_rating": health_rating,
+            "health_color": health_color,
+            "health_description": health_description
+        }
+
+    def _legacy_initial_investment(self):
+        jpy, twd = self._jpy, self._twd
+        setup_costs = self.inputs.initial_furnishing_cost + self.inputs.corporate_setup_cost
+        return {
+            "total_investment_jpy": jpy(self.total_initial_investment),
+            "total_investment_twd": twd(self.total_initial_investment),
+            "acquisition_costs_jpy": jpy(self.total_upfront_costs),
+            "acquisition_costs_twd": twd(self.total_upfront_costs),
+            "initial_setup_costs_jpy": jpy(setup_costs),
+            "initial_setup_costs_twd": twd(setup_costs),
+            "down_payment_own_capital_jpy": jpy(self.own_capital_for_down_payment),
+            "down_payment_own_capital_twd": twd(self.own_capital_for_down_payment),
+            "down_payment_credit_loan_jpy": jpy(self.credit_loan_for_down_payment),
+            "down_payment_credit_loan_twd": twd(self.credit_loan_for_down_payment),
+            "loan_amount_jpy": jpy(self.loan_amount),
+            "loan_amount_twd": twd(self.loan_amount)
+        }
+
+    def _legacy_cash_flow(self):
+        jpy, twd = self._jpy, self._twd
+        cash_flows = self.cash_flows
+        annual_revenue = self.monthly_gross_revenue * 12
+        annual_expenses = self.monthly_operating_expenses * 12
+        annual_ebitda = annual_revenue - annual_expenses
+        annual_revenue_y1 = annual_revenue + self.one_time_initial_income
+        annual_ebitda_y1 = annual_revenue_y1 - annual_expenses
+        depreciation = self.annual_depreciation
+        other_expenses = self.annual_other_expenses
+        # 貸款利息估算（以 90% 本金近似第二年利息）
+        estimated_interest = 0
+        if self.loan_amount > 0:
+            estimated_interest = self.inputs.loan_interest_rate * (self.loan_amount * 0.9)
+        net_cash_flow_y1 = cash_flows[1] if len(cash_flows) > 1 else 0
+        net_cash_flow_stable = self.stable_cash_flow
+        ebt_y1 = annual_ebitda_y1 - depreciation - self.actual_interest_y1 - other_expenses
+        ebt_stable = annual_ebitda - depreciation - self.actual_interest_y2 - other_expenses
+        return {
+            # 使用穩定年度（第二年）的數據進行計算，確保數字一致性
+            # 1. 總租金收入
+            "total_revenue_jpy": jpy(annual_revenue),
+            "total_revenue_twd": twd(annual_revenue),
+
+            # 2. 營運總支出（僅包含直接營運費用）
+            "operating_expenses_jpy": jpy(annual_expenses),
+            "operating_expenses_twd": twd(annual_expenses),
+
+            # 3. EBITDA = 總收入 - 營運支出
+            "ebitda_jpy": jpy(annual_ebitda),
+            "ebitda_twd": twd(annual_ebitda),
+
+            # 4. 建物折舊
+            "depreciation_jpy": jpy(depreciation),
+            "depreciation_twd": twd(depreciation),
+
+            # 5. 貸款利息（使用第二年的利息，因為第一年利息較高）
+            "interest_payment_jpy": jpy(estimated_interest),
+            "interest_payment_twd": twd(estimated_interest),
+
+            # 6. 其他費用（管理費、房屋稅、保險、會計師費）
+            "other_expenses_jpy": jpy(other_expenses),
+            "other_expenses_twd": twd(other_expenses),
+
+            # 7. 稅前淨利 (EBT) = EBITDA - 折舊 - 利息 - 其他費用
+            "ebt_jpy": jpy(annual_ebitda - depreciation - estimated_interest - other_expenses),
+            "ebt_twd": twd(annual_ebitda - depreciation - estimated_interest - other_expenses),
+
+            # 8. 應繳稅款
+            "tax_jpy": jpy(self.annual_tax_y2),
+            "tax_twd": twd(self.annual_tax_y2),
+
+            # 9. 稅後淨現金流
+            "net_cash_flow_jpy": jpy(net_cash_flow_stable),
+            "net_cash_flow_twd": twd(net_cash_flow_stable),
+
+            # 保留舊版本相容性
+            "total_revenue_y1": jpy(annual_revenue_y1),
+            "total_revenue_y2": jpy(annual_revenue),
+            "total_expenses_y1": jpy(annual_expenses),
+            "total_expenses_y2": jpy(annual_expenses),
+            "ebitda_y1": jpy(annual_ebitda_y1),
+            "ebitda_y2": jpy(annual_ebitda),
+            "depreciation": jpy(depreciation),
+            "interest_payment_y1": jpy(self.actual_interest_y1),
+            "interest_payment_y2": jpy(self.actual_interest_y2),
+            "ebt_y1": jpy(ebt_y1),
+            "ebt_y2": jpy(ebt_stable),
+            "tax_y1": jpy(self.annual_tax_y1),
+            "tax_y2": jpy(self.annual_tax_y2),
+            "net_cash_flow_y1": jpy(net_cash_flow_y1),
+            "net_cash_flow_y2": jpy(net_cash_flow_stable),
+
+            # 新增穩定年度現金流（日幣和台幣）
+            "total_revenue_stable_jpy": jpy(annual_revenue),
+            "total_revenue_stable_twd": twd(annual_revenue),
+            "total_expenses_stable_jpy": jpy(annual_expenses),
+            "total_expenses_stable_twd": twd(annual_expenses),
+            "ebitda_stable_jpy": jpy(annual_ebitda),
+            "ebitda_stable_twd": twd(annual_ebitda),
+            "interest_payment_stable_jpy": jpy(self.actual_interest_y2),
+            "interest_payment_stable_twd": twd(self.actual_interest_y2),
+            "ebt_stable_jpy": jpy(ebt_stable),
+            "ebt_stable_twd": twd(ebt_stable),
+            "tax_stable_jpy": jpy(self.annual_tax_y2),
+            "tax_stable_twd": twd(self.annual_tax_y2),
+            "net_cash_flow_stable_jpy": jpy(net_cash_flow_stable),
+            "net_cash_flow_stable_twd": twd(net_cash_flow_stable)
+        }
+
+    def to_compact_dict(self, sections=None):
+        """
+        組裝精簡回應（schema 2）
+
+        金額只以萬円輸出一次，台幣由 exchange_rate 換算（萬台幣 = 萬円 × exchange_rate），
+        不含舊版的重複別名；annual_projections 為欄位陣列。IRR 無解時為 null（舊版為 0）。
+
+        Args:
+            sections: 要輸出的區塊名稱集合（見 RESPONSE_SECTIONS），None 為全部
+        """
+        builders = (
+            ("kpi", self._compact_kpi),
+            ("leverage_metrics", self._compact_leverage_metrics),
+            ("initial_investment", self._compact_initial_investment),
+            ("cash_flow", self._compact_cash_flow),
+            ("annual_projections", self._compact_annual_projections),
+        )
+        response = {"schema": COMPACT_SCHEMA_VERSION, "exchange_rate": self.inputs.exchange_rate}
+        for name, build in builders:
+            if sections is None or name in sections:
+                response[name] = build()
+        return response
+
+    def _compact_kpi(self):
+        irr = self.irr
+        return {
+            "cash_on_cash_return": self.cash_on_cash_return,
+            "irr": irr * 100 if irr is not None else None,
+            "payback_period": self.payback_period,
+            "loan_to_value": self.loan_to_value,
+            "dscr": self.dscr,
+            "leverage_ratio": self.loan_to_value / 100,
+            "annual_debt_service": self.annual_debt_service / MAN_EN,
+            "noi": self.annual_noi / MAN_EN,
+        }
+
+    def _compact_leverage_metrics(self):
+        health_rating, health_color, health_description = self.health_rating
+        return {
+            "dcr": self.dcr,
+            "ltv": self.ltv,
+            "health_rating": health_rating,
+            "health_color": health_color,
+            "health_description": health_description,
+        }
+
+    def _compact_initial_investment(self):
+        return {
+            "total_investment": self.total_initial_investment / MAN_EN,
+            "acquisition_costs": self.total_upfront_costs / MAN_EN,
+            "initial_setup_costs":
+                (self.inputs.initial_furnishing_cost + self.inputs.corporate_setup_cost) / MAN_EN,
+            "down_payment_own_capital": self.own_capital_for_down_payment / MAN_EN,
+            "down_payment_credit_loan": self.credit_loan_for_down_payment / MAN_EN,
+            "loan_amount": self.loan_amount / MAN_EN,
+        }
+
+    def _compact_cash_flow(self):
+        """未標示年度者為穩定年度（第二年）；*_estimate 為以 90% 本金估算的利息與稅前淨利"""
+        annual_revenue = self.monthly_gross_revenue * 12
+        annual_expenses = self.monthly_operating_expenses * 12
+        annual_ebitda = annual_revenue - annual_expenses
+        annual_ebitda_y1 = annual_ebitda + self.one_time_initial_income
+        depreciation = self.annual_depreciation
+        other_expenses = self.annual_other_expenses
+        estimated_interest = 0
+        if self.loan_amount > 0:
+            estimated_interest = self.inputs.loan_interest_rate * (self.loan_amount * 0.9)
+        cash_flows = self.cash_flows
+        values = {
+            "total_revenue": annual_revenue,
+            "total_revenue_y1": annual_revenue + self.one_time_initial_income,
+            "operating_expenses": annual_expenses,
+            "ebitda": annual_ebitda,
+            "ebitda_y1": annual_ebitda_y1,
+            "depreciation": depreciation,
+            "other_expenses": other_expenses,
+            "interest_payment_estimate": estimated_interest,
+            "ebt_estimate": annual_ebitda - depreciation - estimated_interest - other_expenses,
+            "interest_payment_y1": self.actual_interest_y1,
+            "interest_payment": self.actual_interest_y2,
+            "ebt_y1": annual_ebitda_y1 - depreciation - self.actual_interest_y1 - other_expenses,
+            "ebt": annual_ebitda - depreciation - self.actual_interest_y2 - other_expenses,
+            "tax_y1": self.annual_tax_y1,
+            "tax": self.annual_tax_y2,
+            "net_cash_flow_y1": cash_flows[1] if len(cash_flows) > 1 else 0,
+            "net_cash_flow": self.stable_cash_flow,
+        }
+        return {name: value / MAN_EN for name, value in values.items()}
+
+    def _compact_annual_projections(self):
+        """年度預測的欄位陣列（萬円），第 i 個元素為第 i + 1 年"""
+        cash_flows = self.cash_flows
+        property_values = self.property_values
+        loan_balances = self.loan_balances
+        years = len(property_values)
+        return {
+            "year": list(range(1, years + 1)),
+            "net_cash_flow": [(cash_flows[year] if year < len(cash_flows) else 0) / MAN_EN
+                              for year in range(1, years + 1)],
+            "property_value": [value / MAN_EN for value in property_values],
+            "loan_balance": [balance / MAN_EN for balance in loan_balances],
+            "net_equity": [(value - balance) / MAN_EN
+                           for value, balance in zip(property_values, loan_balances)],
+        }
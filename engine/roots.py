@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+一維求根
+Brent 法（反二次插值 + 割線 + 二分），只要區間兩端變號即保證收斂，
+供 IRR 備援求解與目標值反推（goal seek）共用
+"""
+
+import math
+
+DEFAULT_TOLERANCE = 1e-10
+BRENT_MAX_ITERATIONS = 200
+
+
+def brent_root(func, low, high, tolerance=DEFAULT_TOLERANCE, max_iterations=BRENT_MAX_ITERATIONS,
+               f_low=None, f_high=None):
+    """
+    以 Brent 法在 [low, high] 內求 func(x) = 0 的根
+
+    Args:
+        func: 連續函數
+        low / high: 區間端點
+        tolerance: x 的絕對誤差
+        f_low / f_high: 已知的端點函數值（省略時重新計算）
+
+    Returns:
+        float or None: 區間兩端同號（無法保證有根），或 max_iterations 次內區間仍寬於
+            tolerance（未收斂）時返回 None
+    """
+    a, b = low, high
+    fa = func(a) if f_low is None else f_low
+    fb = func(b) if f_high is None else f_high
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    if fa * fb > 0:
+        return None
+
+    c, fc = a, fa
+    d = e = b - a
+    for iteration in range(max_iterations + 1):
+        if fb * fc > 0:
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+
+        tol = 2 * 2.2e-16 * abs(b) + tolerance / 2
+        midpoint = (c - b) / 2
+        if abs(midpoint) <= tol or fb == 0:
+            return b
+        if iteration == max_iterations:
+            # 最後的迭代值不一定是根，不可當作收斂結果返回
+            return None
+
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                # 割線法
+                p = 2 * midpoint * s
+                q = 1 - s
+            else:
+                # 反二次插值
+                q = fa / fc
+                r = fb / fc
+                p = s * (2 * midpoint * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            else:
+                p = -p
+            if 2 * p < min(3 * midpoint * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = midpoint
+        else:
+            d = e = midpoint
+
+        a, fa = b, fb
+        b += d if abs(d) > tol else math.copysign(tol, midpoint)
+        fb = func(b)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+範例參數
+與前端表單預設值一致，供效能測試與單元測試使用
+"""
+
+SAMPLE_PAYLOAD = {
+    "monetizationModel": "airbnb",
+    "purchaseType": "corporate",
+    "loanOrigin": "japan",
+    "buildingStructure": "rc",
+    "propertyPrice": 3000,
+    "downPaymentRatio": 20,
+    "acquisitionCostRatio": 8,
+    "exchangeRate": 0.22,
+    "initialFurnishingCost": 0,
+    "investmentPeriod": 10,
+    "japanLoanInterestRate": 1.5,
+    "japanLoanTerm": 35,
+    "taiwanLoanInterestRate": 2.5,
+    "taiwanLoanTerm": 30,
+    "ownCapitalAmount": 300,
+    "creditLoanRate": 8.5,
+    "operatingDaysCap": 180,
+    "occupancyRate": 80,
+    "dailyRate": 18000,
+    "platformFeeRate": 15,
+    "cleaningFee": 0.5,
+    "avgStayDuration": 4,
+    "avgGuests": 4,
+    "baseOccupancyForFee": 2,
+    "extraGuestFee": 0.2,
+    "peakSeasonMarkup": 15,
+    "monthlyUtilities": 2.5,
+    "monthlyRent": 12,
+    "vacancyRate": 5,
+    "initialLeaseCostsRatio": 3,
+    "leaseUtilities": 0.5,
+    "leaseRenewalFeeFrequency": 2,
+    "leaseRenewalFeeAmount": 1,
+    "monthlyRentCommercial": 15,
+    "vacancyRateCommercial": 10,
+    "initialLeaseCostsRatioCommercial": 6,
+    "managementFeeRatio": 12.5,
+    "propertyTaxRate": 1.7,
+    "annualAppreciation": 0.5,
+    "annualInsuranceCost": 2,
+    "buildingRatio": 65,
+    "corporateTaxRate": 23.2,
+    "corporateSetupCost": 25,
+    "annualTaxAccountantFee": 20,
+}
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+敏感度分析
+以向量化引擎一次試算所有擾動情境，取代前端逐一呼叫 /calculate
+
+注意：此模組會匯入 NumPy，僅供 API 路由延遲匯入使用
+"""
+
+from typing import Any, Mapping, NamedTuple
+
+import numpy as np
+
+from engine.inputs import (
+    INTEGER_FIELDS, MAX_INVESTMENT_PERIOD, PAYLOAD_FIELDS, RATIO_FIELDS, CalculationInputs,
+    payload_field_applies, resolve_payload_field,
+)
+from engine.vectorized import BatchResult, broadcast_inputs, check_workload, evaluate_arrays
+
+# 熱力圖每個軸的點數上限
+MAX_GRID_POINTS = 100
+
+# 龍捲風圖預設擾動幅度（±10%）
+DEFAULT_VARIATION = 0.1
+TORNADO_KPIS = ('irr', 'cash_on_cash_return', 'dscr')
+# 匯率只影響台幣換算，不影響日圓計價的 KPI
+TORNADO_EXCLUDED_KEYS = frozenset(('exchangeRate',))
+
+
+def _json_matrix(values):
+    """NaN 轉為 None，方便直接序列化為 JSON"""
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+def _json_value(value):
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+class Axis(NamedTuple):
+    """敏感度分析的一個軸（values 為 payload 單位）"""
+    key: str
+    field: str
+    scale: float
+    values: np.ndarray
+
+    @property
+    def engine_values(self):
+        values = self.values * self.scale
+        return np.round(values) if self.field in INTEGER_FIELDS else values
+
+
+def parse_axis(spec: Mapping[str, Any], base: CalculationInputs) -> Axis:
+    """
+    解析軸設定（payload 單位）
+
+        {"field": "propertyPrice", "values": [2500, 3000, 3500]}
+        {"field": "japanLoanInterestRate", "start": 1.0, "stop": 3.0, "steps": 21}   # 含兩端點
+    """
+    if not isinstance(spec, Mapping):
+        raise ValueError("軸設定必須是物件")
+    key = spec.get('field')
+    if not isinstance(key, str):
+        raise ValueError("軸設定的 field 必須是字串")
+    field, scale = resolve_payload_field(key, base)
+
+    try:
+        if spec.get('values') is not None:
+            values = np.asarray(spec['values'], dtype=np.float64)
+        else:
+            steps = int(spec.get('steps', 11))
+            # 先檢查點數再配置陣列，避免超大的 steps 耗盡記憶體
+            if not 2 <= steps <= MAX_GRID_POINTS:
+                raise ValueError(f"{key} 的 steps 必須介於 2 與 {MAX_GRID_POINTS} 之間")
+            values = np.linspace(float(spec['start']), float(spec['stop']), steps)
+    except (KeyError, TypeError, OverflowError):
+        raise ValueError(f"{key} 必須提供 values，或 start / stop / steps")
+
+    if values.ndim != 1 or values.size == 0 or not np.isfinite(values).all():
+        raise ValueError(f"{key} 的數值必須是非空的數字陣列")
+    if values.size > MAX_GRID_POINTS:
+        raise ValueError(f"每個軸最多 {MAX_GRID_POINTS} 個點")
+    return Axis(key, field, scale, values)
+
+
+class GridResult(NamedTuple):
+    """二維敏感度分析結果，batch 依 (y, x) 的列優先順序排列"""
+    x: Axis
+    y: Axis
+    batch: BatchResult
+
+    def matrix(self, values):
+        return np.asarray(values).reshape(self.y.values.size, self.x.values.size)
+
+    def to_dict(self):
+        """熱力圖資料：矩陣的列對應 y 軸、欄對應 x 軸（IRR 與 CoCR 為百分比）"""
+        return {
+            'x': {'field': self.x.key, 'values': self.x.values.tolist()},
+            'y': {'field': self.y.key, 'values': self.y.values.tolist()},
+            'kpi': {
+                'irr': _json_matrix(self.matrix(self.batch.irr * 100)),
+                'cash_on_cash_return': self.matrix(self.batch.cash_on_cash_return).tolist(),
+                'dscr': self.matrix(self.batch.dscr).tolist(),
+            },
+        }
+
+
+def sensitivity_grid(base: CalculationInputs, x_spec: Mapping[str, Any],
+                     y_spec: Mapping[str, Any]) -> GridResult:
+    """
+    在兩個參數構成的網格上試算 KPI（單次向量化計算）
+
+    Args:
+        base: 基準輸入（parse_inputs() 的結果）
+        x_spec / y_spec: 軸設定，見 parse_axis()
+
+    Returns:
+        GridResult: 網格試算結果
+    """
+    x = parse_axis(x_spec, base)
+    y = parse_axis(y_spec, base)
+    if x.field == y.field:
+        raise ValueError("兩個軸不可為同一個參數")
+    # 投資年數也可以是軸，以網格中最長的年數檢查規模
+    horizons = [axis.engine_values.max() for axis in (x, y) if axis.field == 'investment_period']
+    horizon = int(max(horizons, default=base.investment_period))
+    check_workload(x.values.size * y.values.size, horizon)
+
+    y_grid, x_grid = np.meshgrid(y.engine_values, x.engine_values, indexing='ij')
+    overrides = {x.field: x_grid.ravel(), y.field: y_grid.ravel()}
+    return GridResult(x, y, evaluate_arrays(broadcast_inputs(base, overrides)))
+
+
+class TornadoResult(NamedTuple):
+    """
+    單因子敏感度分析結果
+
+    batch 的第 0 列為基準情境，第 2i+1 / 2i+2 列為第 i 個參數的低值 / 高值情境。
+    """
+    keys: list
+    low_values: list                # payload 單位
+    high_values: list
+    base_values: list
+    batch: BatchResult
+
+    def kpi_columns(self):
+        return {
+            'irr': self.batch.irr * 100,
+            'cash_on_cash_return': self.batch.cash_on_cash_return,
+            'dscr': self.batch.dscr,
+        }
+
+    def to_dict(self, sort_by='irr'):
+        """依 sort_by 指標的擺幅由大到小排序；IRR 另附各參數佔總擺幅的比例"""
+        if sort_by not in TORNADO_KPIS:
+            raise ValueError(f"sort_by 必須是 {', '.join(TORNADO_KPIS)} 之一")
+        columns = self.kpi_columns()
+        base = {name: _json_value(values[0]) for name, values in columns.items()}
+
+        entries = []
+        for index, key in enumerate(self.keys):
+            entry = {
+                'field': key,
+                'base': self.base_values[index],
+                'low': self.low_values[index],
+                'high': self.high_values[index],
+            }
+            for name, values in columns.items():
+                low, high = values[2 * index + 1], values[2 * index + 2]
+                swing = abs(high - low)
+                entry[name] = {
+                    'low': _json_value(low),
+                    'high': _json_value(high),
+                    'swing': _json_value(swing),
+                }
+            entries.append(entry)
+
+        total_irr_swing = sum(entry['irr']['swing'] or 0 for entry in entries)
+        for entry in entries:
+            swing = entry['irr']['swing']
+            has_share = swing is not None and total_irr_swing > 0
+            entry['irr']['share'] = (swing / total_irr_swing) if has_share else None
+
+        # 擺幅無法計算（IRR 無解）的參數排在最後
+        entries.sort(key=lambda entry: (entry[sort_by]['swing'] is None,
+                                        -(entry[sort_by]['swing'] or 0)))
+        return {'base': base, 'sort_by': sort_by, 'factors': entries}
+
+
+def _perturbed_range(key, field, base_value, variation, spec):
+    """單一參數的低 / 高值（payload 單位）"""
+    if spec is not None:
+        if not isinstance(spec, Mapping):
+            raise ValueError(f"{key} 的範圍設定必須是物件")
+        try:
+            low, high = float(spec['low']), float(spec['high'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{key} 的範圍必須提供數字 low / high")
+        if not (np.isfinite(low) and np.isfinite(high)):
+            raise ValueError(f"{key} 的範圍必須是有限數值")
+        if low > high:
+            raise ValueError(f"{key} 的 low 不可大於 high")
+        # 與 sensitivity_grid 相同，整數欄位以四捨五入後的值試算並回報
+        if field in INTEGER_FIELDS:
+            low, high = float(round(low)), float(round(high))
+        if field == 'investment_period' and not 1 <= low <= high <= MAX_INVESTMENT_PERIOD:
+            raise ValueError(f"{key} 的範圍必須介於 1 與 {MAX_INVESTMENT_PERIOD} 之間")
+    else:
+        # 基準值為負（例如負的增值率）時 base × (1 - variation) 反而較大
+        low, high = sorted((base_value * (1 - variation), base_value * (1 + variation)))
+        if field in RATIO_FIELDS:
+            low, high = max(low, 0.0), min(high, 100.0)
+        if field in INTEGER_FIELDS:
+            low, high = float(round(low)), float(round(high))
+        if field == 'investment_period':
+            low, high = max(low, 1.0), min(high, float(MAX_INVESTMENT_PERIOD))
+    # 去除浮點誤差（例如 3300.0000000000005）
+    return round(low, 10), round(high, 10)
+
+
+def tornado(base: CalculationInputs, variation: float = DEFAULT_VARIATION,
+            ranges: Mapping[str, Any] = None, fields=None) -> TornadoResult:
+    """
+    單因子（one-at-a-time）敏感度分析
+
+    每個參數分別調整為低值與高值、其餘維持基準，K 個參數共 2K 個情境，加上基準情境一次向量化試算。
+
+    Args:
+        base: 基準輸入（parse_inputs() 的結果）
+        variation: 未指定範圍時的相對擾動幅度（小數，0.1 代表 ±10%）
+        ranges: payload 欄位名稱 → {"low": ..., "high": ...}（payload 單位），優先於 variation
+        fields: 要分析的 payload 欄位；省略時為所有適用且基準值不為 0 的欄位，以及 ranges 指定的欄位
+
+    Returns:
+        TornadoResult: 分析結果
+    """
+    ranges = ranges or {}
+    if not 0 < variation <= 1:
+        raise ValueError("variation 必須介於 0 與 100% 之間")
+    if fields is None:
+        fields = [key for key in PAYLOAD_FIELDS
+                  if key not in TORNADO_EXCLUDED_KEYS and payload_field_applies(key, base)
+                  and (key in ranges or getattr(base, PAYLOAD_FIELDS[key][0]) != 0)]
+    fields = list(dict.fromkeys(list(fields) + [key for key in ranges if key not in fields]))
+    if not fields:
+        raise ValueError("沒有可分析的參數")
+
+    keys, low_values, high_values, base_values = [], [], [], []
+    overrides = {}
+    size = 2 * len(fields) + 1
+    for index, key in enumerate(fields):
+        field, scale = resolve_payload_field(key, base)
+        base_value = getattr(base, field) / scale
+        low, high = _perturbed_range(key, field, base_value, variation, ranges.get(key))
+
+        column = overrides.setdefault(field, np.full(size, getattr(base, field), dtype=np.float64))
+        column[2 * index + 1] = low * scale
+        column[2 * index + 2] = high * scale
+
+        keys.append(key)
+        low_values.append(low)
+        high_values.append(high)
+        base_values.append(base_value)
+
+    horizon = base.investment_period
+    if 'investment_period' in overrides:
+        horizon = int(overrides['investment_period'].max())
+    check_workload(size, horizon)
+    batch = evaluate_arrays(broadcast_inputs(base, overrides))
+    return TornadoResult(keys, low_values, high_values, base_values, batch)
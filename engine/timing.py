@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+試算階段計時
+以 perf_counter_ns 記錄每個階段（驗證、收入模型、攤還表、IRR、序列化…）的耗時
+
+計時器存放於 ContextVar，由呼叫端（例如 /calculate）以 stage_timing() 啟用；
+未啟用時 current_timer() 返回 None，引擎內每個計時點只是一次 None 判斷。
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter_ns
+
+_current_timer = ContextVar('stage_timer', default=None)
+
+
+class StageTimer:
+    """
+    逐段計時：mark(stage) 將距上一個計時點的時間計入 stage
+
+    同名階段多次出現時累加（例如批次中多次呼叫 evaluate）。
+    """
+    __slots__ = ('stages', 'started', '_last')
+
+    def __init__(self):
+        self.stages = {}
+        self.started = self._last = perf_counter_ns()
+
+    def mark(self, stage):
+        now = perf_counter_ns()
+        self.stages[stage] = self.stages.get(stage, 0) + now - self._last
+        self._last = now
+
+    def total_ns(self):
+        return perf_counter_ns() - self.started
+
+    def server_timing(self):
+        """Server-Timing 標頭內容（毫秒），最後附上總耗時"""
+        entries = [f'{stage};dur={duration / 1e6:.3f}' for stage, duration in self.stages.items()]
+        entries.append(f'total;dur={self.total_ns() / 1e6:.3f}')
+        return ', '.join(entries)
+
+
+def current_timer():
+    """目前啟用的計時器；未啟用時為 None"""
+    return _current_timer.get()
+
+
+@contextmanager
+def stage_timing():
+    """在此區塊內啟用計時並返回計時器"""
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+
+@contextmanager
+def suspended_timing():
+    """
+    暫停計時（區塊內的 evaluate 等不記錄各自的階段）
+
+    用於整體計為單一階段的巢狀試算，例如出場年度分析。
+    """
+    token = _current_timer.set(None)
+    try:
+        yield
+    finally:
+        _current_timer.reset(token)
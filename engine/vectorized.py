@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+向量化計算引擎
+以 NumPy 在「情境」維度上一次計算多組參數的現金流、攤還與 IRR，
+公式與 engine.core.evaluate() 一致，供批次試算、敏感度分析與模擬使用
+
+注意：此模組會匯入 NumPy，請勿從 engine/__init__.py 直接匯入，以維持引擎的匯入速度
+"""
+
+from typing import Any, Iterable, Mapping, NamedTuple
+
+import numpy as np
+
+from engine.core import (
+    CREDIT_LOAN_PAYMENTS, LONG_TERM_CAPITAL_GAINS_TAX_RATE, LONG_TERM_HOLDING_YEARS,
+    SELLING_COST_RATIO, SHORT_TERM_CAPITAL_GAINS_TAX_RATE,
+)
+from engine.inputs import AIRBNB, MAX_INVESTMENT_PERIOD, PERSONAL_LEASE, CalculationInputs, MAN_EN
+from engine.irr import irr_matrix
+
+# 類別欄位（字串），其餘欄位皆為數值
+CATEGORICAL_FIELDS = ('monetization_model', 'purchase_type', 'loan_origin', 'building_structure')
+NUMERIC_FIELDS = tuple(name for name in CalculationInputs._fields if name not in CATEGORICAL_FIELDS)
+
+# 單次試算的「情境數 × 年數」上限（每格的中間陣列約 160 位元組，上限約 160 MB）
+MAX_CELLS = 1000000
+
+
+class BatchResult(NamedTuple):
+    """多情境試算結果，每個欄位皆為長度為情境數的陣列（金額單位為日圓）"""
+    irr: np.ndarray                     # 小數，無解時為 NaN
+    cash_on_cash_return: np.ndarray     # 百分比
+    payback_period: np.ndarray
+    dscr: np.ndarray
+    dcr: np.ndarray                     # 無貸款時為無限大
+    loan_to_value: np.ndarray           # 百分比
+    ltv: np.ndarray                     # 含信用貸款，百分比
+    total_initial_investment: np.ndarray
+    annual_noi: np.ndarray
+    annual_debt_service: np.ndarray
+    stable_cash_flow: np.ndarray
+    net_sale_proceeds: np.ndarray
+    cash_flows: np.ndarray              # (情境數, 最長投資年數 + 1)，投資期之後補 0
+
+    def __len__(self):
+        return self.irr.shape[0]
+
+    def to_rows(self):
+        """轉換為精簡的逐列結果（萬円，IRR 與報酬率為百分比）"""
+        irr = np.where(np.isnan(self.irr), None, self.irr * 100)
+        columns = {
+            'irr': irr.tolist(),
+            'cash_on_cash_return': self.cash_on_cash_return.tolist(),
+            'payback_period': self.payback_period.tolist(),
+            'dscr': self.dscr.tolist(),
+            'ltv': self.ltv.tolist(),
+            'total_investment_jpy': (self.total_initial_investment / MAN_EN).tolist(),
+            'noi_jpy': (self.annual_noi / MAN_EN).tolist(),
+            'annual_debt_service_jpy': (self.annual_debt_service / MAN_EN).tolist(),
+            'net_cash_flow_stable_jpy': (self.stable_cash_flow / MAN_EN).tolist(),
+            'net_sale_proceeds_jpy': (self.net_sale_proceeds / MAN_EN).tolist(),
+        }
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def stack_inputs(inputs_list: Iterable[CalculationInputs]) -> dict:
+    """將多個 CalculationInputs 轉為欄位導向的陣列"""
+    inputs_list = list(inputs_list)
+    if not inputs_list:
+        raise ValueError("至少需要一組輸入")
+    columns = dict(zip(CalculationInputs._fields, zip(*inputs_list)))
+    stacked = {}
+    for name in CalculationInputs._fields:
+        if name in CATEGORICAL_FIELDS:
+            stacked[name] = np.array(columns[name], dtype=object)
+        else:
+            stacked[name] = np.array(columns[name], dtype=np.float64)
+    return stacked
+
+
+def broadcast_inputs(base: CalculationInputs, overrides: Mapping[str, Any]) -> dict:
+    """以單一基準輸入為底，套用陣列形式的欄位覆寫（其餘欄位以純量廣播）"""
+    unknown = set(overrides) - set(CalculationInputs._fields)
+    if unknown:
+        raise ValueError(f"未知的輸入欄位: {', '.join(sorted(unknown))}")
+    columns = base._asdict()
+    columns.update(overrides)
+    return columns
+
+
+def _scenario_count(columns: Mapping[str, Any]) -> int:
+    """由陣列欄位推得情境數，純量欄位視為可廣播"""
+    sizes = {np.shape(value)[0] for value in columns.values() if np.ndim(value) > 0} - {1}
+    if len(sizes) > 1:
+        raise ValueError("輸入陣列長度不一致")
+    return sizes.pop() if sizes else 1
+
+
+def annuity_payments(principal, annual_rate, num_payments):
+    """向量化的每月還款額（利率為 0 時改為本金平均攤還）"""
+    monthly_rate = annual_rate / 12
+    safe_payments = np.where(num_payments > 0, num_payments, 1)
+    growth = (1 + monthly_rate) ** safe_payments
+    with np.errstate(divide='ignore', invalid='ignore'):
+        amortizing = principal * (monthly_rate * growth) / (growth - 1)
+    payment = np.where(monthly_rate > 0, amortizing, principal / safe_payments)
+    return np.where((principal > 0) & (num_payments > 0), payment, 0.0)
+
+
+def amortization_arrays(principal, annual_rate, term_years, years):
+    """
+    向量化年度攤還表
+
+    Returns:
+        tuple: (每月還款額 (S,), 年末餘額 (S, years + 1), 年度利息 (S, years), 年度本金 (S, years))
+    """
+    num_payments = term_years * 12
+    monthly_payment = annuity_payments(principal, annual_rate, num_payments)
+    monthly_rate = annual_rate / 12
+    active = (principal > 0) & (monthly_payment > 0)
+    has_rate = monthly_rate > 0
+
+    months = 12 * np.arange(1, years + 1)[None, :]
+    growth = (1 + monthly_rate)[:, None] ** months
+    safe_rate = np.where(has_rate, monthly_rate, 1.0)[:, None]
+    balance = np.where(
+        has_rate[:, None],
+        principal[:, None] * growth - monthly_payment[:, None] * (growth - 1) / safe_rate,
+        principal[:, None] - monthly_payment[:, None] * months,
+    )
+    balance = np.maximum(0, balance)
+    balance = np.where(months >= num_payments[:, None], 0.0, balance)
+    balance = np.where(active[:, None], balance, principal[:, None])
+    balances = np.concatenate([principal[:, None], balance], axis=1)
+
+    principal_paid = np.where(active[:, None], balances[:, :-1] - balances[:, 1:], 0.0)
+    months_paid = np.clip(num_payments[:, None] - (months - 12), 0, 12)
+    interest_paid = np.where((active & has_rate)[:, None],
+                             monthly_payment[:, None] * months_paid - principal_paid, 0.0)
+    return monthly_payment, balances, interest_paid, principal_paid
+
+
+def check_workload(scenarios: int, years: int) -> None:
+    """
+    在配置年度陣列前檢查試算規模
+
+    Raises:
+        ValueError: 年數超過 MAX_INVESTMENT_PERIOD，或情境數 × 年數超過 MAX_CELLS
+    """
+    if years > MAX_INVESTMENT_PERIOD:
+        raise ValueError(f"投資年數不可超過 {MAX_INVESTMENT_PERIOD} 年")
+    if scenarios * max(years, 1) > MAX_CELLS:
+        raise ValueError(f"情境數 × 投資年數不可超過 {MAX_CELLS}")
+
+
+def evaluate_arrays(columns: Mapping[str, Any]) -> BatchResult:
+    """
+    以欄位陣列執行多情境試算
+
+    Args:
+        columns: 以 CalculationInputs 欄位名稱為鍵，值為純量或長度一致的陣列
+
+    Returns:
+        BatchResult: 多情境試算結果
+
+    Raises:
+        ValueError: 試算規模超過上限，見 check_workload()
+    """
+    size = _scenario_count(columns)
+
+    def numeric(name):
+        return np.broadcast_to(np.asarray(columns[name], dtype=np.float64), (size,))
+
+    def category(name, value):
+        return np.broadcast_to(np.asarray(columns[name], dtype=object) == value, (size,))
+
+    is_airbnb = category('monetization_model', AIRBNB)
+    is_personal_lease = category('monetization_model', PERSONAL_LEASE)
+    is_corporate = category('purchase_type', 'corporate')
+    is_mixed = category('loan_origin', 'mixed')
+    is_wood = category('building_structure', 'wood')
+
+    property_price = numeric('property_price')
+    investment_period = numeric('investment_period').astype(np.int64)
+    loan_term = numeric('loan_term').astype(np.int64)
+    years = max(int(investment_period.max(initial=0)), 0)
+    check_workload(size, years)
+
+    total_upfront_costs = property_price * numeric('acquisition_cost_ratio')
+    down_payment_amount = property_price * numeric('down_payment_ratio')
+    loan_amount = property_price - down_payment_amount
+    own_capital = np.where(is_mixed, np.minimum(numeric('own_capital_amount'), down_payment_amount),
+                           down_payment_amount)
+    credit_loan = down_payment_amount - own_capital
+    total_initial_investment = own_capital + total_upfront_costs + \
+        numeric('initial_furnishing_cost') + numeric('corporate_setup_cost')
+
+    # 營運收入：民宿模式
+    monthly_booked_nights = \
+        np.minimum(365, numeric('operating_days_cap')) * numeric('occupancy_rate') / 12
+    extra_guests = np.maximum(0, numeric('avg_guests') - numeric('base_occupancy_for_fee'))
+    total_effective_adr = numeric('daily_rate') * (1 + numeric('peak_season_markup') * 3 / 12) + \
+        extra_guests * numeric('extra_guest_fee')
+    airbnb_revenue = monthly_booked_nights * total_effective_adr
+    avg_stay_duration = numeric('avg_stay_duration')
+    safe_stay_duration = np.where(avg_stay_duration > 0, avg_stay_duration, 1)
+    turnovers_per_month = np.where(avg_stay_duration > 0,
+                                   monthly_booked_nights / safe_stay_duration, 0)
+    airbnb_expenses = airbnb_revenue * numeric('platform_fee_rate') + \
+        turnovers_per_month * numeric('cleaning_fee') + numeric('monthly_utilities')
+
+    # 營運收入：租賃模式
+    monthly_rent = numeric('monthly_rent')
+    renewal_frequency = numeric('lease_renewal_fee_frequency')
+    renewal_amount = numeric('lease_renewal_fee_amount')
+    safe_frequency = np.where(renewal_frequency > 0, renewal_frequency, 1)
+    has_renewal_fee = is_personal_lease & (renewal_frequency > 0) & (renewal_amount > 0)
+    annual_renewal_fee = np.where(has_renewal_fee,
+                                  monthly_rent * renewal_amount / safe_frequency, 0)
+
+    lease_revenue = monthly_rent * (1 - numeric('vacancy_rate'))
+    monthly_gross_revenue = np.where(is_airbnb, airbnb_revenue, lease_revenue)
+    monthly_operating_expenses = np.where(is_airbnb, airbnb_expenses, numeric('lease_utilities'))
+    one_time_initial_income = \
+        np.where(is_airbnb, 0, monthly_rent * numeric('initial_lease_costs_ratio'))
+    annual_renewal_fee = np.where(is_airbnb, 0, annual_renewal_fee)
+
+    # 融資
+    monthly_payment, balances, interest_paid, principal_paid = amortization_arrays(
+        loan_amount, numeric('loan_interest_rate'), loan_term, years)
+    credit_loan_payment = annuity_payments(credit_loan, numeric('credit_loan_rate'),
+                                           np.full(size, CREDIT_LOAN_PAYMENTS))
+
+    monthly_management_and_repairs = monthly_gross_revenue * numeric('management_fee_ratio')
+    monthly_property_tax = (property_price * numeric('property_tax_rate')) / 12
+    annual_insurance_cost = numeric('annual_insurance_cost')
+    annual_other_expenses = (monthly_management_and_repairs * 12) + (monthly_property_tax * 12) + \
+        annual_insurance_cost + numeric('annual_tax_accountant_fee')
+    building_ratio = numeric('building_ratio')
+    annual_depreciation = (property_price * building_ratio) / np.where(is_wood, 22, 47)
+    corporate_tax_rate = numeric('corporate_tax_rate')
+
+    # 年度現金流 (情境數, 年數)
+    year_index = np.arange(1, years + 1)[None, :]
+    in_period = year_index <= investment_period[:, None]
+    is_renewal_year = (annual_renewal_fee > 0)[:, None] & \
+        (np.mod(year_index, safe_frequency[:, None]) == 0)
+    annual_gross_income = (monthly_gross_revenue * 12)[:, None] + \
+        np.where(year_index == 1, one_time_initial_income[:, None], 0) + \
+        np.where(is_renewal_year, (annual_renewal_fee * renewal_frequency)[:, None], 0)
+    annual_ebitda = annual_gross_income - (monthly_operating_expenses * 12)[:, None]
+    annual_debt_service_actual = \
+        interest_paid + principal_paid + (credit_loan_payment * 12)[:, None]
+    pre_tax_cash_flow = annual_ebitda - annual_debt_service_actual - annual_other_expenses[:, None]
+    taxable_income = annual_ebitda - interest_paid - annual_other_expenses[:, None] - \
+        annual_depreciation[:, None]
+    annual_tax = np.where(is_corporate[:, None] & (taxable_income > 0),
+                          taxable_income * corporate_tax_rate[:, None], 0)
+    post_tax_cash_flow = pre_tax_cash_flow - annual_tax
+
+    # 出售
+    rows = np.arange(size)
+    sale_year = np.clip(investment_period, 0, years)
+    current_property_value = property_price * (1 + numeric('annual_appreciation')) ** sale_year
+    selling_costs = current_property_value * SELLING_COST_RATIO
+    final_loan_balance = np.maximum(0, balances[rows, sale_year])
+    book_value = (property_price * building_ratio) - annual_depreciation * sale_year + \
+        property_price * (1 - building_ratio)
+    capital_gain = np.where(is_corporate,
+                            current_property_value - book_value - selling_costs,
+                            current_property_value - (property_price + total_upfront_costs))
+    individual_rate = np.where(sale_year >= LONG_TERM_HOLDING_YEARS,
+                               LONG_TERM_CAPITAL_GAINS_TAX_RATE, SHORT_TERM_CAPITAL_GAINS_TAX_RATE)
+    capital_gains_rate = np.where(is_corporate, corporate_tax_rate, individual_rate)
+    capital_gains_tax = np.where(capital_gain > 0, capital_gain * capital_gains_rate, 0)
+    has_sale = investment_period >= 1
+    net_sale_proceeds = np.where(
+        has_sale,
+        current_property_value - selling_costs - final_loan_balance - capital_gains_tax,
+        0,
+    )
+
+    # 現金流矩陣至少保留 3 欄，方便取穩定年度（第二年）
+    cash_flows = np.zeros((size, max(years, 2) + 1))
+    cash_flows[:, 0] = -total_initial_investment
+    cash_flows[:, 1:years + 1] = np.where(in_period, post_tax_cash_flow, 0)
+    cash_flows[rows[has_sale], sale_year[has_sale]] += net_sale_proceeds[has_sale]
+
+    # KPI
+    stable_cash_flow = np.where(investment_period >= 2, cash_flows[:, 2],
+                                np.where(investment_period >= 1, cash_flows[:, 1], 0))
+    safe_investment = np.where(total_initial_investment > 0, total_initial_investment, 1)
+    cash_on_cash_return = np.where(total_initial_investment > 0,
+                                   stable_cash_flow / safe_investment * 100, 0)
+
+    cumulative = np.cumsum(cash_flows[:, 1:years + 1], axis=1)
+    reached = (cumulative >= total_initial_investment[:, None]) & in_period
+    has_payback = reached.any(axis=1)
+    first = reached.argmax(axis=1) if years else np.zeros(size, dtype=np.int64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if years:
+            payback_cash_flow = cash_flows[rows, first + 1]
+            before = cumulative[rows, first] - payback_cash_flow
+            fraction = (total_initial_investment - before) / payback_cash_flow
+            payback_period = np.where(has_payback, first + 1 + fraction, 0)
+        else:
+            payback_period = np.zeros(size)
+
+        annual_debt_service = (monthly_payment + credit_loan_payment) * 12
+        annual_noi = (monthly_gross_revenue * 12) - (monthly_operating_expenses * 12) - \
+            (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - \
+            annual_insurance_cost
+        has_debt = annual_debt_service > 0
+        coverage = annual_noi / np.where(has_debt, annual_debt_service, 1)
+        dscr = np.where(has_debt, coverage, 0)
+        dcr = np.where(has_debt, coverage, np.inf)
+
+    safe_price = np.where(property_price > 0, property_price, 1)
+    loan_to_value = np.where(property_price > 0, loan_amount / safe_price * 100, 0)
+    ltv = np.where(property_price > 0, (loan_amount + credit_loan) / safe_price * 100, 0)
+
+    return BatchResult(
+        irr=irr_matrix(cash_flows),
+        cash_on_cash_return=cash_on_cash_return,
+        payback_period=payback_period,
+        dscr=dscr,
+        dcr=dcr,
+        loan_to_value=loan_to_value,
+        ltv=ltv,
+        total_initial_investment=total_initial_investment,
+        annual_noi=annual_noi,
+        annual_debt_service=annual_debt_service,
+        stable_cash_flow=stable_cash_flow,
+        net_sale_proceeds=net_sale_proceeds,
+        cash_flows=cash_flows,
+    )
+
+
+def evaluate_batch(inputs_list: Iterable[CalculationInputs]) -> BatchResult:
+    """一次試算多個 CalculationInputs"""
+    return evaluate_arrays(stack_inputs(inputs_list))
@@ -1,9 +1,12 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
-from flask_cors import CORS
-from flask_login import LoginManager, login_required, current_user
+from flask import (
+    Blueprint, Flask, Response, current_app, request, jsonify, render_template, send_from_directory,
+)
+from flask_login import LoginManager, current_user
 import math
 import os
-from version import get_version_info
+import threading
+import uuid
+from version import __version__, get_version_info
 from dotenv import load_dotenv
 
 # 載入環境變數
@@ -14,8 +17,24 @@ from config.security_config import (
     setup_security_headers, setup_cors_security, 
     rate_limit, calculation_rate_limit, validate_request_data
 )
-from config.logging_config import setup_logging, setup_error_handlers
-from config.health_check import setup_health_endpoints, setup_request_tracking
+from config.logging_config import (
+    debug_sampled, setup_logging, setup_error_handlers, setup_request_logging,
+)
+from config.health_check import health_checker, setup_health_endpoints, setup_request_tracking
+from config.metrics import register_cache_metrics, server_timing, setup_metrics
+from config.json_provider import FastJSONProvider, dumps as json_dumps
+from config.compression import (
+    PrecompressedPage, compressed_cache, negotiate_encoding, setup_compression,
+)
+from config.static_assets import HTML_SHELL_MAX_AGE, setup_static_assets
+from config.database import setup_database
+
+# 財務計算引擎（不依賴 Flask，可獨立呼叫與效能分析）
+from engine import MAN_EN, evaluate, parse_inputs, safe_int
+from engine.cache import ResultCache, cache_key
+from engine.exit_year import exit_year_analysis
+from engine.result import RESPONSE_SECTIONS
+from engine.timing import current_timer, suspended_timing
 
 # 確保當前目錄在 Python 路徑中
 import sys
@@ -25,8 +44,8 @@ if current_dir not in sys.path:
 
 # 導入認證相關模組
 try:
-    from models import db, User
-    from auth import auth_bp, init_oauth, load_user, unauthorized
+    from models import db, AnalysisResult
+    from auth import auth_bp, get_google, identity_cache, load_user, unauthorized
 except ImportError as e:
     print(f"Import error: {e}")
     print(f"Current directory: {current_dir}")
@@ -34,145 +53,181 @@ except ImportError as e:
     print(f"Files in current directory: {os.listdir(current_dir)}")
     raise
 
-app = Flask(__name__, template_folder='templates', static_folder='static')
-
-# 設定 Flask 密鑰
-secret_key = os.getenv('SECRET_KEY')
-print(f"DEBUG: SECRET_KEY from env: {secret_key[:10] if secret_key else 'None'}...")
-if not secret_key:
-    print("ERROR: SECRET_KEY 環境變數未設定！")
-    raise RuntimeError("SECRET_KEY 環境變數未設定")
-app.config['SECRET_KEY'] = secret_key
-print(f"DEBUG: SECRET_KEY 已設定，長度: {len(secret_key)}")
-
-# 會話配置 - 根據環境動態設定
-environment = os.getenv('ENVIRONMENT', 'development')
-is_production = environment == 'production'
-print(f"DEBUG: Environment: {environment}, is_production: {is_production}")
-
-app.config['SESSION_COOKIE_SECURE'] = is_production  # 生產環境使用 HTTPS
-app.config['SESSION_COOKIE_HTTPONLY'] = True
-app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
-app.config['PERMANENT_SESSION_LIFETIME'] = 86400  # 24小時
-
-print(f"DEBUG: SESSION_COOKIE_SECURE: {app.config['SESSION_COOKIE_SECURE']}")
-
-# 設定資料庫
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///app.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# 初始化資料庫
-db.init_app(app)
-
-# 設定 Flask-Login
-login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'auth.login'
-login_manager.login_message = '請先登入才能使用此功能'
-login_manager.login_message_category = 'warning'
-login_manager.user_loader(load_user)
-login_manager.unauthorized_handler(unauthorized)
-
-# 初始化 OAuth
-oauth, google = init_oauth(app)
-
-# 註冊認證藍圖
-app.register_blueprint(auth_bp)
-
-# 創建資料庫表格
-with app.app_context():
-    db.create_all()
-
-# 設定安全性和監控
-setup_cors_security(app)  # 取代原本的 CORS(app)
-setup_security_headers(app)
-setup_logging(app)
-setup_error_handlers(app)
-setup_health_endpoints(app)
-setup_request_tracking(app)
+# 頁面與 API 路由，由 create_app() 註冊
+bp = Blueprint('main', __name__)
 
 # --- 版本號 ---
-def get_version():
-    try:
-        with open('version.py', 'r') as f:
-            exec(f.read(), globals())
-        return __version__
-    except (FileNotFoundError, NameError):
-        return "N/A"
-
-VERSION = get_version()
+VERSION = __version__
 
 # --- GA Tracking ---
 GA_TRACKING_ID = os.environ.get('GA_TRACKING_ID', 'G-59XMZ0SZ0G') # Default to test ID
 ENVIRONMENT = os.environ.get('ENVIRONMENT', 'development')
 NO_INDEX = os.environ.get('NO_INDEX', 'false').lower() == 'true'
 
-@app.route('/')
+_schema_lock = threading.Lock()
+
+def create_app():
+    """
+    建立應用程式
+
+    冷啟動只做必要的設定；OAuth client（Authlib）、資料表建立與健康檢查的背景取樣
+    延後到第一次使用或 warmup（GET /warmup）時才執行。
+    """
+    # 設定 Flask 密鑰
+    secret_key = os.getenv('SECRET_KEY')
+    if not secret_key:
+        raise RuntimeError("SECRET_KEY 環境變數未設定")
+
+    app = Flask(__name__, template_folder='templates', static_folder='static')
+    # API 回應與請求解析使用較快的 JSON 編碼器（inf / nan 輸出為 null）
+    app.json = FastJSONProvider(app)
+    app.config['SECRET_KEY'] = secret_key
+
+    # 會話配置 - 根據環境動態設定
+    is_production = os.getenv('ENVIRONMENT', 'development') == 'production'
+    app.config['SESSION_COOKIE_SECURE'] = is_production  # 生產環境使用 HTTPS
+    app.config['SESSION_COOKIE_HTTPONLY'] = True
+    app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+    app.config['PERMANENT_SESSION_LIFETIME'] = 86400  # 24小時
+
+    # 設定資料庫與引擎設定檔（資料表於第一個請求前或 warmup 時建立）
+    setup_database(app, db)
+
+    # 設定 Flask-Login
+    login_manager = LoginManager()
+    login_manager.init_app(app)
+    login_manager.login_view = 'auth.login'
+    login_manager.login_message = '請先登入才能使用此功能'
+    login_manager.login_message_category = 'warning'
+    login_manager.user_loader(load_user)
+    login_manager.unauthorized_handler(unauthorized)
+
+    # 註冊藍圖（OAuth client 於第一次登入時才初始化，見 auth.get_google）
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(bp)
+
+    @app.before_request
+    def create_schema():
+        ensure_schema(app)
+
+    # 設定安全性和監控
+    setup_cors_security(app)  # 取代原本的 CORS(app)
+    setup_security_headers(app)
+    setup_logging(app)
+    setup_request_logging(app)
+    setup_error_handlers(app)
+    setup_health_endpoints(app)
+    setup_request_tracking(app)
+    setup_metrics(app)
+    setup_compression(app)
+    setup_static_assets(app)
+    return app
+
+def ensure_schema(app):
+    """建立資料表（每個應用程式一次）"""
+    if app.extensions.get('schema_ready'):
+        return
+    with _schema_lock:
+        if not app.extensions.get('schema_ready'):
+            with app.app_context():
+                db.create_all()
+            app.extensions['schema_ready'] = True
+
+def warm_up():
+    """完成延後的初始化：資料表、SPA 外殼、健康檢查取樣、OAuth client 與 OIDC 中繼資料"""
+    ensure_schema(current_app._get_current_object())
+    render_shell()
+    health_checker.start_sampler()
+    if os.getenv('GOOGLE_CLIENT_ID'):
+        try:
+            get_google().fetch_jwk_set()
+        except Exception as e:
+            current_app.logger.warning("OIDC 中繼資料預先載入失敗: %s", e)
+
+_app = None
+_app_lock = threading.Lock()
+
+def __getattr__(name):
+    """main.app（gunicorn main:app 與 from main import app）於第一次存取時才建立"""
+    global _app
+    if name == 'app':
+        if _app is None:
+            with _app_lock:
+                if _app is None:
+                    _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+_shell_page = None
+
+def render_shell():
+    """
+    單頁應用的 HTML 外殼（所有頁面路由共用）；短暫快取，資源網址含指紋
+
+    外殼只依賴啟動時即固定的設定（版本、GA、環境、NO_INDEX），每個行程只渲染並預先壓縮一次；
+    除錯模式下每次重新渲染，修改模板後不需重啟。
+    """
+    global _shell_page
+    if _shell_page is None or current_app.debug:
+        _shell_page = PrecompressedPage(render_template('index.html',
+                                                        version=VERSION,
+                                                        ga_tracking_id=GA_TRACKING_ID,
+                                                        environment=ENVIRONMENT,
+                                                        no_index=NO_INDEX).encode('utf-8'))
+    return _shell_page.response(max_age=HTML_SHELL_MAX_AGE)
+
+@bp.route('/')
 @rate_limit(max_requests=30)  # 首頁限制較寬鬆
 def index():
-    app.logger.info(f"首頁訪問 - 環境: {ENVIRONMENT}, NO_INDEX: {NO_INDEX}")
+    current_app.logger.debug("首頁訪問 - 環境: %s, NO_INDEX: %s", ENVIRONMENT, NO_INDEX)
     
-    return render_template('index.html', 
-                         version=VERSION,
-                         ga_tracking_id=GA_TRACKING_ID,
-                         environment=ENVIRONMENT,
-                         no_index=NO_INDEX)
+    return render_shell()
 
-@app.route('/analysis')
+@bp.route('/analysis')
 @rate_limit(max_requests=30)
 def analysis():
-    app.logger.info(f"財務分析頁面訪問 - 環境: {ENVIRONMENT}")
+    current_app.logger.debug("財務分析頁面訪問 - 環境: %s", ENVIRONMENT)
     
-    return render_template('index.html', 
-                         version=VERSION,
-                         ga_tracking_id=GA_TRACKING_ID,
-                         environment=ENVIRONMENT)
+    return render_shell()
 
-@app.route('/market')
+@bp.route('/market')
 @rate_limit(max_requests=30)
 def market():
-    app.logger.info(f"市場洞察頁面訪問 - 環境: {ENVIRONMENT}")
+    current_app.logger.debug("市場洞察頁面訪問 - 環境: %s", ENVIRONMENT)
     
-    return render_template('index.html', 
-                         version=VERSION,
-                         ga_tracking_id=GA_TRACKING_ID,
-                         environment=ENVIRONMENT)
+    return render_shell()
 
-@app.route('/portfolio')
+@bp.route('/portfolio')
 @rate_limit(max_requests=30)
 def portfolio():
-    app.logger.info(f"投資組合頁面訪問 - 環境: {ENVIRONMENT}")
+    current_app.logger.debug("投資組合頁面訪問 - 環境: %s", ENVIRONMENT)
     
-    return render_template('index.html', 
-                         version=VERSION,
-                         ga_tracking_id=GA_TRACKING_ID,
-                         environment=ENVIRONMENT)
+    return render_shell()
 
-@app.route('/about')
+@bp.route('/about')
 @rate_limit(max_requests=30)
 def about():
-    app.logger.info(f"關於我們頁面訪問 - 環境: {ENVIRONMENT}")
+    current_app.logger.debug("關於我們頁面訪問 - 環境: %s", ENVIRONMENT)
     
-    return render_template('index.html', 
-                         version=VERSION,
-                         ga_tracking_id=GA_TRACKING_ID,
-                         environment=ENVIRONMENT)
+    return render_shell()
 
-@app.route('/version')
+@bp.route('/version')
 def version():
     """API 端點：返回應用程式版本資訊"""
     return jsonify(get_version_info())
 
-@app.route('/static/<path:path>')
-def send_static(path):
-    return send_from_directory('static', path)
+@bp.route('/warmup')
+def warmup():
+    """預先完成延後的初始化（Cloud Run 啟動探測可指向此端點），避免由第一個使用者請求承擔"""
+    warm_up()
+    return '', 204
 
-@app.route('/favicon.ico')
+@bp.route('/favicon.ico')
 def favicon():
-    return send_from_directory(os.path.join(app.root_path, 'static'),
+    return send_from_directory(os.path.join(current_app.root_path, 'static'),
                                'favicon.ico', mimetype='image/vnd.microsoft.icon')
 
-@app.route('/robots.txt')
+@bp.route('/robots.txt')
 def robots_txt():
     """根據環境變數決定 robots.txt 內容"""
     if NO_INDEX:
@@ -195,546 +250,386 @@ Sitemap: https://japan-property-analyzer-prod-864942598341.asia-northeast1.run.a
     from flask import Response
     return Response(content, mimetype='text/plain')
 
-@app.route('/test_debug.html')
+@bp.route('/test_debug.html')
 def test_debug():
     return send_from_directory('.', 'test_debug.html')
 
 
+# 試算 API 的必要欄位
+CALCULATION_REQUIRED_FIELDS = ['monetizationModel', 'purchaseType', 'propertyPrice', 'exchangeRate']
 
-def safe_float(s, default=0.0):
-    try:
-        return float(s) if s else default
-    except (ValueError, TypeError):
-        return default
+# /calculate 回應格式（?format=）：legacy 為原本的完整格式，compact 為精簡的 schema 2
+RESPONSE_FORMATS = ('legacy', 'compact')
+# 可用 ?fields= 選取的區塊（以逗號分隔）
+SELECTABLE_SECTIONS = RESPONSE_SECTIONS + ('exit_analysis',)
 
-def safe_int(s, default=0):
-    try:
-        return int(s) if s else default
-    except (ValueError, TypeError):
-        return default
+# 批次試算單次請求的情境上限
+MAX_BATCH_SCENARIOS = 10000
 
-@app.route('/calculate', methods=['POST'])
+# /calculate 結果快取（可由環境變數調整容量與存活時間）
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('CALCULATION_CACHE_MAX_ENTRIES', 10000)),
+    max_bytes=int(os.environ.get('CALCULATION_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+    ttl=int(os.environ.get('CALCULATION_CACHE_TTL', 3600)),
+)
+health_checker.register_metrics('calculation_cache', result_cache.stats)
+register_cache_metrics('calculation_cache', result_cache.stats)
+register_cache_metrics('compressed_response_cache', compressed_cache.stats)
+register_cache_metrics('identity_cache', identity_cache.stats)
+
+@bp.route('/calculate', methods=['POST'])
 @calculation_rate_limit  # 添加計算 API 專用頻率限制
+@server_timing
 def calculate():
+    timer = current_timer()
     params = request.get_json()
+    try:
+        response_format, sections = parse_response_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': '回應格式參數錯誤', 'details': [str(e)]}), 400
     
-    # 調試：記錄收到的參數
-    app.logger.info(f"收到的參數: {params}")
+    # 調試：記錄收到的參數（DEBUG 取樣）
+    if debug_sampled(current_app.logger):
+        current_app.logger.debug("收到的參數: %s", params)
     
     # 驗證必要欄位
-    required_fields = ['monetizationModel', 'purchaseType', 'propertyPrice', 'exchangeRate']
-    validation_errors = validate_request_data(params, required_fields)
+    validation_errors = validate_request_data(params, CALCULATION_REQUIRED_FIELDS)
     if validation_errors:
-        app.logger.warning(f"計算請求驗證失敗: {validation_errors}")
-        app.logger.warning(f"收到的參數詳情: {params}")
+        # 不記錄參數值（可能很大且含使用者資料），只記錄欄位名稱；非物件本體只記錄型別
+        fields = sorted(params) if isinstance(params, dict) else type(params).__name__
+        current_app.logger.warning("計算請求驗證失敗: %s, 欄位: %s", validation_errors, fields)
         return jsonify({'error': '請求資料不完整', 'details': validation_errors}), 400
+    if timer:
+        timer.mark('validate')
     
-    MAN_EN = 10000
-
-    monetization_model = params.get('monetizationModel')
-    purchase_type = params.get('purchaseType')
-    property_price = safe_float(params.get('propertyPrice')) * MAN_EN
-    down_payment_ratio = safe_float(params.get('downPaymentRatio')) / 100
-    acquisition_cost_ratio = safe_float(params.get('acquisitionCostRatio')) / 100
-    exchange_rate = safe_float(params.get('exchangeRate'))
-    loan_origin = params.get('loanOrigin')
-    initial_furnishing_cost = safe_float(params.get('initialFurnishingCost')) * MAN_EN
-
-    loan_interest_rate = 0
-    loan_term = 0
-    if loan_origin == 'japan' or loan_origin == 'mixed':
-        loan_interest_rate = safe_float(params.get('japanLoanInterestRate')) / 100
-        loan_term = safe_int(params.get('japanLoanTerm'))
-    elif loan_origin == 'taiwan':
-        loan_interest_rate = safe_float(params.get('taiwanLoanInterestRate')) / 100
-        loan_term = safe_int(params.get('taiwanLoanTerm'))
-
-    credit_loan_rate = safe_float(params.get('creditLoanRate')) / 100
-    management_fee_ratio = safe_float(params.get('managementFeeRatio')) / 100
-    property_tax_rate = safe_float(params.get('propertyTaxRate')) / 100
-    annual_appreciation = safe_float(params.get('annualAppreciation')) / 100
-    investment_period = safe_int(params.get('investmentPeriod'))
-    building_structure = params.get('buildingStructure')
-    building_ratio = safe_float(params.get('buildingRatio')) / 100
-    corporate_tax_rate = safe_float(params.get('corporateTaxRate')) / 100
-    annual_insurance_cost = safe_float(params.get('annualInsuranceCost')) * MAN_EN
-    
-    corporate_setup_cost = 0
-    if purchase_type == 'corporate':
-        corporate_setup_cost = safe_float(params.get('corporateSetupCost')) * MAN_EN
+    inputs = parse_inputs(params)
+    # 選用：逐年出場分析（exitAnalysis 為 true 或 ?fields= 明確選取時；exitAnalysisYears 預設為投資年數）
+    exit_selected = sections is not None and 'exit_analysis' in sections
+    exit_requested = params.get('exitAnalysis') or exit_selected
+    exit_years = (safe_int(params.get('exitAnalysisYears')) or None) if exit_requested else False
+    if timer:
+        timer.mark('parse')
+
+    # 以正規化後的輸入為快取鍵，語意相同的 payload 直接返回已序列化的結果
+    key = cache_key(inputs, exit_years, response_format, sections)
+    not_modified = not_modified_response(key)
+    if not_modified is not None:
+        return not_modified
+    body = result_cache.get(key)
+    if timer:
+        timer.mark('cache_lookup')
+    cache_status = 'HIT'
+    if body is None:
+        cache_status = 'MISS'
+        try:
+            body = build_calculation_response(inputs, exit_years, response_format, sections)
+        except ValueError as e:
+            return jsonify({'error': '出場年度分析參數錯誤', 'details': [str(e)]}), 400
+        result_cache.set(key, body)
+        if timer:
+            timer.mark('cache_store')
+
+    response = Response(body, mimetype='application/json')
+    response.set_etag(key)
+    response.headers['X-Cache'] = cache_status
+    return response
+
+def not_modified_response(etag):
+    """
+    用戶端已持有同一份結果時返回 304（不查快取也不重新試算），否則返回 None
+
+    壓縮後的回應 ETag 會加上編碼（見 config.compression），因此也接受目前協商到的編碼版本。
+    """
+    encoding = negotiate_encoding(request.accept_encodings)
+    candidates = (etag, f'{etag}-{encoding}') if encoding else (etag,)
+    for candidate in candidates:
+        if request.if_none_match.contains(candidate):
+            response = Response(status=304)
+            response.set_etag(candidate)
+            response.vary.add('Accept-Encoding')
+            return response
+    return None
 
-    annual_tax_accountant_fee = 0
-    if purchase_type == 'corporate':
-        annual_tax_accountant_fee = safe_float(params.get('annualTaxAccountantFee')) * MAN_EN
-    
-    total_upfront_costs = property_price * acquisition_cost_ratio
-    total_cost = property_price + total_upfront_costs
-    down_payment_amount = property_price * down_payment_ratio
-    loan_amount = property_price - down_payment_amount
-
-    own_capital_for_down_payment_amount = 0
-    credit_loan_for_down_payment_amount = 0
-
-    if loan_origin == 'mixed':
-        own_capital_amount_input = safe_float(params.get('ownCapitalAmount')) * MAN_EN
-        own_capital_for_down_payment_amount = min(own_capital_amount_input, down_payment_amount)
-        credit_loan_for_down_payment_amount = down_payment_amount - own_capital_for_down_payment_amount
+def parse_response_options(args):
+    """
+    解析 /calculate 的 ?format= 與 ?fields=
+
+    Returns:
+        tuple: (回應格式, 排序後的區塊名稱 tuple；未指定 fields 時為 None)
+    """
+    response_format = args.get('format', 'legacy')
+    if response_format not in RESPONSE_FORMATS:
+        raise ValueError(f"format 必須是 {', '.join(RESPONSE_FORMATS)} 之一")
+    fields = args.get('fields')
+    if fields is None:
+        return response_format, None
+    sections = tuple(sorted({name.strip() for name in fields.split(',') if name.strip()}))
+    unknown = [name for name in sections if name not in SELECTABLE_SECTIONS]
+    if unknown or not sections:
+        raise ValueError(f"fields 只能包含 {', '.join(SELECTABLE_SECTIONS)}")
+    return response_format, sections
+
+def finite_float(value):
+    """轉換為有限浮點數；無法轉換、布林值或 inf / nan 時返回 None"""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+def build_calculation_response(inputs, exit_years, response_format='legacy', sections=None):
+    """執行試算並返回序列化後的 JSON 內容（sections 為 None 時輸出全部區塊）"""
+    timer = current_timer()
+    # 財務計算交由獨立的計算引擎處理（引擎內記錄 revenue / amortization / cash_flows / irr 各階段）
+    result = evaluate(inputs)
+    cash_flows = result.cash_flows
+
+    # 調試輸出（DEBUG 取樣）
+    if debug_sampled(current_app.logger):
+        current_app.logger.debug(
+            "試算完成 - 房價: %.1f萬円, 初始投資: %.1f萬円, 月收入: %.1f萬円, 月支出: %.1f萬円, 月貸款: %.1f萬円, "
+            "年度現金流: %s萬円, 物件價格: %.0f TWD, 投資期間: %d 年",
+            inputs.property_price / MAN_EN, result.total_initial_investment / MAN_EN,
+            result.monthly_gross_revenue / MAN_EN, result.monthly_operating_expenses / MAN_EN,
+            result.monthly_payment / MAN_EN, [round(flow / MAN_EN, 1) for flow in cash_flows[1:3]],
+            inputs.property_price * inputs.exchange_rate, inputs.investment_period,
+        )
+
+    if timer:
+        timer.mark('debug_log')
+
+    compact = response_format == 'compact'
+    response = result.to_compact_dict(sections) if compact else result.to_dict(sections)
+    if timer:
+        timer.mark('result_dict')
+    if exit_years is not False and (sections is None or 'exit_analysis' in sections):
+        # 出場年度分析整體計為單一階段
+        with suspended_timing():
+            analysis = exit_year_analysis(inputs, max_years=exit_years)
+            response['exit_analysis'] = \
+                analysis.to_compact_dict() if compact else analysis.to_dict()
+        if timer:
+            timer.mark('exit_analysis')
+    body = json_dumps(response, sort_keys=current_app.json.sort_keys)
+    if timer:
+        timer.mark('serialize')
+    return body
+
+@bp.route('/calculate/batch', methods=['POST'])
+@calculation_rate_limit  # 整批只計為一次計算請求
+def calculate_batch():
+    """
+    批次試算：一次評估多組參數
+
+    請求格式:
+        {"base": {...}, "scenarios": [{...覆寫欄位}, ...]}
+    每個情境以 base 為底套用覆寫；未提供 base 時每個情境即為完整參數。
+    """
+    # 向量化引擎依賴 NumPy，僅在使用批次功能時載入
+    from engine.vectorized import evaluate_batch
+
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': '請求資料不完整', 'details': ['請求資料必須是 JSON 物件']}), 400
+    base = payload.get('base') or {}
+    scenarios = payload.get('scenarios')
+
+    if not isinstance(base, dict) or not isinstance(scenarios, list) or not scenarios:
+        return jsonify({'error': '請求資料不完整', 'details': ['scenarios 必須是非空陣列']}), 400
+    if len(scenarios) > MAX_BATCH_SCENARIOS:
+        return jsonify({'error': '情境數量過多', 'details': [f'單次最多 {MAX_BATCH_SCENARIOS} 組情境']}), 400
+
+    inputs_list = []
+    for index, overrides in enumerate(scenarios):
+        if not isinstance(overrides, dict):
+            return jsonify({'error': '請求資料不完整', 'details': [f'第 {index} 組情境必須是物件']}), 400
+        params = {**base, **overrides} if base else overrides
+        validation_errors = validate_request_data(params, CALCULATION_REQUIRED_FIELDS)
+        if validation_errors:
+            return jsonify({'error': '請求資料不完整', 'index': index, 'details': validation_errors}), 400
+        inputs_list.append(parse_inputs(params))
+
+    try:
+        batch = evaluate_batch(inputs_list)
+    except ValueError as e:
+        return jsonify({'error': '批次試算規模過大', 'details': [str(e)]}), 400
+    current_app.logger.info("批次試算完成 - 情境數: %d", len(batch))
+
+    return jsonify({'count': len(batch), 'results': batch.to_rows()})
+
+@bp.route('/simulate/montecarlo', methods=['POST'])
+@calculation_rate_limit
+def simulate_montecarlo():
+    """
+    蒙地卡羅風險模擬
+
+    請求格式: /calculate 的完整參數，另加
+        distributions: {"occupancyRate": {"dist": "normal", "std": 10}, ...}
+        paths: 路徑數（預設 10000）、seed: 亂數種子（預設 0）、bins: 直方圖分箱數（預設 20）
+    """
+    from engine import montecarlo
+
+    params = request.get_json(silent=True) or {}
+    validation_errors = validate_request_data(params, CALCULATION_REQUIRED_FIELDS)
+    if not isinstance(params, dict):
+        return jsonify({'error': '請求資料不完整', 'details': validation_errors}), 400
+    distributions = params.get('distributions')
+    if not isinstance(distributions, dict) or not distributions:
+        validation_errors.append('distributions 必須是非空物件')
+    if validation_errors:
+        return jsonify({'error': '請求資料不完整', 'details': validation_errors}), 400
+
+    paths = safe_int(params.get('paths'), montecarlo.DEFAULT_PATHS)
+    seed = safe_int(params.get('seed'), montecarlo.DEFAULT_SEED)
+    bins = min(max(safe_int(params.get('bins'), montecarlo.DEFAULT_BINS), 1), montecarlo.MAX_BINS)
+    try:
+        simulation = montecarlo.simulate(parse_inputs(params), distributions,
+                                         paths=paths, seed=seed)
+    except ValueError as e:
+        return jsonify({'error': '模擬參數錯誤', 'details': [str(e)]}), 400
+
+    current_app.logger.info("蒙地卡羅模擬完成 - 路徑數: %d, 參數: %s",
+                            simulation.paths, ', '.join(sorted(distributions)))
+    return jsonify(simulation.to_dict(bins=bins))
+
+@bp.route('/analysis/sensitivity-grid', methods=['POST'])
+@calculation_rate_limit
+def sensitivity_grid():
+    """
+    二維敏感度分析（熱力圖）
+
+    請求格式: /calculate 的完整參數，另加
+        xAxis / yAxis: {"field": "propertyPrice", "start": 2500, "stop": 3500, "steps": 21}
+                       或 {"field": "occupancyRate", "values": [50, 60, 70]}
+    """
+    from engine import sensitivity
+
+    params = request.get_json(silent=True) or {}
+    validation_errors = validate_request_data(params, CALCULATION_REQUIRED_FIELDS)
+    if not isinstance(params, dict):
+        return jsonify({'error': '請求資料不完整', 'details': validation_errors}), 400
+    if not isinstance(params.get('xAxis'), dict) or not isinstance(params.get('yAxis'), dict):
+        validation_errors.append('xAxis 與 yAxis 必須是物件')
+    if validation_errors:
+        return jsonify({'error': '請求資料不完整', 'details': validation_errors}), 400
+
+    try:
+        grid = sensitivity.sensitivity_grid(parse_inputs(params), params['xAxis'], params['yAxis'])
+    except ValueError as e:
+        return jsonify({'error': '敏感度分析參數錯誤', 'details': [str(e)]}), 400
+
+    current_app.logger.info("敏感度網格完成 - %s × %s, 情境數: %d", grid.x.key, grid.y.key, len(grid.batch))
+    return jsonify(grid.to_dict())
+
+@bp.route('/analysis/tornado', methods=['POST'])
+@calculation_rate_limit
+def sensitivity_tornado():
+    """
+    單因子敏感度分析（龍捲風圖）
+
+    請求格式: /calculate 的完整參數，另加（皆為選填）
+        variation: 擾動幅度百分比（預設 10，即 ±10%）
+        ranges: {"occupancyRate": {"low": 50, "high": 90}, ...}
+        fields: 只分析指定的欄位
+        sortBy: irr / cash_on_cash_return / dscr（預設 irr）
+        save: 為 true 且已登入時，結果存為 analysis_type = 'sensitivity' 的分析紀錄
+    """
+    from engine import sensitivity
+
+    params = request.get_json(silent=True) or {}
+    validation_errors = validate_request_data(params, CALCULATION_REQUIRED_FIELDS)
+    if not isinstance(params, dict):
+        return jsonify({'error': '請求資料不完整', 'details': validation_errors}), 400
+    ranges = params.get('ranges') or {}
+    fields = params.get('fields')
+    if not isinstance(ranges, dict):
+        validation_errors.append('ranges 必須是物件')
+    if fields is not None and (not isinstance(fields, list)
+                               or not all(isinstance(key, str) for key in fields)):
+        validation_errors.append('fields 必須是字串陣列')
+    # 只有未提供 variation 時才使用預設值；0 或非數值交由下方回報錯誤
+    variation = params.get('variation')
+    if variation is None:
+        variation = sensitivity.DEFAULT_VARIATION * 100
     else:
-        own_capital_for_down_payment_amount = down_payment_amount
-        credit_loan_for_down_payment_amount = 0
-
-    total_initial_investment = own_capital_for_down_payment_amount + total_upfront_costs + initial_furnishing_cost + corporate_setup_cost
-
-    monthly_gross_revenue = 0
-    monthly_operating_expenses = 0
-    one_time_initial_income = 0
-    annual_renewal_fee = 0
-
-    if monetization_model == 'airbnb':
-        operating_days_cap = safe_int(params.get('operatingDaysCap'))
-        occupancy_rate = safe_float(params.get('occupancyRate')) / 100
-        daily_rate = safe_float(params.get('dailyRate'))
-        platform_fee_rate = safe_float(params.get('platformFeeRate')) / 100
-        cleaning_fee = safe_float(params.get('cleaningFee')) * MAN_EN
-        avg_stay_duration = safe_float(params.get('avgStayDuration'))
-        avg_guests = safe_float(params.get('avgGuests'))
-        base_occupancy_for_fee = safe_float(params.get('baseOccupancyForFee'))
-        extra_guest_fee = safe_float(params.get('extraGuestFee')) * MAN_EN
-        peak_season_markup = safe_float(params.get('peakSeasonMarkup')) / 100
-        monthly_utilities = safe_float(params.get('monthlyUtilities')) * MAN_EN
-
-        # 計算實際收入
-        max_possible_nights = min(365, operating_days_cap)
-        annual_booked_nights = max_possible_nights * occupancy_rate
-        monthly_booked_nights = annual_booked_nights / 12
-        total_effective_adr = daily_rate * (1 + peak_season_markup * 3 / 12) + max(0, avg_guests - base_occupancy_for_fee) * extra_guest_fee
-        monthly_gross_revenue = monthly_booked_nights * total_effective_adr
-        turnovers_per_month = monthly_booked_nights / avg_stay_duration if avg_stay_duration > 0 else 0
-        monthly_operating_expenses = monthly_gross_revenue * platform_fee_rate + turnovers_per_month * cleaning_fee + monthly_utilities
+        variation = finite_float(variation)
+    if variation is None:
+        validation_errors.append('variation 必須是有效數值')
+    if validation_errors:
+        return jsonify({'error': '請求資料不完整', 'details': validation_errors}), 400
+
+    try:
+        result = sensitivity.tornado(parse_inputs(params), variation=variation / 100,
+                                     ranges=ranges, fields=fields)
+        response = result.to_dict(sort_by=params.get('sortBy') or 'irr')
+    except ValueError as e:
+        return jsonify({'error': '敏感度分析參數錯誤', 'details': [str(e)]}), 400
+
+    if params.get('save') and current_user.is_authenticated:
+        analysis = AnalysisResult(id=str(uuid.uuid4()), user_id=current_user.id,
+                                  analysis_type='sensitivity')
+        analysis.set_parameters({key: value for key, value in params.items() if key != 'save'})
+        analysis.set_results(response)
+        db.session.add(analysis)
+        db.session.commit()
+        response['analysis_id'] = analysis.id
+
+    current_app.logger.info("龍捲風分析完成 - 參數數: %d, 情境數: %d", len(result.keys), len(result.batch))
+    return jsonify(response)
+
+@bp.route('/analysis/goal-seek', methods=['POST'])
+@calculation_rate_limit
+def goal_seek():
+    """
+    目標值反推：求使 KPI 達到目標的單一參數值
+
+    請求格式: /calculate 的完整參數，另加
+        goalSeek: {"field": "propertyPrice", "kpi": "irr", "target": 8, "low": 1000, "high": 5000}
+    kpi 可為 irr / cash_on_cash_return（百分比）或 dscr；low / high 為選填的搜尋區間（payload 單位）
+    """
+    from engine.goalseek import goal_seek as solve
+
+    params = request.get_json(silent=True) or {}
+    validation_errors = validate_request_data(params, CALCULATION_REQUIRED_FIELDS)
+    if not isinstance(params, dict):
+        return jsonify({'error': '請求資料不完整', 'details': validation_errors}), 400
+    spec = params.get('goalSeek')
+    if not isinstance(spec, dict) or not spec.get('field') or spec.get('target') in (None, ''):
+        validation_errors.append('goalSeek 必須包含 field 與 target')
     else:
-        monthly_rent = 0
-        vacancy_rate = 0
-        initial_ratio = 0
-        lease_utilities = 0
-        if monetization_model == 'personalLease':
-            monthly_rent = safe_float(params.get('monthlyRent')) * MAN_EN
-            vacancy_rate = safe_float(params.get('vacancyRate')) / 100
-            initial_ratio = safe_float(params.get('initialLeaseCostsRatio'))
-            lease_utilities = safe_float(params.get('leaseUtilities')) * MAN_EN
-            lease_renewal_fee_frequency = safe_float(params.get('leaseRenewalFeeFrequency'))
-            lease_renewal_fee_amount = safe_float(params.get('leaseRenewalFeeAmount'))
-            if lease_renewal_fee_frequency > 0 and lease_renewal_fee_amount > 0:
-                 annual_renewal_fee = (monthly_rent * lease_renewal_fee_amount) / lease_renewal_fee_frequency
-        else: # Commercial Lease
-            monthly_rent = safe_float(params.get('monthlyRentCommercial')) * MAN_EN
-            vacancy_rate = safe_float(params.get('vacancyRateCommercial')) / 100
-            initial_ratio = safe_float(params.get('initialLeaseCostsRatioCommercial'))
-            lease_utilities = 0 # Typically tenant pays utilities for commercial
-        
-        monthly_gross_revenue = monthly_rent * (1 - vacancy_rate)
-        one_time_initial_income = monthly_rent * initial_ratio
-        monthly_operating_expenses = lease_utilities
-
-    monthly_net_revenue = monthly_gross_revenue - monthly_operating_expenses
-    
-    monthly_payment = 0
-    if loan_amount > 0 and loan_term > 0 and loan_interest_rate > 0:
-        monthly_rate = loan_interest_rate / 12
-        num_payments = loan_term * 12
-        monthly_payment = loan_amount * (monthly_rate * (1 + monthly_rate)**num_payments) / ((1 + monthly_rate)**num_payments - 1)
-    elif loan_amount > 0 and loan_term > 0:
-        monthly_payment = loan_amount / (loan_term * 12)
-
-    credit_loan_payment = 0
-    if credit_loan_for_down_payment_amount > 0:
-        monthly_credit_rate = credit_loan_rate / 12
-        num_credit_payments = 60 # 5 years
-        credit_loan_payment = credit_loan_for_down_payment_amount * (monthly_credit_rate * (1 + monthly_credit_rate)**num_credit_payments) / ((1 + monthly_credit_rate)**num_credit_payments - 1)
-
-    monthly_management_and_repairs = monthly_gross_revenue * management_fee_ratio
-    monthly_property_tax = (property_price * property_tax_rate) / 12
-    # 修正：貸款本息攤還、管理費、房屋稅等固定支出
-    monthly_fixed_expenses = monthly_payment + credit_loan_payment + monthly_management_and_repairs + monthly_property_tax
-    annual_fixed_expenses = monthly_fixed_expenses * 12 + annual_insurance_cost + annual_tax_accountant_fee
-
-    cash_flows = [-total_initial_investment]
-    remaining_loan = loan_amount
-    annual_depreciation = (property_price * building_ratio) / (22 if building_structure == 'wood' else 47)
-    annual_tax_y1 = 0
-    annual_tax_y2 = 0
-    
-    # 追蹤實際利息支付
-    actual_interest_y1 = 0
-    actual_interest_y2 = 0
-
-    for year in range(1, investment_period + 1):
-        lease_renewal_fee_frequency = safe_float(params.get('leaseRenewalFeeFrequency'), 2)
-        is_renewal_year = (monetization_model == 'personalLease' and annual_renewal_fee > 0 and year > 0 and year % lease_renewal_fee_frequency == 0)
-        current_year_renewal_fee = annual_renewal_fee * lease_renewal_fee_frequency if is_renewal_year else 0
-        
-        # 正確計算年度收入（EBITDA層級）
-        annual_gross_income = monthly_gross_revenue * 12 + (one_time_initial_income if year == 1 else 0) + current_year_renewal_fee
-        annual_operating_expenses = monthly_operating_expenses * 12
-        annual_ebitda = annual_gross_income - annual_operating_expenses
-        
-        # 計算實際支付的貸款利息和本金
-        annual_interest_paid = 0
-        annual_principal_paid = 0
-        annual_credit_interest_paid = 0
-        year_start_loan_balance = remaining_loan
-
-        if remaining_loan > 0 and monthly_payment > 0:
-            for m in range(12):
-                if remaining_loan <= 0:
-                    break
-                interest = remaining_loan * (loan_interest_rate / 12)
-                principal = monthly_payment - interest
-                annual_interest_paid += interest
-                annual_principal_paid += principal
-                remaining_loan = max(0, remaining_loan - principal)
-
-        # 正確計算稅前現金流：EBITDA - 實際債務服務（本息攤還）- 管理費等其他費用
-        annual_debt_service_actual = annual_interest_paid + annual_principal_paid + (credit_loan_payment * 12)
-        pre_tax_cash_flow = annual_ebitda - annual_debt_service_actual - (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - annual_insurance_cost - annual_tax_accountant_fee
-        post_tax_annual_cash_flow = pre_tax_cash_flow
-
-        if purchase_type == 'corporate':
-            # 法人稅計算：收入 - 各項費用 - 折舊
-            taxable_income = annual_gross_income - annual_operating_expenses - annual_interest_paid - \
-                           (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - \
-                           annual_insurance_cost - annual_tax_accountant_fee - annual_depreciation
-            annual_tax = taxable_income * corporate_tax_rate if taxable_income > 0 else 0
-            if year == 1:
-                annual_tax_y1 = annual_tax
-            if year == 2:
-                annual_tax_y2 = annual_tax
-            post_tax_annual_cash_flow -= annual_tax
-        
-        # 記錄實際利息支付
-        if year == 1:
-            actual_interest_y1 = annual_interest_paid
-        if year == 2:
-            actual_interest_y2 = annual_interest_paid
-
-        if year == investment_period:
-            current_property_value = property_price * ((1 + annual_appreciation) ** year)
-            selling_costs = current_property_value * 0.03
-
-            final_loan_balance = loan_amount
-            if loan_amount > 0 and monthly_payment > 0:
-                for y in range(investment_period):
-                    if final_loan_balance <= 0:
-                        break
-                    for m in range(12):
-                        interest = final_loan_balance * (loan_interest_rate / 12)
-                        principal = monthly_payment - interest
-                        final_loan_balance -= principal
-            
-            final_loan_balance = max(0, final_loan_balance)
-
-            capital_gains_tax = 0
-            if purchase_type == 'corporate':
-                accumulated_depreciation = annual_depreciation * investment_period
-                building_book_value = (property_price * building_ratio) - accumulated_depreciation
-                land_value = property_price * (1 - building_ratio)
-                book_value = building_book_value + land_value
-                capital_gain = current_property_value - book_value - selling_costs
-                if capital_gain > 0:
-                    capital_gains_tax = capital_gain * corporate_tax_rate
-            else: # Individual
-                capital_gain = current_property_value - (property_price + total_upfront_costs)
-                if capital_gain > 0:
-                    tax_rate = 0.20315 if investment_period >= 5 else 0.3963
-                    capital_gains_tax = capital_gain * tax_rate
-            
-            net_sale_proceeds = current_property_value - selling_costs - final_loan_balance - capital_gains_tax
-            cash_flows.append(post_tax_annual_cash_flow + net_sale_proceeds)
-        else:
-            cash_flows.append(post_tax_annual_cash_flow)
-
-    # 計算 KPI 指標
-    irr = compute_irr(cash_flows)
-    
-    # 計算現金回報率 (使用穩定年度的現金流，通常是第二年)
-    annual_net_cash_flow_stable = cash_flows[2] if len(cash_flows) > 2 else (cash_flows[1] if len(cash_flows) > 1 else 0)
-    cash_on_cash_return = (annual_net_cash_flow_stable / total_initial_investment) * 100 if total_initial_investment > 0 else 0
-    
-    # 計算回收期
-    payback_period = 0
-    cumulative_cash_flow = 0
-    for i, cf in enumerate(cash_flows[1:], 1):  # 跳過初始投資
-        cumulative_cash_flow += cf
-        if cumulative_cash_flow >= total_initial_investment:
-            payback_period = i + (total_initial_investment - (cumulative_cash_flow - cf)) / cf
-            break
-    
-    # === 新增槓桿風險指標計算 ===
-    
-    # 1. 計算年度債務服務總額 (Annual Debt Service - ADS)
-    annual_debt_service = (monthly_payment + credit_loan_payment) * 12
-    
-    # 2. 計算年度淨營運收入 (Net Operating Income - NOI)
-    # NOI = 總收入 - 營運費用 (不包含融資成本、折舊、稅務)
-    annual_noi = (monthly_gross_revenue * 12) - (monthly_operating_expenses * 12) - (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - annual_insurance_cost
-    
-    # 3. DCR (Debt Coverage Ratio) - 債務覆蓋率
-    dcr = annual_noi / annual_debt_service if annual_debt_service > 0 else float('inf')
-    
-    # 4. DSCR (Debt Service Coverage Ratio) - 債務償付覆蓋率  
-    # 使用穩定年度的 EBITDA
-    annual_ebitda_stable = (monthly_gross_revenue * 12) - (monthly_operating_expenses * 12)
-    dscr = annual_ebitda_stable / annual_debt_service if annual_debt_service > 0 else float('inf')
-    
-    # 5. LTV (Loan-to-Value) - 貸款價值比
-    total_loan_amount = loan_amount + credit_loan_for_down_payment_amount
-    ltv = (total_loan_amount / property_price) * 100 if property_price > 0 else 0
-    
-    # 6. 槓桿倍數 (Leverage Ratio)
-    leverage_ratio = total_loan_amount / total_initial_investment if total_initial_investment > 0 else 0
-    
-    # 7. 槓桿後 ROE (Leveraged Return on Equity)
-    # 使用稅後淨現金流計算
-    leveraged_roe = (annual_net_cash_flow_stable / total_initial_investment) * 100 if total_initial_investment > 0 else 0
-    
-    # 8. 計算健康度評級
-    def get_health_rating(dcr, dscr, ltv, cocr):
-        """
-        根據關鍵指標計算投資健康度
-        返回: (rating, color, description)
-        """
-        danger_count = 0
-        warning_count = 0
-        
-        # DCR 評估
-        if dcr < 1.10:
-            danger_count += 1
-        elif dcr < 1.25:
-            warning_count += 1
-            
-        # DSCR 評估  
-        if dscr < 1.15:
-            danger_count += 1
-        elif dscr < 1.30:
-            warning_count += 1
-            
-        # LTV 評估
-        if ltv > 85:
-            danger_count += 1
-        elif ltv > 75:
-            warning_count += 1
-            
-        # CoCR 評估
-        if cocr < 3:
-            danger_count += 1
-        elif cocr < 5:
-            warning_count += 1
-        
-        if danger_count >= 2:
-            return ("危險", "danger", "多項關鍵指標低於安全標準，投資風險較高")
-        elif danger_count >= 1 or warning_count >= 3:
-            return ("警告", "warning", "部分指標需要關注，建議優化投資結構")
-        elif warning_count >= 1:
-            return ("良好", "good", "整體表現良好，少數指標有改善空間")
-        else:
-            return ("優秀", "excellent", "各項指標表現優異，投資結構健康")
-    
-    health_rating, health_color, health_description = get_health_rating(dcr, dscr, ltv, cash_on_cash_return)
-    
-    # 準備年度預測數據
-    annual_projections = []
-    current_property_value = property_price
-    projection_loan_balance = loan_amount
-    
-    for year in range(1, investment_period + 1):
-        current_property_value = property_price * ((1 + annual_appreciation) ** year)
-        
-        # 正確計算年末貸款餘額
-        if projection_loan_balance > 0 and monthly_payment > 0:
-            for m in range(12):
-                if projection_loan_balance <= 0:
-                    break
-                interest = projection_loan_balance * (loan_interest_rate / 12)
-                principal = monthly_payment - interest
-                projection_loan_balance = max(0, projection_loan_balance - principal)
-        
-        net_equity = current_property_value - projection_loan_balance
-        
-        annual_projections.append({
-            "year": year,
-            "net_cash_flow": (cash_flows[year] if year < len(cash_flows) else 0) / MAN_EN,
-            "property_value": current_property_value / MAN_EN,  # 轉換為萬円
-            "loan_balance": projection_loan_balance / MAN_EN,  # 轉換為萬円
-            "net_equity": net_equity / MAN_EN,  # 轉換為萬円
-            "net_equity_twd": (net_equity / MAN_EN) * exchange_rate  # 轉換為萬台幣
-        })
-
-    # 計算額外的 KPI 指標
-    loan_to_value = (loan_amount / property_price) * 100 if property_price > 0 else 0
-    annual_debt_service = monthly_payment * 12 + (credit_loan_payment * 12)
-    
-    # 正確計算 NOI：總租金收入 - 營運費用（不包括貸款本息、折舊、稅金）
-    annual_noi = (monthly_gross_revenue * 12) - (monthly_operating_expenses * 12) - (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - annual_insurance_cost
-    noi = annual_noi
-    debt_coverage_ratio = noi / annual_debt_service if annual_debt_service > 0 else 0
-    dscr = debt_coverage_ratio  # 同樣的指標，不同名稱
-    # 修正槓桿比率：使用貸款價值比 (LTV) 作為槓桿指標
-    leverage_ratio = loan_to_value / 100  # LTV 已經是百分比，轉換為小數
-    leveraged_roe = cash_on_cash_return  # 槓桿後 ROE 與現金回報率相同
-
-    results = {
-        "kpi": {
-            "cash_on_cash_return": cash_on_cash_return,
-            "irr": irr * 100 if irr else 0,  # 轉換為百分比
-            "payback_period": payback_period,
-            "loan_to_value": loan_to_value,
-            "debt_coverage_ratio": debt_coverage_ratio,
-            "dscr": dscr,
-            "leverage_ratio": leverage_ratio,
-            "leveraged_roe": leveraged_roe,
-            "annual_debt_service": annual_debt_service / MAN_EN,
-            "noi": noi / MAN_EN
-        },
-        "leverage_metrics": {
-            "dcr": dcr,
-            "dscr": dscr, 
-            "ltv": ltv,
-            "leverage_ratio": leverage_ratio,
-            "leveraged_roe": leveraged_roe,
-            "annual_debt_service_jpy": annual_debt_service / MAN_EN,
-            "annual_debt_service_twd": (annual_debt_service / MAN_EN) * exchange_rate,
-            "annual_noi_jpy": annual_noi / MAN_EN,
-            "annual_noi_twd": (annual_noi / MAN_EN) * exchange_rate,
-            "health_rating": health_rating,
-            "health_color": health_color,
-            "health_description": health_description
-        },
-        "initial_investment": {
-            "total_investment_jpy": total_initial_investment / MAN_EN,
-            "total_investment_twd": (total_initial_investment / MAN_EN) * exchange_rate,
-            "acquisition_costs_jpy": total_upfront_costs / MAN_EN,
-            "acquisition_costs_twd": (total_upfront_costs / MAN_EN) * exchange_rate,
-            "initial_setup_costs_jpy": (initial_furnishing_cost + corporate_setup_cost) / MAN_EN,
-            "initial_setup_costs_twd": ((initial_furnishing_cost + corporate_setup_cost) / MAN_EN) * exchange_rate,
-            "down_payment_own_capital_jpy": own_capital_for_down_payment_amount / MAN_EN,
-            "down_payment_own_capital_twd": (own_capital_for_down_payment_amount / MAN_EN) * exchange_rate,
-            "down_payment_credit_loan_jpy": credit_loan_for_down_payment_amount / MAN_EN,
-            "down_payment_credit_loan_twd": (credit_loan_for_down_payment_amount / MAN_EN) * exchange_rate,
-            "loan_amount_jpy": loan_amount / MAN_EN,
-            "loan_amount_twd": (loan_amount / MAN_EN) * exchange_rate
-        },
-        "cash_flow": {
-            # 使用穩定年度（第二年）的數據進行計算，確保數字一致性
-            # 1. 總租金收入
-            "total_revenue_jpy": monthly_gross_revenue * 12 / MAN_EN,
-            "total_revenue_twd": ((monthly_gross_revenue * 12) / MAN_EN) * exchange_rate,
-            
-            # 2. 營運總支出（僅包含直接營運費用）
-            "operating_expenses_jpy": monthly_operating_expenses * 12 / MAN_EN,
-            "operating_expenses_twd": ((monthly_operating_expenses * 12) / MAN_EN) * exchange_rate,
-            
-            # 3. EBITDA = 總收入 - 營運支出
-            "ebitda_jpy": (monthly_gross_revenue * 12 - monthly_operating_expenses * 12) / MAN_EN,
-            "ebitda_twd": ((monthly_gross_revenue * 12 - monthly_operating_expenses * 12) / MAN_EN) * exchange_rate,
-            
-            # 4. 建物折舊
-            "depreciation_jpy": annual_depreciation / MAN_EN,
-            "depreciation_twd": (annual_depreciation / MAN_EN) * exchange_rate,
-            
-            # 5. 貸款利息（使用第二年的利息，因為第一年利息較高）
-            "interest_payment_jpy": (loan_interest_rate * (loan_amount * 0.9) if loan_amount > 0 else 0) / MAN_EN,
-            "interest_payment_twd": ((loan_interest_rate * (loan_amount * 0.9) if loan_amount > 0 else 0) / MAN_EN) * exchange_rate,
-            
-            # 6. 其他費用（管理費、房屋稅、保險、會計師費）
-            "other_expenses_jpy": ((monthly_management_and_repairs * 12) + (monthly_property_tax * 12) + annual_insurance_cost + annual_tax_accountant_fee) / MAN_EN,
-            "other_expenses_twd": (((monthly_management_and_repairs * 12) + (monthly_property_tax * 12) + annual_insurance_cost + annual_tax_accountant_fee) / MAN_EN) * exchange_rate,
-            
-            # 7. 稅前淨利 (EBT) = EBITDA - 折舊 - 利息 - 其他費用
-            "ebt_jpy": ((monthly_gross_revenue * 12 - monthly_operating_expenses * 12) - annual_depreciation - (loan_interest_rate * (loan_amount * 0.9) if loan_amount > 0 else 0) - (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - annual_insurance_cost - annual_tax_accountant_fee) / MAN_EN,
-            "ebt_twd": (((monthly_gross_revenue * 12 - monthly_operating_expenses * 12) - annual_depreciation - (loan_interest_rate * (loan_amount * 0.9) if loan_amount > 0 else 0) - (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - annual_insurance_cost - annual_tax_accountant_fee) / MAN_EN) * exchange_rate,
-            
-            # 8. 應繳稅款
-            "tax_jpy": annual_tax_y2 / MAN_EN,
-            "tax_twd": (annual_tax_y2 / MAN_EN) * exchange_rate,
-            
-            # 9. 稅後淨現金流
-            "net_cash_flow_jpy": (cash_flows[2] if len(cash_flows) > 2 else (cash_flows[1] if len(cash_flows) > 1 else 0)) / MAN_EN,
-            "net_cash_flow_twd": ((cash_flows[2] if len(cash_flows) > 2 else (cash_flows[1] if len(cash_flows) > 1 else 0)) / MAN_EN) * exchange_rate,
-            
-            # 保留舊版本相容性
-            "total_revenue_y1": (monthly_gross_revenue * 12 + one_time_initial_income) / MAN_EN,
-            "total_revenue_y2": monthly_gross_revenue * 12 / MAN_EN,
-            "total_expenses_y1": monthly_operating_expenses * 12 / MAN_EN,
-            "total_expenses_y2": monthly_operating_expenses * 12 / MAN_EN,
-            "ebitda_y1": ((monthly_gross_revenue * 12 + one_time_initial_income) - monthly_operating_expenses * 12) / MAN_EN,
-            "ebitda_y2": (monthly_gross_revenue * 12 - monthly_operating_expenses * 12) / MAN_EN,
-            "depreciation": annual_depreciation / MAN_EN,
-            "interest_payment_y1": actual_interest_y1 / MAN_EN,
-            "interest_payment_y2": actual_interest_y2 / MAN_EN,
-            "ebt_y1": (((monthly_gross_revenue * 12 + one_time_initial_income) - monthly_operating_expenses * 12) - annual_depreciation - actual_interest_y1 - (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - annual_insurance_cost - annual_tax_accountant_fee) / MAN_EN,
-            "ebt_y2": ((monthly_gross_revenue * 12 - monthly_operating_expenses * 12) - annual_depreciation - actual_interest_y2 - (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - annual_insurance_cost - annual_tax_accountant_fee) / MAN_EN,
-            "tax_y1": annual_tax_y1 / MAN_EN,
-            "tax_y2": annual_tax_y2 / MAN_EN,
-            "net_cash_flow_y1": cash_flows[1] / MAN_EN if len(cash_flows) > 1 else 0,
-            "net_cash_flow_y2": cash_flows[2] / MAN_EN if len(cash_flows) > 2 else (cash_flows[1] / MAN_EN if len(cash_flows) > 1 else 0),
-            
-            # 新增穩定年度現金流（日幣和台幣）
-            "total_revenue_stable_jpy": (monthly_gross_revenue * 12) / MAN_EN,
-            "total_revenue_stable_twd": ((monthly_gross_revenue * 12) / MAN_EN) * exchange_rate,
-            "total_expenses_stable_jpy": (monthly_operating_expenses * 12) / MAN_EN,
-            "total_expenses_stable_twd": ((monthly_operating_expenses * 12) / MAN_EN) * exchange_rate,
-            "ebitda_stable_jpy": ((monthly_gross_revenue * 12) - (monthly_operating_expenses * 12)) / MAN_EN,
-            "ebitda_stable_twd": (((monthly_gross_revenue * 12) - (monthly_operating_expenses * 12)) / MAN_EN) * exchange_rate,
-            "depreciation_jpy": annual_depreciation / MAN_EN,
-            "depreciation_twd": (annual_depreciation / MAN_EN) * exchange_rate,
-            "interest_payment_stable_jpy": actual_interest_y2 / MAN_EN,
-            "interest_payment_stable_twd": (actual_interest_y2 / MAN_EN) * exchange_rate,
-            "other_expenses_jpy": ((monthly_management_and_repairs * 12) + (monthly_property_tax * 12) + annual_insurance_cost + annual_tax_accountant_fee) / MAN_EN,
-            "other_expenses_twd": (((monthly_management_and_repairs * 12) + (monthly_property_tax * 12) + annual_insurance_cost + annual_tax_accountant_fee) / MAN_EN) * exchange_rate,
-            "ebt_stable_jpy": (((monthly_gross_revenue * 12 - monthly_operating_expenses * 12) - annual_depreciation - actual_interest_y2 - (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - annual_insurance_cost - annual_tax_accountant_fee) / MAN_EN),
-            "ebt_stable_twd": (((monthly_gross_revenue * 12 - monthly_operating_expenses * 12) - annual_depreciation - actual_interest_y2 - (monthly_management_and_repairs * 12) - (monthly_property_tax * 12) - annual_insurance_cost - annual_tax_accountant_fee) / MAN_EN) * exchange_rate,
-            "tax_stable_jpy": annual_tax_y2 / MAN_EN,
-            "tax_stable_twd": (annual_tax_y2 / MAN_EN) * exchange_rate,
-            "net_cash_flow_stable_jpy": (cash_flows[2] if len(cash_flows) > 2 else (cash_flows[1] if len(cash_flows) > 1 else 0)) / MAN_EN,
-            "net_cash_flow_stable_twd": ((cash_flows[2] if len(cash_flows) > 2 else (cash_flows[1] if len(cash_flows) > 1 else 0)) / MAN_EN) * exchange_rate
-        },
-        "annual_projections": annual_projections,
-        "suggestions": []  # 可以後續添加建議邏輯
-    }
-
-    # 調試輸出
-    app.logger.info(f"=== 調試資訊 ===")
-    app.logger.info(f"房價: {property_price/MAN_EN:.1f}萬円")
-    app.logger.info(f"初始投資: {total_initial_investment/MAN_EN:.1f}萬円")
-    app.logger.info(f"月收入: {monthly_gross_revenue/MAN_EN:.1f}萬円")
-    app.logger.info(f"月支出: {monthly_operating_expenses/MAN_EN:.1f}萬円")
-    app.logger.info(f"月貸款: {monthly_payment/MAN_EN:.1f}萬円")
-    app.logger.info(f"年度現金流[1]: {cash_flows[1]/MAN_EN:.1f}萬円" if len(cash_flows) > 1 else "年度現金流[1]: 無資料")
-    app.logger.info(f"年度現金流[2]: {cash_flows[2]/MAN_EN:.1f}萬円" if len(cash_flows) > 2 else "年度現金流[2]: 無資料")
-    app.logger.info(f"計算完成 - 物件價格: {property_price/exchange_rate:.0f} TWD, 投資期間: {investment_period} 年")
-    
-    return jsonify(results)
+        if not isinstance(spec['field'], str):
+            validation_errors.append('goalSeek.field 必須是字串')
+        if spec.get('kpi') is not None and not isinstance(spec['kpi'], str):
+            validation_errors.append('goalSeek.kpi 必須是字串')
+        if finite_float(spec['target']) is None:
+            validation_errors.append('goalSeek.target 必須是有效數值')
+        for name in ('low', 'high'):
+            if spec.get(name) not in (None, '') and finite_float(spec[name]) is None:
+                validation_errors.append(f'goalSeek.{name} 必須是有效數值')
+    if validation_errors:
+        return jsonify({'error': '請求資料不完整', 'details': validation_errors}), 400
 
-def compute_irr(cash_flows, initial_investment_period=10, tolerance=1e-6, max_iterations=100):
-    """計算 IRR (內部報酬率)"""
-    def npv(rate):
-        return sum(cf / (1 + rate) ** i for i, cf in enumerate(cash_flows))
-    
-    # 使用二分法求解
-    low, high = -0.99, 10.0
-    for _ in range(max_iterations):
-        mid = (low + high) / 2
-        npv_mid = npv(mid)
-        if abs(npv_mid) < tolerance:
-            return mid
-        elif npv_mid > 0:
-            low = mid
-        else:
-            high = mid
-    return None
+    def optional_float(name):
+        return None if spec.get(name) in (None, '') else finite_float(spec[name])
+
+    try:
+        result = solve(parse_inputs(params), spec['field'], spec.get('kpi') or 'irr',
+                       finite_float(spec['target']),
+                       low=optional_float('low'), high=optional_float('high'))
+    except ValueError as e:
+        return jsonify({'error': '目標值反推參數錯誤', 'details': [str(e)]}), 400
+
+    current_app.logger.info("目標值反推完成 - %s → %s = %s, 收斂: %s, 試算次數: %d",
+                            result.key, result.kpi, result.target, result.converged,
+                            result.evaluations)
+    return jsonify(result.to_dict())
 
 if __name__ == '__main__':
     # 在開發環境啟用除錯模式
     debug_mode = ENVIRONMENT == 'development'
     # 本地開發環境預設使用 5001 端口
     default_port = 5001 if debug_mode else 8080
-    app.run(debug=debug_mode, host='0.0.0.0', port=int(os.environ.get('PORT', default_port))) 
\ No newline at end of file
+    port = int(os.environ.get('PORT', default_port))
+    create_app().run(debug=debug_mode, host='0.0.0.0', port=port)
@@ -6,7 +6,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
-import json
+from config.json_provider import dumps as json_dumps, loads as json_loads
 
 db = SQLAlchemy()
 
@@ -53,12 +53,12 @@ class User(UserMixin, db.Model):
     def get_preferences(self):
         """獲取用戶偏好設定"""
         if self.preferences:
-            return json.loads(self.preferences)
+            return json_loads(self.preferences)
         return {}
     
     def set_preferences(self, preferences_dict):
         """設定用戶偏好"""
-        self.preferences = json.dumps(preferences_dict)
+        self.preferences = json_dumps(preferences_dict).decode('utf-8')
     
     def to_dict(self):
         """轉換為字典格式"""
@@ -71,6 +71,57 @@ class User(UserMixin, db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class UserIdentity(UserMixin):
+    """
+    不需資料庫連線的輕量用戶物件（load_user 由識別快取返回）
+
+    欄位與 User.to_dict() 相同；需要修改用戶資料時以 db.session.get(User, id) 重新查詢。
+    """
+    
+    def __init__(self, id, email, name, avatar_url=None, preferences=None, created_at=None):
+        self.id = id
+        self.email = email
+        self.name = name
+        self.avatar_url = avatar_url
+        self.preferences = preferences or {}
+        self.created_at = created_at
+    
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.email, user.name, user.avatar_url, user.get_preferences(),
+                   user.created_at.isoformat() if user.created_at else None)
+    
+    @classmethod
+    def from_cache(cls, data):
+        return cls(**json_loads(data))
+    
+    def to_cache(self):
+        """序列化為快取用的 bytes"""
+        return json_dumps({
+            'id': self.id,
+            'email': self.email,
+            'name': self.name,
+            'avatar_url': self.avatar_url,
+            'preferences': self.preferences,
+            'created_at': self.created_at
+        })
+    
+    def get_id(self):
+        return str(self.id)
+    
+    def get_preferences(self):
+        return self.preferences
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'email': self.email,
+            'name': self.name,
+            'avatar_url': self.avatar_url,
+            'preferences': self.preferences,
+            'created_at': self.created_at
+        }
+
 class Property(db.Model):
     """不動產案件資料模型"""
     __tablename__ = 'properties'
@@ -97,22 +148,22 @@ class Property(db.Model):
     def get_parameters(self):
         """獲取分析參數"""
         if self.parameters:
-            return json.loads(self.parameters)
+            return json_loads(self.parameters)
         return {}
     
     def set_parameters(self, parameters_dict):
         """設定分析參數"""
-        self.parameters = json.dumps(parameters_dict)
+        self.parameters = json_dumps(parameters_dict).decode('utf-8')
     
     def get_tags(self):
         """獲取標籤列表"""
         if self.tags:
-            return json.loads(self.tags)
+            return json_loads(self.tags)
         return []
     
     def set_tags(self, tags_list):
         """設定標籤"""
-        self.tags = json.dumps(tags_list)
+        self.tags = json_dumps(tags_list).decode('utf-8')
     
     def to_dict(self):
         """轉換為字典格式"""
@@ -148,22 +199,22 @@ class AnalysisResult(db.Model):
     def get_parameters(self):
         """獲取分析參數"""
         if self.parameters:
-            return json.loads(self.parameters)
+            return json_loads(self.parameters)
         return {}
     
     def set_parameters(self, parameters_dict):
         """設定分析參數"""
-        self.parameters = json.dumps(parameters_dict)
+        self.parameters = json_dumps(parameters_dict).decode('utf-8')
     
     def get_results(self):
         """獲取分析結果"""
         if self.results:
-            return json.loads(self.results)
+            return json_loads(self.results)
         return {}
     
     def set_results(self, results_dict):
         """設定分析結果"""
-        self.results = json.dumps(results_dict)
+        self.results = json_dumps(results_dict).decode('utf-8')
     
     def to_dict(self):
         """轉換為字典格式"""
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+資料庫引擎設定檔效能測試
+以多個執行緒（模擬 gunicorn --threads）同時讀寫 properties / analysis_results，
+比較各 DB_ENGINE_PROFILE（見 config/database.py）的讀寫吞吐量、寫入延遲與鎖定錯誤
+
+預設為每個設定檔建立一個暫存 SQLite 檔案；設定 BENCH_DATABASE_URL 時改為量測該資料庫
+（例如 PostgreSQL，會建立資料表並於結束時刪除測試寫入的資料列）
+
+使用方式:
+    python scripts/benchmarks/bench_database.py [秒數] [執行緒數] [寫入比例]
+"""
+
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+PROPERTIES = 200
+RESULTS_PER_PROPERTY = 5
+
+
+def seed(db, User, Property, AnalysisResult, user_id, results):
+    db.session.add(User(id=user_id, google_id=user_id, email=f'{user_id}@example.com',
+                        name='Benchmark'))
+    property_ids = []
+    for i in range(PROPERTIES):
+        prop = Property(id=str(uuid.uuid4()), user_id=user_id, name=f'物件 {i}', property_type='1LDK',
+                        price=30000000)
+        prop.set_parameters({'propertyPrice': 3000, 'loanRatio': 80})
+        db.session.add(prop)
+        property_ids.append(prop.id)
+        for _ in range(RESULTS_PER_PROPERTY):
+            result = AnalysisResult(id=str(uuid.uuid4()), user_id=user_id, property_id=prop.id,
+                                    analysis_type='financial')
+            result.set_results(results)
+            db.session.add(result)
+    db.session.commit()
+    return property_ids
+
+
+def cleanup(db, User, Property, AnalysisResult, user_id):
+    AnalysisResult.query.filter_by(user_id=user_id).delete()
+    Property.query.filter_by(user_id=user_id).delete()
+    User.query.filter_by(id=user_id).delete()
+    db.session.commit()
+
+
+def run_profile(profile, database_url, duration, threads, write_ratio):
+    os.environ['DB_ENGINE_PROFILE'] = profile
+    os.environ['DATABASE_URL'] = database_url
+
+    from engine import evaluate
+    from engine.samples import SAMPLE_PAYLOAD
+    from main import create_app, ensure_schema
+    from models import AnalysisResult, Property, User, db
+
+    app = create_app()
+    ensure_schema(app)
+    user_id = f'bench-{uuid.uuid4().hex[:12]}'
+    results = evaluate(SAMPLE_PAYLOAD).to_dict()
+    with app.app_context():
+        property_ids = seed(db, User, Property, AnalysisResult, user_id, results)
+
+    stop = threading.Event()
+    start_barrier = threading.Barrier(threads + 1)
+    stats = []
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        counts = {'reads': 0, 'writes': 0, 'errors': 0, 'write_latency': []}
+        stats.append(counts)
+        with app.app_context():
+            start_barrier.wait()
+            while not stop.is_set():
+                property_id = rng.choice(property_ids)
+                try:
+                    if rng.random() < write_ratio:
+                        start = time.perf_counter()
+                        result = AnalysisResult(id=str(uuid.uuid4()), user_id=user_id,
+                                                property_id=property_id, analysis_type='financial')
+                        result.set_results(results)
+                        db.session.add(result)
+                        db.session.get(Property, property_id).notes = f'updated {time.time()}'
+                        db.session.commit()
+                        counts['write_latency'].append(time.perf_counter() - start)
+                        counts['writes'] += 1
+                    else:
+                        (Property.query.filter_by(user_id=user_id)
+                         .order_by(Property.updated_at.desc()).limit(20).all())
+                        (AnalysisResult.query.filter_by(property_id=property_id)
+                         .order_by(AnalysisResult.created_at.desc()).limit(10).all())
+                        db.session.rollback()
+                        counts['reads'] += 1
+                except Exception:
+                    # 例如 SQLite 的 database is locked
+                    db.session.rollback()
+                    counts['errors'] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    started = time.perf_counter()
+    time.sleep(duration)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        cleanup(db, User, Property, AnalysisResult, user_id)
+        db.session.remove()
+        db.engine.dispose()
+
+    latencies = sorted(latency for counts in stats for latency in counts['write_latency'])
+    return {
+        'reads': sum(counts['reads'] for counts in stats) / elapsed,
+        'writes': sum(counts['writes'] for counts in stats) / elapsed,
+        'errors': sum(counts['errors'] for counts in stats),
+        'write_p50': statistics.median(latencies) if latencies else float('nan'),
+        'write_p95': latencies[int(len(latencies) * 0.95)] if latencies else float('nan'),
+    }
+
+
+def main():
+    from config.database import PROFILES
+
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    write_ratio = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+    server_url = os.environ.get('BENCH_DATABASE_URL')
+    os.environ.setdefault('SECRET_KEY', 'database-benchmark-secret-key-000')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    print("🗄️  資料庫引擎設定檔效能測試")
+    print("=" * 50)
+    print(f"資料庫: {server_url or '暫存 SQLite 檔案'}")
+    print(f"執行緒: {threads}, 每個設定檔 {duration:g} 秒, 寫入比例 {write_ratio:.0%}")
+
+    rows = []
+    for profile in PROFILES:
+        work_dir = tempfile.mkdtemp()
+        try:
+            url = server_url or f"sqlite:///{os.path.join(work_dir, 'bench.db')}"
+            rows.append((profile, run_profile(profile, url, duration, threads, write_ratio)))
+        finally:
+            shutil.rmtree(work_dir)
+
+    print(f"\n{'設定檔':<10}{'讀取/秒':>10}{'寫入/秒':>10}{'寫入 p50':>12}{'寫入 p95':>12}{'錯誤':>8}")
+    for profile, result in rows:
+        print(f"{profile:<12}{result['reads']:>10.0f}{result['writes']:>10.0f}"
+              f"{result['write_p50'] * 1000:>10.2f}ms{result['write_p95'] * 1000:>10.2f}ms"
+              f"{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+財務計算引擎效能測試
+量測引擎匯入時間與單一情境試算的吞吐量（不經過 Flask）
+
+使用方式:
+    python scripts/benchmarks/bench_engine.py [次數] [投資年數]
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def measure_import_time():
+    """在獨立的直譯器中量測 `import engine` 所需時間（毫秒）"""
+    code = (
+        "import time; t = time.perf_counter(); import engine; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    output = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip())
+
+
+def run_benchmark(iterations=2000, investment_period=35):
+    """重複執行 evaluate() 並返回每次平均耗時（微秒）"""
+    from engine import evaluate, parse_inputs
+    from engine.samples import SAMPLE_PAYLOAD
+
+    payload = dict(SAMPLE_PAYLOAD, investmentPeriod=investment_period)
+    inputs = parse_inputs(payload)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        evaluate(inputs)
+    evaluate_us = (time.perf_counter() - start) / iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        evaluate(payload).to_dict()
+    full_us = (time.perf_counter() - start) / iterations * 1e6
+
+    return evaluate_us, full_us
+
+
+def run_montecarlo_benchmark(paths, investment_period=35, repeats=3):
+    """蒙地卡羅模擬（含彙整）的最佳耗時（毫秒）"""
+    from engine import parse_inputs
+    from engine.montecarlo import simulate
+    from engine.samples import SAMPLE_PAYLOAD
+
+    base = parse_inputs(dict(SAMPLE_PAYLOAD, investmentPeriod=investment_period))
+    distributions = {
+        'occupancyRate': {'dist': 'normal', 'std': 10},
+        'dailyRate': {'dist': 'lognormal', 'std': 3000},
+        'japanLoanInterestRate': {'dist': 'triangular', 'low': 1, 'high': 3.5},
+        'annualAppreciation': {'dist': 'normal', 'mean': 0, 'std': 2},
+        'exchangeRate': {'dist': 'normal', 'std': 0.02},
+    }
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        simulate(base, distributions, paths=paths).to_dict()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    investment_period = int(sys.argv[2]) if len(sys.argv) > 2 else 35
+
+    print("⏱️  財務計算引擎效能測試")
+    print("=" * 50)
+    print(f"匯入時間: {measure_import_time():.2f} ms")
+
+    evaluate_us, full_us = run_benchmark(iterations, investment_period)
+    print(f"投資年數: {investment_period} 年, 次數: {iterations}")
+    print(f"evaluate():               {evaluate_us:9.1f} µs/次 ({1e6 / evaluate_us:,.0f} 次/秒)")
+    print(f"解析 + evaluate + to_dict: {full_us:9.1f} µs/次 ({1e6 / full_us:,.0f} 次/秒)")
+
+    from engine.montecarlo import MAX_PATHS
+    from engine.vectorized import MAX_CELLS
+
+    # 最大路徑數受「路徑數 × 投資年數」上限限制
+    max_paths = min(MAX_PATHS, MAX_CELLS // max(investment_period, 1))
+    for paths in (10000, max_paths):
+        elapsed_ms = run_montecarlo_benchmark(paths, investment_period)
+        print(f"蒙地卡羅 {paths:>6} 路徑:      {elapsed_ms:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
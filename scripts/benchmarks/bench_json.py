@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+API 回應 JSON 序列化效能測試
+比較 Flask 預設（標準函式庫 json）與 config.json_provider 序列化 /calculate 回應的耗時
+
+使用方式:
+    python scripts/benchmarks/bench_json.py [次數]
+"""
+
+import json
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def flask_default_dumps(obj):
+    """Flask DefaultJSONProvider 在非 debug 模式下的設定"""
+    return json.dumps(obj, sort_keys=True, ensure_ascii=True, separators=(',', ':')).encode('utf-8')
+
+
+def best_of(function, argument, iterations, repeats=5):
+    """多輪中最快一輪的每次平均耗時（微秒）"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            function(argument)
+        best = min(best, (time.perf_counter() - start) / iterations)
+    return best * 1e6
+
+
+def main():
+    from config import json_provider
+    from engine import evaluate
+    from engine.exit_year import exit_year_analysis
+    from engine.samples import SAMPLE_PAYLOAD
+
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    def fast_dumps(obj):
+        return json_provider.dumps(obj, sort_keys=True)
+
+    backend = 'orjson' if json_provider.orjson is not None else '標準函式庫（未安裝 orjson）'
+
+    print("⏱️  API 回應 JSON 序列化效能測試")
+    print("=" * 50)
+    print(f"編碼器: {backend}, 次數: {iterations}")
+
+    cases = []
+    for years in (10, 35, 50):
+        payload = dict(SAMPLE_PAYLOAD, investmentPeriod=years)
+        cases.append((f"{years} 年", evaluate(payload).to_dict()))
+    payload = dict(SAMPLE_PAYLOAD, investmentPeriod=50)
+    response = evaluate(payload).to_dict()
+    response['exit_analysis'] = exit_year_analysis(payload).to_dict()
+    cases.append(("50 年 + 出場分析", response))
+
+    for name, response in cases:
+        before_body, after_body = flask_default_dumps(response), fast_dumps(response)
+        before = best_of(flask_default_dumps, response, iterations)
+        after = best_of(fast_dumps, response, iterations)
+        parse_before = best_of(json.loads, before_body, iterations)
+        parse_after = best_of(json_provider.loads, after_body, iterations)
+        print(f"\n📦 {name}（{len(before_body):,} → {len(after_body):,} bytes）")
+        print(f"  序列化: {before:8.1f} µs → {after:7.1f} µs  ({before / after:.1f}x)")
+        print(f"  解析:   {parse_before:8.1f} µs → {parse_after:7.1f} µs  "
+              f"({parse_before / parse_after:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
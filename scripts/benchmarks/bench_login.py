@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+登入流程效能測試
+以本機 OIDC 替身（tests/oidc_server.py）取代 Google，量測 /auth/login → 授權 → /auth/callback 的耗時，
+第一次登入包含 discovery 文件與 JWKS 的下載，之後的登入使用快取
+
+使用方式:
+    python scripts/benchmarks/bench_login.py [次數]
+"""
+
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def main():
+    from tests.oidc_server import OIDCServer
+
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    server = OIDCServer().start()
+    work_dir = tempfile.mkdtemp()
+    os.environ.update({
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'login-benchmark-secret-key-00000'),
+        'DATABASE_URL': f"sqlite:///{os.path.join(work_dir, 'bench.db')}",
+        'OIDC_ISSUER': server.issuer,
+        'OIDC_CACHE_DIR': os.path.join(work_dir, 'oidc'),
+        'GOOGLE_CLIENT_ID': 'bench-client-id',
+        'GOOGLE_CLIENT_SECRET': 'bench-client-secret',
+        'LOG_LEVEL': 'WARNING',
+    })
+
+    from main import create_app
+
+    app = create_app()
+    client = app.test_client()
+
+    def login():
+        timings = {}
+        start = time.perf_counter()
+        response = client.get('/auth/login')
+        timings['login'] = time.perf_counter() - start
+        callback = server.authorize(response.headers['Location'])
+        start = time.perf_counter()
+        response = client.get(callback)
+        timings['callback'] = time.perf_counter() - start
+        assert 'login=success' in response.headers['Location'], response.headers['Location']
+        client.get('/auth/logout')
+        return timings
+
+    print("🔐 登入流程效能測試（本機 OIDC 替身）")
+    print("=" * 50)
+    print(f"次數: {iterations}")
+
+    try:
+        first = login()
+        samples = [login() for _ in range(iterations)]
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir)
+
+    print("\n❄️  第一次登入（含 discovery / JWKS 下載）")
+    print(f"  /auth/login    {first['login'] * 1000:7.2f} ms")
+    print(f"  /auth/callback {first['callback'] * 1000:7.2f} ms")
+    print("\n🔥 之後的登入（中位數）")
+    for stage in ('login', 'callback'):
+        median = statistics.median(sample[stage] for sample in samples)
+        print(f"  /auth/{stage:<9} {median * 1000:7.2f} ms")
+    print(f"\n📡 OIDC 替身收到的請求: {dict(sorted(server.requests.items()))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷啟動效能測試
+每一輪啟動新的 Python 行程，量測匯入 main、create_app() 與第一個回應（GET /）的耗時，
+並以 -X importtime 列出最耗時的模組。超過預算時以非零狀態結束，可在 CI 中防止退化。
+
+使用方式:
+    python scripts/benchmarks/bench_startup.py [次數] [預算毫秒]
+
+預算預設為 STARTUP_BUDGET_MS 環境變數或 DEFAULT_BUDGET_MS，比較對象為各輪中位數的「至第一個回應」時間。
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# 冷啟動預算（毫秒）：匯入 + create_app + 第一個回應
+DEFAULT_BUDGET_MS = 500
+
+# 子行程：依序量測各階段並輸出 JSON
+CHILD_SCRIPT = r'''
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app()
+created = time.perf_counter()
+response = app.test_client().get('/')
+responded = time.perf_counter()
+assert response.status_code == 200, response.status_code
+heavy = [name for name in ('authlib', 'psutil', 'requests', 'numpy') if name in sys.modules]
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_response_ms': (responded - created) * 1000,
+    'total_ms': (responded - start) * 1000,
+    'heavy_modules': heavy,
+}))
+'''
+
+
+def child_env(database_path):
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'startup-benchmark-secret-key-0000')
+    env['DATABASE_URL'] = f'sqlite:///{database_path}'
+    env['LOG_LEVEL'] = 'WARNING'
+    return env
+
+
+def run_child(extra_args=()):
+    # 每輪使用新的資料庫，包含建立資料表的成本
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run(
+            [sys.executable, *extra_args, '-c', CHILD_SCRIPT],
+            cwd=PROJECT_ROOT, env=child_env(os.path.join(directory, 'bench.db')),
+            capture_output=True, text=True, check=True,
+        )
+    return result
+
+
+def import_profile(limit=10):
+    """-X importtime 中 main 直接匯入的模組，依累計耗時排序（毫秒）"""
+    stderr = run_child(('-X', 'importtime')).stderr
+    totals = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # 欄位為「分隔空白 + 每層兩格縮排 + 模組名稱」，main 直接匯入的模組位於第一層
+        if len(name) - len(name.lstrip()) == 3:
+            totals.append((name.strip(), int(cumulative) / 1000))
+    return sorted(totals, key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    default_budget = os.environ.get('STARTUP_BUDGET_MS', DEFAULT_BUDGET_MS)
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else float(default_budget)
+
+    print("🚀 冷啟動效能測試")
+    print("=" * 50)
+    print(f"次數: {runs}, 預算: {budget:.0f} ms")
+
+    samples = [json.loads(run_child().stdout.strip().splitlines()[-1]) for _ in range(runs)]
+    for key, label in (('import_ms', '匯入 main'), ('create_app_ms', 'create_app()'),
+                       ('first_response_ms', '第一個回應 GET /'), ('total_ms', '合計')):
+        values = [sample[key] for sample in samples]
+        print(f"  中位數 {statistics.median(values):7.1f} ms (最快 {min(values):7.1f} ms)  {label}")
+
+    heavy = samples[-1]['heavy_modules']
+    if heavy:
+        print(f"⚠️  冷啟動時已載入的延後模組: {', '.join(heavy)}")
+
+    print("\n📦 匯入耗時最高的模組（累計）")
+    for name, milliseconds in import_profile():
+        print(f"  {milliseconds:7.1f} ms  {name}")
+
+    total = statistics.median(sample['total_ms'] for sample in samples)
+    if total > budget:
+        print(f"\n❌ 冷啟動 {total:.1f} ms 超過預算 {budget:.0f} ms")
+        sys.exit(1)
+    print(f"\n✅ 冷啟動 {total:.1f} ms，在預算 {budget:.0f} ms 內")
+
+
+if __name__ == "__main__":
+    main()
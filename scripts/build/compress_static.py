@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+預先壓縮靜態資源
+為 static/ 下可壓縮的檔案產生 .gz（與安裝 brotli 時的 .br）副本，
+執行時由 config.static_assets 依 Accept-Encoding 直接提供，不需在請求中壓縮
+
+使用方式:
+    python scripts/build/compress_static.py [靜態資源目錄]
+"""
+
+import gzip
+import os
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml')
+# 與 config.compression.COMPRESSION_MIN_SIZE 相同：過小的檔案壓縮不划算
+MIN_SIZE = 1024
+
+
+def write_if_smaller(source, target, data, compressed):
+    """只保留確實比原檔小的壓縮結果；原檔未變動時略過"""
+    if len(compressed) >= len(data):
+        if os.path.exists(target):
+            os.remove(target)
+        return False
+    with open(target, 'wb') as f:
+        f.write(compressed)
+    # 與原檔相同的修改時間，Last-Modified 與原檔一致
+    stat = os.stat(source)
+    os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    return True
+
+
+def is_up_to_date(source, target):
+    return os.path.exists(target) and os.stat(target).st_mtime_ns == os.stat(source).st_mtime_ns
+
+
+def compress_static(static_dir):
+    encodings = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        encodings.append(('.br', lambda data: brotli.compress(data, quality=11)))
+    else:
+        print("⚠️  未安裝 brotli，只產生 .gz")
+
+    written = skipped = 0
+    original_total = compressed_total = 0
+    for root, _, files in os.walk(static_dir):
+        for name in sorted(files):
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            source = os.path.join(root, name)
+            if os.path.getsize(source) < MIN_SIZE:
+                continue
+            with open(source, 'rb') as f:
+                data = f.read()
+            for suffix, compress in encodings:
+                target = source + suffix
+                if is_up_to_date(source, target):
+                    skipped += 1
+                    continue
+                compressed = compress(data)
+                if write_if_smaller(source, target, data, compressed):
+                    written += 1
+                    original_total += len(data)
+                    compressed_total += len(compressed)
+                    print(f"  📦 {os.path.relpath(target, static_dir)}: "
+                          f"{len(data):,} → {len(compressed):,} bytes "
+                          f"({len(compressed) / len(data):.0%})")
+
+    print(f"✅ 產生 {written} 個壓縮檔，{skipped} 個已是最新")
+    if written:
+        print(f"   原始 {original_total:,} bytes → 壓縮後 {compressed_total:,} bytes")
+
+
+def main():
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PROJECT_ROOT, 'static')
+    if not os.path.isdir(static_dir):
+        print(f"❌ 找不到靜態資源目錄: {static_dir}")
+        sys.exit(1)
+    print(f"🗜️  預先壓縮靜態資源: {static_dir}")
+    compress_static(static_dir)
+
+
+if __name__ == '__main__':
+    main()
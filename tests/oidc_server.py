@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+測試用的 OpenID Connect 替身伺服器
+提供 discovery、授權、token（RS256 簽章的 ID token）與 JWKS 端點，
+將 OIDC_ISSUER 設為其 issuer 即可離線走完 Google 登入流程
+"""
+
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from authlib.jose import JsonWebKey, jwt
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, document, status=200):
+        body = json.dumps(document).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.server.count(url.path)
+        if url.path == '/.well-known/openid-configuration':
+            self._send_json(self.server.metadata())
+        elif url.path == '/jwks':
+            self._send_json({'keys': [self.server.key.as_dict()]})
+        elif url.path == '/authorize':
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            code = self.server.issue_code(query)
+            self.send_response(302)
+            params = urlencode({'code': code, 'state': query['state']})
+            self.send_header('Location', f"{query['redirect_uri']}?{params}")
+            self.end_headers()
+        else:
+            self._send_json({'error': 'not_found'}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        self.server.count(url.path)
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('utf-8')
+        form = {key: values[0] for key, values in parse_qs(body).items()}
+        if url.path != '/token':
+            self._send_json({'error': 'not_found'}, 404)
+            return
+        grant = self.server.codes.pop(form.get('code'), None)
+        if grant is None:
+            self._send_json({'error': 'invalid_grant'}, 400)
+            return
+        self._send_json(self.server.token_response(grant))
+
+
+class OIDCServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, user=None):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.key = JsonWebKey.generate_key('RSA', 2048, is_private=True,
+                                           options={'kid': 'test-key'})
+        self.user = user or {
+            'sub': 'stub-google-id',
+            'email': 'stub@example.com',
+            'name': 'Stub User',
+            'picture': 'https://example.com/avatar.png',
+        }
+        self.codes = {}
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    @property
+    def issuer(self):
+        # Authlib 只允許 https 或 http://localhost 的 token 端點
+        return f'http://localhost:{self.server_address[1]}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, path):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def metadata(self):
+        return {
+            'issuer': self.issuer,
+            'authorization_endpoint': f'{self.issuer}/authorize',
+            'token_endpoint': f'{self.issuer}/token',
+            'jwks_uri': f'{self.issuer}/jwks',
+            'id_token_signing_alg_values_supported': ['RS256'],
+        }
+
+    def issue_code(self, query):
+        code = secrets.token_urlsafe(16)
+        self.codes[code] = {'client_id': query['client_id'], 'nonce': query.get('nonce')}
+        return code
+
+    def token_response(self, grant):
+        now = int(time.time())
+        claims = {
+            **self.user,
+            'iss': self.issuer,
+            'aud': grant['client_id'],
+            'iat': now,
+            'exp': now + 3600,
+        }
+        if grant['nonce']:
+            claims['nonce'] = grant['nonce']
+        id_token = jwt.encode({'alg': 'RS256', 'kid': 'test-key'}, claims, self.key).decode('ascii')
+        return {
+            'access_token': secrets.token_urlsafe(16),
+            'token_type': 'Bearer',
+            'expires_in': 3600,
+            'scope': 'openid email profile',
+            'id_token': id_token,
+        }
+
+    def authorize(self, authorization_url):
+        """模擬使用者在授權頁同意：返回 redirect_uri 的路徑與查詢字串"""
+        from urllib.request import HTTPRedirectHandler, build_opener
+        from urllib.error import HTTPError
+
+        class NoRedirect(HTTPRedirectHandler):
+            def redirect_request(self, *args, **kwargs):
+                return None
+
+        try:
+            build_opener(NoRedirect).open(authorization_url)
+        except HTTPError as e:
+            location = urlparse(e.headers['Location'])
+            return f'{location.path}?{location.query}'
+        raise AssertionError('授權端點沒有重導向')
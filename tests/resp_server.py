@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+測試用的 Redis 協定（RESP）替身伺服器
+只實作 RedisStateBackend 使用的指令，資料保存在記憶體中
+"""
+
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            count = int(line[1:-2])
+            command = []
+            for _ in range(count):
+                length = int(self.rfile.readline()[1:-2])
+                command.append(self.rfile.read(length + 2)[:-2].decode('utf-8'))
+            self.wfile.write(self.server.execute(command))
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.values = {}    # key → (value, expires_at)
+        self.lock = threading.Lock()
+        self.commands = 0
+        self.delay = 0      # 回應前的延遲秒數，模擬讀取逾時
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def _get(self, key):
+        entry = self.values.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.time():
+            del self.values[key]
+            return None
+        return entry
+
+    def execute(self, command):
+        name, args = command[0].upper(), command[1:]
+        time.sleep(self.delay)
+        with self.lock:
+            self.commands += 1
+            if name == 'PING':
+                return b'+PONG\r\n'
+            if name == 'INCRBY':
+                entry = self._get(args[0]) or (0, None)
+                value = entry[0] + int(args[1])
+                self.values[args[0]] = (value, entry[1])
+                return b':%d\r\n' % value
+            if name == 'EXPIRE':
+                entry = self._get(args[0])
+                if entry is None or ('NX' in args[2:] and entry[1] is not None):
+                    return b':0\r\n'
+                self.values[args[0]] = (entry[0], time.time() + int(args[1]))
+                return b':1\r\n'
+            if name == 'MGET':
+                reply = [b'*%d\r\n' % len(args)]
+                for key in args:
+                    entry = self._get(key)
+                    if entry is None:
+                        reply.append(b'$-1\r\n')
+                    else:
+                        data = str(entry[0]).encode()
+                        reply.append(b'$%d\r\n%s\r\n' % (len(data), data))
+                return b''.join(reply)
+            return b'-ERR unknown command\r\n'
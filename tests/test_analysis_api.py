@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+分析 API 端點的請求驗證測試
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from config.security_config import calculation_limiter, request_limiter
+from engine.samples import SAMPLE_PAYLOAD
+from main import create_app
+from models import db
+
+
+class AnalysisAPITestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.env = patch.dict(os.environ, {
+            'SECRET_KEY': 'analysis-api-test-secret-key-000',
+            'DATABASE_URL': f'sqlite:///{self.db_path}',
+        })
+        self.env.start()
+        # 頻率限制為模組層級狀態，每個測試從空的時間窗開始
+        calculation_limiter.reset()
+        request_limiter.reset()
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.env.stop()
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def post(self, path, **extra):
+        return self.client.post(path, json=dict(SAMPLE_PAYLOAD, **extra))
+
+
+class TestRequestBody(AnalysisAPITestCase):
+
+    def test_non_object_body_is_rejected(self):
+        paths = ('/calculate', '/calculate/batch', '/simulate/montecarlo',
+                 '/analysis/sensitivity-grid', '/analysis/tornado', '/analysis/goal-seek')
+        bodies = ('null', '123', '"x"', '[1]', '[1, "a"]', '[{}]')
+        for path in paths:
+            for body in bodies:
+                with self.subTest(path=path, body=body):
+                    # 36 個請求超過每分鐘上限，每次請求前清空時間窗
+                    calculation_limiter.reset()
+                    request_limiter.reset()
+                    response = self.client.post(path, data=body, content_type='application/json')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.get_json()['error'], '請求資料不完整')
+
+
+class TestCalculateEndpoint(AnalysisAPITestCase):
+
+    def test_selected_exit_analysis_is_computed_without_flag(self):
+        response = self.post('/calculate?fields=exit_analysis')
+        self.assertEqual(response.status_code, 200)
+        exit_analysis = response.get_json()['exit_analysis']
+        years = [exit_year['year'] for exit_year in exit_analysis['years']]
+        self.assertEqual(years, list(range(1, SAMPLE_PAYLOAD['investmentPeriod'] + 1)))
+
+    def test_matching_etag_is_not_modified(self):
+        for encoding in ('identity', 'gzip'):
+            with self.subTest(encoding=encoding):
+                headers = {'Accept-Encoding': encoding}
+                response = self.client.post('/calculate', json=SAMPLE_PAYLOAD, headers=headers)
+                self.assertEqual(response.status_code, 200)
+                etag = response.headers['ETag']
+
+                headers['If-None-Match'] = etag
+                response = self.client.post('/calculate', json=SAMPLE_PAYLOAD, headers=headers)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.data, b'')
+                self.assertEqual(response.headers['ETag'], etag)
+
+                changed = dict(SAMPLE_PAYLOAD, propertyPrice=3100)
+                response = self.client.post('/calculate', json=changed, headers=headers)
+                self.assertEqual(response.status_code, 200)
+
+    def test_investment_period_is_bounded(self):
+        for period in (0, 51, 10 ** 9, 2.5, 'inf'):
+            with self.subTest(period=period):
+                response = self.post('/calculate', investmentPeriod=period)
+                self.assertEqual(response.status_code, 400)
+
+
+class TestBatchEndpoint(AnalysisAPITestCase):
+
+    def test_batch(self):
+        scenarios = [{'investmentPeriod': 5}, {'investmentPeriod': 50}]
+        response = self.client.post('/calculate/batch',
+                                    json={'base': SAMPLE_PAYLOAD, 'scenarios': scenarios})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['count'], 2)
+
+    def test_huge_horizon_is_rejected(self):
+        response = self.client.post('/calculate/batch', json={
+            'base': SAMPLE_PAYLOAD, 'scenarios': [{}, {'investmentPeriod': 10 ** 9}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['index'], 1)
+
+
+class TestMonteCarloEndpoint(AnalysisAPITestCase):
+
+    distributions = {'occupancyRate': {'dist': 'normal', 'std': 10}}
+
+    def test_simulation(self):
+        response = self.post('/simulate/montecarlo', distributions=self.distributions, paths=200)
+        self.assertEqual(response.status_code, 200)
+
+    def test_huge_horizon_is_rejected(self):
+        for extra in ({'investmentPeriod': 10 ** 9}, {'investmentPeriod': 50, 'paths': 100000}):
+            with self.subTest(extra=extra):
+                response = self.post('/simulate/montecarlo', distributions=self.distributions,
+                                     **extra)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('details', response.get_json())
+
+    def test_non_finite_parameters_are_rejected(self):
+        for distributions in ({'dailyRate': {'dist': 'uniform', 'low': '-inf', 'high': 'inf'}},
+                              {'occupancyRate': {'mean': 'nan', 'std': 10}}):
+            with self.subTest(distributions=distributions):
+                response = self.post('/simulate/montecarlo', distributions=distributions,
+                                     paths=200)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('details', response.get_json())
+
+
+class TestSensitivityGridEndpoint(AnalysisAPITestCase):
+
+    def test_grid(self):
+        response = self.post('/analysis/sensitivity-grid',
+                             xAxis={'field': 'investmentPeriod', 'values': [5, 50]},
+                             yAxis={'field': 'occupancyRate', 'values': [60, 80]})
+        self.assertEqual(response.status_code, 200)
+
+    def test_huge_horizon_is_rejected(self):
+        y = {'field': 'occupancyRate', 'values': [60, 80]}
+        for extra in ({'investmentPeriod': 10 ** 9,
+                       'xAxis': {'field': 'propertyPrice', 'values': [3000]}},
+                      {'xAxis': {'field': 'investmentPeriod', 'values': [10, 10 ** 9]}}):
+            with self.subTest(extra=extra):
+                response = self.post('/analysis/sensitivity-grid', yAxis=y, **extra)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('details', response.get_json())
+
+    def test_invalid_axes_are_rejected(self):
+        y = {'field': 'occupancyRate', 'values': [60, 80]}
+        for x in ({'field': 'dailyRate', 'start': 1, 'stop': 2, 'steps': 300000000},
+                  {'field': 'dailyRate', 'start': 1, 'stop': 2, 'steps': 1e13},
+                  {'field': ['dailyRate'], 'values': [10]}):
+            with self.subTest(x=x):
+                response = self.post('/analysis/sensitivity-grid', xAxis=x, yAxis=y)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('details', response.get_json())
+
+
+class TestTornadoEndpoint(AnalysisAPITestCase):
+
+    def test_default_variation(self):
+        response = self.post('/analysis/tornado', fields=['propertyPrice'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_requests(self):
+        for extra in ({'fields': [['x']]}, {'fields': 'propertyPrice'},
+                      {'variation': 0}, {'variation': 'abc'}, {'variation': 'inf'},
+                      {'investmentPeriod': 10 ** 9},
+                      {'ranges': {'investmentPeriod': {'low': 10, 'high': 10 ** 9}}},
+                      {'ranges': {'occupancyRate': {'low': 90, 'high': 40}}}):
+            with self.subTest(extra=extra):
+                response = self.post('/analysis/tornado', **extra)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('details', response.get_json())
+
+
+class TestGoalSeekEndpoint(AnalysisAPITestCase):
+
+    def test_goal_seek(self):
+        response = self.post('/analysis/goal-seek',
+                             goalSeek={'field': 'propertyPrice', 'kpi': 'irr', 'target': '8'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['converged'])
+
+    def test_invalid_requests(self):
+        for spec in ({'field': ['x'], 'target': 8}, {'field': 'propertyPrice', 'target': 'abc'},
+                     {'field': 'propertyPrice', 'target': 8, 'low': 'abc', 'high': 5000},
+                     {'field': 'propertyPrice'}, 'propertyPrice',
+                     {'field': 'propertyPrice', 'kpi': ['irr'], 'target': 8},
+                     {'field': 'japanLoanInterestRate', 'target': 8, 'low': 0, 'high': 100000}):
+            with self.subTest(spec=spec):
+                response = self.post('/analysis/goal-seek', goalSeek=spec)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('details', response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
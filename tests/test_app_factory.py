@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+應用程式工廠與延後初始化測試
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import inspect
+
+from main import create_app
+from models import db
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+class TestCreateApp(unittest.TestCase):
+
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.env = patch.dict(os.environ, {
+            'SECRET_KEY': 'app-factory-test-secret-key-0000',
+            'DATABASE_URL': f'sqlite:///{self.db_path}',
+        })
+        self.env.start()
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        self.env.stop()
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def tables(self):
+        with self.app.app_context():
+            return set(inspect(db.engine).get_table_names())
+
+    def test_schema_is_created_on_first_request(self):
+        self.assertNotIn('users', self.tables())
+        self.assertEqual(self.client.get('/health/live').status_code, 200)
+        self.assertIn('users', self.tables())
+
+    def test_warmup(self):
+        response = self.client.get('/warmup')
+        self.assertEqual(response.status_code, 204)
+        self.assertIn('users', self.tables())
+
+    def test_import_does_not_load_deferred_dependencies(self):
+        script = ("import sys, main; main.create_app(); "
+                  "deferred = ('authlib', 'psutil', 'requests', 'numpy'); "
+                  "print('loaded=' + ','.join(m for m in deferred if m in sys.modules) + ';')")
+        env = dict(os.environ)
+        result = subprocess.run([sys.executable, '-c', script], cwd=PROJECT_ROOT, env=env,
+                                capture_output=True, text=True, check=True)
+        # 日誌由背景執行緒寫到 stdout，可能與輸出交錯，以分號標示結尾
+        self.assertIn('loaded=;', result.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,11 +5,13 @@ Google OAuth 認證功能測試
 
 import unittest
 import os
+import shutil
 import tempfile
-from unittest.mock import patch, MagicMock
-from flask import url_for
+from unittest.mock import patch
+import auth
 from main import create_app
 from models import db, User
+from tests.oidc_server import OIDCServer
 import uuid
 
 class AuthTestCase(unittest.TestCase):
@@ -20,11 +22,22 @@ class AuthTestCase(unittest.TestCase):
         # 創建臨時資料庫
         self.db_fd, self.db_path = tempfile.mkstemp()
         
-        # 設定測試環境變數
-        os.environ['DATABASE_URL'] = f'sqlite:///{self.db_path}'
-        os.environ['SECRET_KEY'] = 'test-secret-key'
-        os.environ['GOOGLE_CLIENT_ID'] = 'test-client-id'
-        os.environ['GOOGLE_CLIENT_SECRET'] = 'test-client-secret'
+        # 以本機 OIDC 替身取代 Google（離線測試）
+        self.oidc_server = OIDCServer().start()
+        self.oidc_cache_dir = tempfile.mkdtemp()
+        
+        # 設定測試環境變數（測試結束後還原）
+        self.env = patch.dict(os.environ, {
+            'DATABASE_URL': f'sqlite:///{self.db_path}',
+            'SECRET_KEY': 'test-secret-key',
+            'GOOGLE_CLIENT_ID': 'test-client-id',
+            'GOOGLE_CLIENT_SECRET': 'test-client-secret',
+            'OIDC_ISSUER': self.oidc_server.issuer,
+            'OIDC_CACHE_DIR': self.oidc_cache_dir,
+        })
+        self.env.start()
+        auth.oauth = auth.google = None
+        auth.identity_cache.clear()
         
         # 創建測試應用
         self.app = create_app()
@@ -42,9 +55,15 @@ class AuthTestCase(unittest.TestCase):
         with self.app.app_context():
             db.session.remove()
             db.drop_all()
+            db.engine.dispose()
         
         os.close(self.db_fd)
         os.unlink(self.db_path)
+        
+        self.oidc_server.stop()
+        shutil.rmtree(self.oidc_cache_dir)
+        auth.oauth = auth.google = None
+        self.env.stop()
     
     def test_login_redirect(self):
         """測試登入重定向"""
@@ -61,49 +80,48 @@ class AuthTestCase(unittest.TestCase):
         self.assertFalse(data['authenticated'])
         self.assertIsNone(data['user'])
     
-    @patch('auth.google')
-    def test_oauth_callback_success(self, mock_google):
-        """測試 OAuth 回調成功"""
-        # 模擬 Google OAuth 回應
-        mock_token = {
-            'userinfo': {
-                'sub': 'test-google-id',
-                'email': 'test@example.com',
-                'name': 'Test User',
-                'picture': 'https://example.com/avatar.jpg'
-            }
+    def test_oauth_callback_success(self):
+        """測試 OAuth 回調成功（經由 OIDC 替身走完授權流程）"""
+        self.oidc_server.user = {
+            'sub': 'test-google-id',
+            'email': 'test@example.com',
+            'name': 'Test User',
+            'picture': 'https://example.com/avatar.jpg'
         }
-        mock_google.authorize_access_token.return_value = mock_token
-        
-        with self.client.session_transaction() as sess:
-            sess['oauth_state'] = 'test-state'
+        response = self.client.get('/auth/login')
+        callback = self.oidc_server.authorize(response.headers['Location'])
         
-        response = self.client.get('/auth/callback?state=test-state')
+        response = self.client.get(callback)
         self.assertEqual(response.status_code, 302)
+        self.assertIn('login=success', response.headers['Location'])
         
         # 檢查用戶是否已創建
         with self.app.app_context():
             user = User.query.filter_by(email='test@example.com').first()
             self.assertIsNotNone(user)
             self.assertEqual(user.name, 'Test User')
+            self.assertEqual(user.google_id, 'test-google-id')
     
     def test_profile_requires_login(self):
-        """測試個人資料頁面需要登入"""
-        response = self.client.get('/auth/profile')
+        """測試個人資料頁面需要登入（API 請求返回 401，瀏覽器導向登入頁）"""
+        response = self.client.get('/auth/profile', json={})
         self.assertEqual(response.status_code, 401)
+        
+        response = self.client.get('/auth/profile')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/auth/login', response.headers['Location'])
     
     def create_test_user(self):
-        """創建測試用戶"""
-        with self.app.app_context():
-            user = User(
-                id=str(uuid.uuid4()),
-                google_id='test-google-id',
-                email='test@example.com',
-                name='Test User'
-            )
-            db.session.add(user)
-            db.session.commit()
-            return user
+        """創建測試用戶（需在 app context 內呼叫）"""
+        user = User(
+            id=str(uuid.uuid4()),
+            google_id='test-google-id',
+            email='test@example.com',
+            name='Test User'
+        )
+        db.session.add(user)
+        db.session.commit()
+        return user
     
     def test_user_model_methods(self):
         """測試用戶模型方法"""
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+回應壓縮與預先壓縮靜態資源單元測試
+"""
+
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, Response
+
+from config.compression import (
+    COMPRESSION_MIN_SIZE, PrecompressedPage, compressed_cache, setup_compression,
+)
+from config.static_assets import setup_static_assets
+
+
+class TestResponseCompression(unittest.TestCase):
+
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        self.script = b'console.log("x");\n' * 200
+        with open(os.path.join(self.static_dir, 'app.js'), 'wb') as f:
+            f.write(self.script)
+        with open(os.path.join(self.static_dir, 'app.js.gz'), 'wb') as f:
+            f.write(gzip.compress(self.script))
+        # 與建置腳本相同：壓縮檔的修改時間與原檔一致才視為有效
+        stat = os.stat(os.path.join(self.static_dir, 'app.js'))
+        os.utime(os.path.join(self.static_dir, 'app.js.gz'), ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        app = Flask(__name__, static_folder=self.static_dir, static_url_path='/static')
+        self.body = b'{"value":1}' * COMPRESSION_MIN_SIZE
+
+        @app.route('/large')
+        def large():
+            response = Response(self.body, mimetype='application/json')
+            response.set_etag('result')
+            return response
+
+        page = PrecompressedPage(b'<html>' + b'<p>shell</p>' * 500 + b'</html>')
+
+        @app.route('/shell')
+        def shell():
+            return page.response(max_age=300)
+
+        @app.route('/small')
+        def small():
+            return Response(b'{}', mimetype='application/json')
+
+        setup_compression(app)
+        setup_static_assets(app)
+        self.client = app.test_client()
+        compressed_cache.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir)
+
+    def test_large_response_is_gzipped(self):
+        response = self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(response.headers['ETag'], '"result-gzip"')
+        self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+        self.assertEqual(gzip.decompress(response.data), self.body)
+
+        # 同一份結果第二次直接使用快取的壓縮內容
+        self.client.get('/large', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(compressed_cache.stats()['hits'], 1)
+
+    def test_uncompressed_when_not_accepted_or_small(self):
+        response = self.client.get('/large', headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, self.body)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+        response = self.client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_precompressed_page_conditional_get(self):
+        response = self.client.get('/shell', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(response.headers['Cache-Control'], 'max-age=300')
+        self.assertTrue(response.headers['ETag'].endswith('-gzip"'))
+        self.assertTrue(gzip.decompress(response.data).startswith(b'<html><p>shell</p>'))
+
+        not_modified = self.client.get('/shell', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b'')
+
+        # 未壓縮版本的 ETag 不同，不能以壓縮版本的 ETag 驗證
+        identity = self.client.get('/shell', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(identity.status_code, 200)
+        self.assertNotIn('Content-Encoding', identity.headers)
+
+    def test_static_serves_precompressed_sibling(self):
+        response = self.client.get('/static/app.js', headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertTrue(response.content_type.startswith('text/javascript'))
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data), self.script)
+
+        not_modified = self.client.get('/static/app.js', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+        response = self.client.get('/static/app.js')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, self.script)
+        response.close()
+
+    def test_static_skips_stale_sibling(self):
+        stat = os.stat(os.path.join(self.static_dir, 'app.js'))
+        os.utime(os.path.join(self.static_dir, 'app.js.gz'),
+                 ns=(stat.st_atime_ns, stat.st_mtime_ns - 1_000_000_000))
+        response = self.client.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, self.script)
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
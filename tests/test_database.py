@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+資料庫引擎設定檔測試
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+import uuid
+from unittest.mock import patch
+
+from sqlalchemy import text
+
+from config.database import engine_options, sqlite_pragmas
+from main import create_app, ensure_schema
+from models import AnalysisResult, User, db
+
+
+class TestEngineOptions(unittest.TestCase):
+
+    def test_server_database_uses_pool_settings(self):
+        options = engine_options('postgresql://user:secret@db/app', 'tuned')
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertEqual(set(options), {'pool_size', 'max_overflow', 'pool_recycle', 'pool_timeout',
+                                        'pool_pre_ping'})
+        self.assertEqual(sqlite_pragmas('postgresql://user:secret@db/app', 'tuned'), [])
+
+    def test_memory_database_skips_wal(self):
+        names = [name for name, _ in sqlite_pragmas('sqlite:///:memory:', 'tuned')]
+        self.assertNotIn('journal_mode', names)
+        self.assertIn('synchronous', names)
+
+    def test_default_profile_and_unknown_profile(self):
+        self.assertEqual(engine_options('sqlite:///app.db', 'default'), {})
+        self.assertEqual(sqlite_pragmas('sqlite:///app.db', 'default'), [])
+        with self.assertRaises(ValueError):
+            engine_options('sqlite:///app.db', 'fastest')
+
+
+class TestSQLiteProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.db_fd, self.db_path = tempfile.mkstemp()
+
+    def tearDown(self):
+        os.close(self.db_fd)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.db_path + suffix):
+                os.unlink(self.db_path + suffix)
+
+    def create_app(self, profile):
+        with patch.dict(os.environ, {'SECRET_KEY': 'database-test-secret-key-0000000',
+                                     'DATABASE_URL': f'sqlite:///{self.db_path}',
+                                     'DB_ENGINE_PROFILE': profile}):
+            app = create_app()
+        self.addCleanup(self.dispose, app)
+        return app
+
+    def dispose(self, app):
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+    def pragma(self, app, name):
+        with app.app_context():
+            return db.session.execute(text(f'PRAGMA {name}')).scalar()
+
+    def test_tuned_profile_enables_wal(self):
+        app = self.create_app('tuned')
+        self.assertEqual(self.pragma(app, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(app, 'synchronous'), 1)  # NORMAL
+
+    def test_default_profile_keeps_rollback_journal(self):
+        app = self.create_app('default')
+        self.assertEqual(self.pragma(app, 'journal_mode'), 'delete')
+
+    def test_concurrent_writes(self):
+        app = self.create_app('tuned')
+        ensure_schema(app)
+        with app.app_context():
+            db.session.add(User(id='u1', google_id='g1', email='u1@example.com', name='User'))
+            db.session.commit()
+        errors = []
+
+        def write():
+            with app.app_context():
+                try:
+                    for _ in range(20):
+                        db.session.add(AnalysisResult(id=str(uuid.uuid4()), user_id='u1',
+                                                      analysis_type='financial'))
+                        db.session.commit()
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=write) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with app.app_context():
+            self.assertEqual(AnalysisResult.query.count(), 160)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,596 @@
+# -*- coding: utf-8 -*-
+"""
+財務計算引擎單元測試
+
+直接呼叫 engine 套件，不需要 Flask 應用程式或資料庫
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from engine import MAN_EN, evaluate, parse_inputs
+from engine.amortization import amortization_schedule
+from engine.irr import brent_irr, irr, irr_matrix, npv
+from engine.roots import brent_root
+from engine.samples import SAMPLE_PAYLOAD
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestEngineInputs(unittest.TestCase):
+    """輸入參數正規化測試"""
+
+    def test_units_are_normalized(self):
+        """萬円轉日圓、百分比轉小數"""
+        inputs = parse_inputs(SAMPLE_PAYLOAD)
+        self.assertEqual(inputs.property_price, 3000 * MAN_EN)
+        self.assertAlmostEqual(inputs.down_payment_ratio, 0.2)
+        self.assertAlmostEqual(inputs.loan_interest_rate, 0.015)
+        self.assertEqual(inputs.loan_term, 35)
+
+    def test_irrelevant_fields_are_dropped(self):
+        """與營運模式無關的欄位不影響正規化結果"""
+        changed = dict(SAMPLE_PAYLOAD, monthlyRent=999, taiwanLoanTerm=5, ownCapitalAmount=1,
+                       creditLoanRate=1)
+        self.assertEqual(parse_inputs(SAMPLE_PAYLOAD), parse_inputs(changed))
+        self.assertEqual(hash(parse_inputs(SAMPLE_PAYLOAD)), hash(parse_inputs(changed)))
+
+    def test_invalid_values_fall_back_to_defaults(self):
+        inputs = parse_inputs(dict(SAMPLE_PAYLOAD, propertyPrice='abc', investmentPeriod=None))
+        self.assertEqual(inputs.property_price, 0)
+        self.assertEqual(inputs.investment_period, 0)
+
+
+class TestEngineEvaluate(unittest.TestCase):
+    """單一情境試算測試"""
+
+    def test_sample_payload_kpis(self):
+        result = evaluate(SAMPLE_PAYLOAD)
+        kpi = result.to_dict()['kpi']
+        self.assertAlmostEqual(kpi['irr'], 4.3888, places=3)
+        self.assertAlmostEqual(kpi['cash_on_cash_return'], 2.12798, places=4)
+        self.assertAlmostEqual(kpi['dscr'], 1.53918, places=4)
+        self.assertAlmostEqual(kpi['loan_to_value'], 80.0)
+        self.assertEqual(len(result.cash_flows), SAMPLE_PAYLOAD['investmentPeriod'] + 1)
+        self.assertAlmostEqual(result.cash_flows[0], -865 * MAN_EN)
+
+    def test_accepts_payload_or_inputs(self):
+        self.assertEqual(evaluate(SAMPLE_PAYLOAD).to_dict(),
+                         evaluate(parse_inputs(SAMPLE_PAYLOAD)).to_dict())
+
+    def test_annual_projections_cover_investment_period(self):
+        payload = dict(SAMPLE_PAYLOAD, investmentPeriod=40)
+        projections = evaluate(payload).to_dict()['annual_projections']
+        self.assertEqual([p['year'] for p in projections], list(range(1, 41)))
+        # 35 年貸款在第 35 年末還清
+        self.assertAlmostEqual(projections[34]['loan_balance'], 0, places=4)
+        self.assertEqual(projections[-1]['loan_balance'], 0)
+
+    def test_all_cash_purchase_has_no_debt_service(self):
+        result = evaluate(dict(SAMPLE_PAYLOAD, downPaymentRatio=100))
+        self.assertEqual(result.annual_debt_service, 0)
+        self.assertEqual(result.dscr, 0)
+        self.assertEqual(result.dcr, float('inf'))
+
+    def test_engine_does_not_import_web_stack(self):
+        """引擎必須能在沒有 Flask / SQLAlchemy / Authlib 的情況下匯入"""
+        code = (
+            "import sys, engine; "
+            "web = ('flask', 'flask_sqlalchemy', 'sqlalchemy', 'authlib'); "
+            "print(sorted(m for m in web if m in sys.modules))"
+        )
+        output = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), '[]')
+
+
+class TestAmortizationSchedule(unittest.TestCase):
+    """閉合公式攤還表測試"""
+
+    def monthly_reference(self, principal, annual_rate, payment, years):
+        """逐月迴圈計算的年末餘額與年度利息，作為對照組"""
+        balance = principal
+        balances, interests = [principal], []
+        for _ in range(years):
+            interest_sum = 0
+            for _ in range(12):
+                if balance <= 1e-6:
+                    break
+                interest = balance * annual_rate / 12
+                interest_sum += interest
+                balance -= payment - interest
+            balances.append(max(0, balance))
+            interests.append(interest_sum)
+        return balances, interests
+
+    def test_matches_month_by_month_loop(self):
+        schedule = amortization_schedule(24_000_000, 0.015, 35, 35)
+        balances, interests = self.monthly_reference(24_000_000, 0.015, schedule.monthly_payment,
+                                                     35)
+        for expected, actual in zip(balances, schedule.balances):
+            self.assertAlmostEqual(expected, actual, delta=1e-3)
+        for expected, actual in zip(interests, schedule.interest_paid):
+            self.assertAlmostEqual(expected, actual, delta=1e-3)
+
+    def test_no_payments_after_payoff(self):
+        schedule = amortization_schedule(10_000_000, 0.02, 20, 30)
+        self.assertEqual(schedule.balances[20], 0)
+        self.assertEqual(schedule.principal_paid[20:], [0] * 10)
+        self.assertEqual(schedule.interest_paid[20:], [0] * 10)
+        self.assertAlmostEqual(sum(schedule.principal_paid), 10_000_000, places=4)
+
+    def test_zero_interest_rate(self):
+        schedule = amortization_schedule(1_200_000, 0, 10, 12)
+        self.assertAlmostEqual(schedule.monthly_payment, 10_000)
+        self.assertAlmostEqual(schedule.balances[5], 600_000)
+        self.assertEqual(schedule.interest_paid, [0] * 12)
+
+    def test_without_loan_term_balance_is_unchanged(self):
+        schedule = amortization_schedule(5_000_000, 0.015, 0, 5)
+        self.assertEqual(schedule.monthly_payment, 0)
+        self.assertEqual(schedule.balances, [5_000_000] * 6)
+
+
+class TestIRR(unittest.TestCase):
+    """IRR 求解器測試"""
+
+    def test_known_values(self):
+        self.assertAlmostEqual(irr([-100, 110]), 0.1, places=10)
+        self.assertAlmostEqual(irr([-100, 0, 121]), 0.1, places=10)
+        self.assertAlmostEqual(irr([-100, 100]), 0.0, places=10)
+
+    def test_root_has_zero_npv(self):
+        cash_flows = [-8_650_000, 310_000, 320_000, -50_000, 330_000, 12_000_000]
+        rate = irr(cash_flows)
+        self.assertLess(abs(npv(cash_flows, rate)), 1e-4)
+
+    def test_no_sign_change_returns_none(self):
+        self.assertIsNone(irr([-100, -10, -5]))
+        self.assertIsNone(irr([100, 10]))
+
+    def test_brent_within_bracket(self):
+        self.assertAlmostEqual(brent_irr([-100, 230, -132], 0.05, 0.15), 0.1, places=9)
+        self.assertIsNone(brent_irr([-100, 110], 0.2, 0.5))
+
+    def test_brent_reports_non_convergence(self):
+        def cubic(x):
+            return x ** 3 - 2 * x - 5
+        self.assertIsNone(brent_root(cubic, 0, 3, max_iterations=3))
+        self.assertAlmostEqual(brent_root(cubic, 0, 3), 2.0945514815, places=9)
+        self.assertIsNone(brent_irr([-100, 230, -132], 0.05, 0.15, max_iterations=1))
+
+    def test_matrix_matches_scalar(self):
+        rows = [
+            [-100, 110, 0, 0],
+            [-100, 0, 0, 1],
+            [-100, 50, -10, 80],
+            [-100, 230, -132, 0],
+            [-100, -10, 0, 0],
+            [-1e7, 1e5, 1e5, 1e4],
+        ]
+        rates = irr_matrix(rows)
+        for row, rate in zip(rows, rates):
+            expected = irr(row)
+            if expected is None:
+                self.assertTrue(rate != rate)
+            else:
+                self.assertAlmostEqual(rate, expected, places=9)
+
+
+class TestVectorizedEngine(unittest.TestCase):
+    """向量化批次試算測試"""
+
+    def setUp(self):
+        from engine.vectorized import evaluate_batch
+        self.evaluate_batch = evaluate_batch
+
+    def test_batch_matches_scalar_engine(self):
+        """批次結果必須與逐筆 evaluate() 一致"""
+        payloads = []
+        for model in ('airbnb', 'personalLease', 'commercialLease'):
+            for purchase_type in ('individual', 'corporate'):
+                for loan_origin in ('japan', 'taiwan', 'mixed'):
+                    for period in (1, 3, 10, 40):
+                        payloads.append(dict(SAMPLE_PAYLOAD, monetizationModel=model,
+                                             purchaseType=purchase_type, loanOrigin=loan_origin,
+                                             investmentPeriod=period))
+        inputs_list = [parse_inputs(payload) for payload in payloads]
+        batch = self.evaluate_batch(inputs_list)
+
+        for index, inputs in enumerate(inputs_list):
+            result = evaluate(inputs)
+            self.assertAlmostEqual(batch.irr[index], result.irr, places=6)
+            self.assertAlmostEqual(batch.cash_on_cash_return[index], result.cash_on_cash_return,
+                                   places=6)
+            self.assertAlmostEqual(batch.payback_period[index], result.payback_period, places=6)
+            self.assertAlmostEqual(batch.dscr[index], result.dscr, places=9)
+            self.assertAlmostEqual(batch.net_sale_proceeds[index], result.net_sale_proceeds,
+                                   places=3)
+            for year, cash_flow in enumerate(result.cash_flows):
+                self.assertAlmostEqual(batch.cash_flows[index, year], cash_flow, places=3)
+
+    def test_rows_are_compact_and_json_ready(self):
+        batch = self.evaluate_batch([parse_inputs(SAMPLE_PAYLOAD)] * 3)
+        rows = batch.to_rows()
+        self.assertEqual(len(rows), 3)
+        expected = evaluate(SAMPLE_PAYLOAD).to_dict()['kpi']
+        self.assertAlmostEqual(rows[0]['irr'], expected['irr'], places=6)
+        self.assertIsInstance(rows[0]['dscr'], float)
+
+    def test_workload_is_bounded(self):
+        """年數或情境數 × 年數超過上限時在配置陣列前拒絕"""
+        from engine.vectorized import MAX_CELLS
+        with self.assertRaises(ValueError):
+            self.evaluate_batch([parse_inputs(dict(SAMPLE_PAYLOAD, investmentPeriod=10 ** 9))])
+        with self.assertRaises(ValueError):
+            self.evaluate_batch([parse_inputs(SAMPLE_PAYLOAD)] * (MAX_CELLS // 10 + 1))
+
+
+class TestMonteCarlo(unittest.TestCase):
+    """蒙地卡羅模擬測試"""
+
+    def setUp(self):
+        from engine import montecarlo
+        self.montecarlo = montecarlo
+        self.base = parse_inputs(SAMPLE_PAYLOAD)
+        self.distributions = {
+            'occupancyRate': {'dist': 'normal', 'std': 10},
+            'dailyRate': {'dist': 'lognormal', 'std': 3000},
+            'japanLoanInterestRate': {'dist': 'triangular', 'low': 1, 'high': 3},
+        }
+
+    def test_same_seed_is_reproducible(self):
+        first = self.montecarlo.simulate(self.base, self.distributions, paths=500, seed=7).to_dict()
+        reordered = dict(reversed(list(self.distributions.items())))
+        second = self.montecarlo.simulate(self.base, reordered, paths=500, seed=7).to_dict()
+        self.assertEqual(first, second)
+        other = self.montecarlo.simulate(self.base, self.distributions, paths=500, seed=8).to_dict()
+        self.assertNotEqual(first['kpi']['irr'], other['kpi']['irr'])
+
+    def test_degenerate_distribution_matches_scalar_engine(self):
+        """標準差為 0 時每條路徑都等於基準試算"""
+        simulation = self.montecarlo.simulate(self.base, {'occupancyRate': {'std': 0}}, paths=100)
+        summary = simulation.to_dict()
+        expected = evaluate(self.base).to_dict()['kpi']
+        self.assertAlmostEqual(summary['kpi']['irr']['p5'], expected['irr'], places=6)
+        self.assertAlmostEqual(summary['kpi']['irr']['p95'], expected['irr'], places=6)
+        self.assertEqual(sum(summary['histograms']['irr']['counts']), 100)
+
+    def test_samples_are_clipped(self):
+        simulation = self.montecarlo.simulate(self.base, {'occupancyRate': {'std': 80}}, paths=1000)
+        occupancy = simulation.samples['occupancyRate']
+        self.assertGreaterEqual(occupancy.min(), 0)
+        self.assertLessEqual(occupancy.max(), 1)
+
+    def test_invalid_specs_are_rejected(self):
+        for distributions in ({'unknownField': {'std': 1}}, {'japanLoanTerm': {'std': 1}},
+                              {'dailyRate': {'dist': 'uniform', 'low': 2, 'high': 1}},
+                              {'dailyRate': {'dist': 'cauchy'}},
+                              {'dailyRate': {'dist': 'uniform', 'low': '-inf', 'high': 'inf'}},
+                              {'occupancyRate': {'mean': 'nan', 'std': 10}},
+                              {'occupancyRate': {'std': 10, 'max': 'nan'}}):
+            with self.assertRaises(ValueError):
+                self.montecarlo.simulate(self.base, distributions, paths=100)
+        with self.assertRaises(ValueError):
+            self.montecarlo.simulate(self.base, self.distributions, paths=10)
+
+    def test_workload_is_bounded(self):
+        """路徑數 × 投資年數超過上限時不抽樣即拒絕"""
+        long_horizon = parse_inputs(dict(SAMPLE_PAYLOAD, investmentPeriod=50))
+        with self.assertRaises(ValueError):
+            self.montecarlo.simulate(long_horizon, self.distributions,
+                                     paths=self.montecarlo.MAX_PATHS)
+        with self.assertRaises(ValueError):
+            self.montecarlo.simulate(self.base._replace(investment_period=10 ** 9),
+                                     self.distributions, paths=100)
+
+
+class TestSensitivityGrid(unittest.TestCase):
+    """二維敏感度分析測試"""
+
+    def setUp(self):
+        from engine.sensitivity import sensitivity_grid
+        self.sensitivity_grid = sensitivity_grid
+        self.base = parse_inputs(SAMPLE_PAYLOAD)
+
+    def test_cells_match_scalar_engine(self):
+        x_spec = {'field': 'propertyPrice', 'values': [2500, 3000, 3500, 4000]}
+        y_spec = {'field': 'occupancyRate', 'start': 50, 'stop': 90, 'steps': 3}
+        grid = self.sensitivity_grid(self.base, x_spec, y_spec).to_dict()
+        self.assertEqual(grid['y']['values'], [50, 70, 90])
+        self.assertEqual(len(grid['kpi']['irr']), 3)
+        self.assertEqual(len(grid['kpi']['irr'][0]), 4)
+        expected = evaluate(dict(SAMPLE_PAYLOAD, propertyPrice=3500, occupancyRate=90))
+        expected = expected.to_dict()['kpi']
+        self.assertAlmostEqual(grid['kpi']['irr'][2][2], expected['irr'], places=6)
+        self.assertAlmostEqual(grid['kpi']['dscr'][2][2], expected['dscr'], places=9)
+
+    def test_invalid_axes_are_rejected(self):
+        axis = {'field': 'propertyPrice', 'values': [1000, 2000]}
+        for x_spec in (axis, {'field': 'monthlyRent', 'values': [10]}, {'field': 'dailyRate'},
+                       {'field': 'dailyRate', 'start': 1, 'stop': 2, 'steps': 500},
+                       {'field': 'dailyRate', 'start': 1, 'stop': 2, 'steps': 300000000},
+                       {'field': 'dailyRate', 'start': 1, 'stop': 2, 'steps': 1e13},
+                       {'field': 'dailyRate', 'start': 1, 'stop': 2, 'steps': float('inf')},
+                       {'field': ['dailyRate'], 'values': [10]}, {'field': None},
+                       {'field': 'investmentPeriod', 'values': [10, 10 ** 9]}):
+            with self.assertRaises(ValueError):
+                self.sensitivity_grid(self.base, x_spec, axis)
+
+
+class TestTornado(unittest.TestCase):
+    """單因子敏感度分析測試"""
+
+    def setUp(self):
+        from engine.sensitivity import tornado
+        self.tornado = tornado
+        self.base = parse_inputs(SAMPLE_PAYLOAD)
+
+    def test_swings_match_scalar_engine_and_are_sorted(self):
+        report = self.tornado(self.base, variation=0.2).to_dict()
+        swings = [factor['irr']['swing'] for factor in report['factors']]
+        self.assertEqual(swings, sorted(swings, reverse=True))
+        self.assertAlmostEqual(sum(factor['irr']['share'] for factor in report['factors']), 1.0)
+        base_irr = evaluate(self.base).to_dict()['kpi']['irr']
+        self.assertAlmostEqual(report['base']['irr'], base_irr, places=6)
+
+        price = next(factor for factor in report['factors'] if factor['field'] == 'propertyPrice')
+        self.assertEqual((price['low'], price['high']), (2400, 3600))
+        expected = evaluate(dict(SAMPLE_PAYLOAD, propertyPrice=2400)).to_dict()['kpi']
+        self.assertAlmostEqual(price['irr']['low'], expected['irr'], places=6)
+        self.assertAlmostEqual(price['dscr']['low'], expected['dscr'], places=9)
+
+    def test_explicit_ranges_and_fields(self):
+        result = self.tornado(self.base, ranges={'occupancyRate': {'low': 40, 'high': 95}},
+                              fields=['dailyRate'])
+        self.assertEqual(result.keys, ['dailyRate', 'occupancyRate'])
+        self.assertEqual(len(result.batch), 5)
+        self.assertEqual(result.high_values[1], 95)
+
+    def test_invalid_requests_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.tornado(self.base, fields=['monthlyRent'])
+        with self.assertRaises(ValueError):
+            self.tornado(self.base, variation=0)
+        with self.assertRaises(ValueError):
+            self.tornado(self.base).to_dict(sort_by='noi')
+        for spec in ({'low': 10, 'high': 10 ** 9}, {'low': 10, 'high': 'inf'},
+                     {'low': 20, 'high': 10}, {'low': 0, 'high': 5}):
+            with self.assertRaises(ValueError):
+                self.tornado(self.base, ranges={'investmentPeriod': spec})
+
+    def test_explicit_integer_range_is_rounded_before_evaluation(self):
+        result = self.tornado(self.base, ranges={'investmentPeriod': {'low': 2.5, 'high': 3.5}},
+                              fields=[])
+        self.assertEqual((result.low_values[0], result.high_values[0]), (2, 4))
+        expected = evaluate(self.base._replace(investment_period=4)).to_dict()['kpi']
+        factor = result.to_dict()['factors'][0]
+        self.assertAlmostEqual(factor['irr']['high'], expected['irr'], places=6)
+
+    def test_negative_base_value_keeps_low_below_high(self):
+        base = self.base._replace(annual_appreciation=-0.02)
+        result = self.tornado(base, variation=0.5, fields=['annualAppreciation'])
+        self.assertEqual((result.low_values[0], result.high_values[0]), (-3, -1))
+        expected = evaluate(base._replace(annual_appreciation=-0.03)).to_dict()['kpi']
+        factor = result.to_dict()['factors'][0]
+        self.assertAlmostEqual(factor['irr']['low'], expected['irr'], places=6)
+
+    def test_default_horizon_range_stays_within_limit(self):
+        result = self.tornado(self.base._replace(investment_period=50), fields=['investmentPeriod'])
+        self.assertEqual((result.low_values[0], result.high_values[0]), (45, 50))
+
+
+class TestGoalSeek(unittest.TestCase):
+    """目標值反推測試"""
+
+    def setUp(self):
+        from engine.goalseek import goal_seek
+        self.goal_seek = goal_seek
+        self.base = parse_inputs(SAMPLE_PAYLOAD)
+
+    def test_max_price_for_target_irr(self):
+        result = self.goal_seek(self.base, 'propertyPrice', 'irr', 8)
+        self.assertTrue(result.converged)
+        self.assertLess(result.evaluations, 40)
+        kpi = evaluate(dict(SAMPLE_PAYLOAD, propertyPrice=result.value)).to_dict()['kpi']
+        self.assertAlmostEqual(kpi['irr'], 8, places=4)
+        # 價格越高 IRR 越低，因此反推值即為最高可接受價格
+        self.assertLess(result.value, SAMPLE_PAYLOAD['propertyPrice'])
+
+    def test_min_occupancy_for_target_dscr(self):
+        result = self.goal_seek(self.base, 'occupancyRate', 'dscr', 1.3, low=0, high=100)
+        self.assertAlmostEqual(result.achieved, 1.3, places=6)
+        self.assertEqual(result.to_dict()['kpi_at_solution']['dscr'], result.achieved)
+
+    def test_unreachable_target(self):
+        result = self.goal_seek(self.base, 'occupancyRate', 'dscr', 50)
+        self.assertFalse(result.converged)
+        self.assertIn('message', result.to_dict())
+
+    def test_undefined_irr_is_not_a_solution(self):
+        # 租金過低時現金流始終未轉正，IRR 無定義
+        payload = dict(SAMPLE_PAYLOAD, monetizationModel='personalLease', annualAppreciation=-15,
+                       downPaymentRatio=10)
+        base = parse_inputs(payload)
+        self.assertIsNone(evaluate(payload).irr)
+
+        result = self.goal_seek(base, 'monthlyRent', 'irr', -50)
+        self.assertFalse(result.converged)
+        self.assertIn('message', result.to_dict())
+
+        result = self.goal_seek(base, 'monthlyRent', 'irr', 50)
+        self.assertTrue(result.converged)
+        self.assertAlmostEqual(result.achieved, 50, places=4)
+
+    def test_invalid_requests_are_rejected(self):
+        for args in (('propertyPrice', 'noi', 1), ('monthlyRent', 'irr', 5),
+                     ('japanLoanTerm', 'irr', 5), ('propertyPrice', ['irr'], 5)):
+            with self.assertRaises(ValueError):
+                self.goal_seek(self.base, *args)
+
+    def test_search_range_is_bounded(self):
+        for key, low, high in (('occupancyRate', 0, 500), ('propertyPrice', -1000, 5000),
+                               ('japanLoanInterestRate', 0, 100000)):
+            with self.subTest(key=key), self.assertRaises(ValueError):
+                self.goal_seek(self.base, key, 'irr', 8, low=low, high=high)
+
+
+class TestExitYearAnalysis(unittest.TestCase):
+    """出場年度分析測試"""
+
+    def test_matches_full_evaluation_for_every_exit_year(self):
+        from engine.exit_year import exit_year_analysis
+
+        for purchase_type in ('individual', 'corporate'):
+            payload = dict(SAMPLE_PAYLOAD, purchaseType=purchase_type, investmentPeriod=12,
+                           annualAppreciation=2)
+            analysis = exit_year_analysis(payload)
+            self.assertEqual([exit_year.year for exit_year in analysis.years], list(range(1, 13)))
+            for exit_year in analysis.years:
+                expected = evaluate(dict(payload, investmentPeriod=exit_year.year))
+                self.assertAlmostEqual(exit_year.irr, expected.irr, places=9)
+                self.assertAlmostEqual(exit_year.net_sale_proceeds, expected.net_sale_proceeds,
+                                       places=4)
+                equity_multiple = sum(expected.cash_flows[1:]) / expected.total_initial_investment
+                self.assertAlmostEqual(exit_year.equity_multiple, equity_multiple, places=9)
+            best = max(analysis.years, key=lambda exit_year: exit_year.irr)
+            self.assertEqual(analysis.to_dict()['optimal_exit_year'], best.year)
+
+    def test_multiple_sign_changes_match_full_evaluation(self):
+        """現金流多次變號（多個 IRR）時，每個出場年度仍與 /calculate 取同一個根"""
+        from engine.exit_year import exit_year_analysis
+
+        payload = dict(SAMPLE_PAYLOAD, loanOrigin='mixed', propertyPrice=2876,
+                       downPaymentRatio=13, ownCapitalAmount=839, japanLoanInterestRate=5.27,
+                       japanLoanTerm=40, creditLoanRate=9.06, dailyRate=37755,
+                       occupancyRate=72, annualAppreciation=-6.53, investmentPeriod=31)
+        for exit_year in exit_year_analysis(payload).years:
+            expected = evaluate(dict(payload, investmentPeriod=exit_year.year))
+            self.assertEqual(exit_year.irr, expected.irr)
+
+    def test_horizon_can_exceed_investment_period(self):
+        from engine.exit_year import exit_year_analysis
+
+        analysis = exit_year_analysis(SAMPLE_PAYLOAD, max_years=40)
+        self.assertEqual(len(analysis.years), 40)
+        with self.assertRaises(ValueError):
+            exit_year_analysis(SAMPLE_PAYLOAD, max_years=0)
+
+
+class TestResultCache(unittest.TestCase):
+    """試算結果快取測試"""
+
+    def setUp(self):
+        from engine.cache import ResultCache, cache_key
+        self.ResultCache = ResultCache
+        self.cache_key = cache_key
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+    def test_key_is_canonical(self):
+        same = dict(SAMPLE_PAYLOAD, monthlyRent=999, propertyPrice='3000')
+        key = self.cache_key(parse_inputs(SAMPLE_PAYLOAD))
+        self.assertEqual(key, self.cache_key(parse_inputs(same)))
+        changed = dict(SAMPLE_PAYLOAD, propertyPrice=3001)
+        self.assertNotEqual(key, self.cache_key(parse_inputs(changed)))
+
+    def test_lru_eviction_and_stats(self):
+        cache = self.ResultCache(max_entries=2, clock=self.clock)
+        cache.set('a', b'1')
+        cache.set('b', b'2')
+        self.assertEqual(cache.get('a'), b'1')
+        cache.set('c', b'3')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), b'3')
+        stats = cache.stats()
+        counts = (stats['entries'], stats['hits'], stats['misses'], stats['evictions'])
+        self.assertEqual(counts, (2, 2, 1, 1))
+
+    def test_ttl_expiry(self):
+        cache = self.ResultCache(ttl=10, clock=self.clock)
+        cache.set('a', b'1')
+        self.now = 9.9
+        self.assertEqual(cache.get('a'), b'1')
+        self.now = 10.0
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['expirations'], 1)
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+    def test_byte_budget(self):
+        from engine.cache import ENTRY_OVERHEAD_BYTES
+
+        cache = self.ResultCache(max_bytes=3 * (100 + ENTRY_OVERHEAD_BYTES), clock=self.clock)
+        for key in 'abcd':
+            cache.set(key, b'x' * 100)
+        self.assertEqual(len(cache), 3)
+        self.assertIsNone(cache.get('a'))
+        cache.set('huge', b'x' * cache.max_bytes)
+        self.assertIsNone(cache.get('huge'))
+        self.assertLessEqual(cache.stats()['bytes'], cache.max_bytes)
+
+
+class TestCompactResponse(unittest.TestCase):
+    """精簡回應格式與區塊選取測試"""
+
+    def setUp(self):
+        self.result = evaluate(SAMPLE_PAYLOAD)
+        self.legacy = self.result.to_dict()
+        self.compact = self.result.to_compact_dict()
+
+    def test_compact_values_match_legacy(self):
+        rate = self.compact['exchange_rate']
+        legacy_cash_flow = self.legacy['cash_flow']
+        cash_flow = self.compact['cash_flow']
+        self.assertEqual(cash_flow['net_cash_flow'], legacy_cash_flow['net_cash_flow_stable_jpy'])
+        self.assertAlmostEqual(cash_flow['ebitda'] * rate, legacy_cash_flow['ebitda_twd'])
+        self.assertEqual(cash_flow['ebt_estimate'], legacy_cash_flow['ebt_jpy'])
+        self.assertEqual(cash_flow['ebt_y1'], legacy_cash_flow['ebt_y1'])
+        self.assertAlmostEqual(self.compact['initial_investment']['total_investment'] * rate,
+                               self.legacy['initial_investment']['total_investment_twd'])
+        self.assertEqual(self.compact['kpi']['irr'], self.legacy['kpi']['irr'])
+
+        projections = self.compact['annual_projections']
+        rows = [dict(zip(projections, values)) for values in zip(*projections.values())]
+        legacy_rows = [{key: row[key] for key in projections}
+                       for row in self.legacy['annual_projections']]
+        self.assertEqual(rows, legacy_rows)
+
+    def test_sections_are_selected(self):
+        sections = {'kpi', 'annual_projections'}
+        self.assertEqual(set(self.result.to_dict(sections)), sections)
+        self.assertEqual(set(self.result.to_compact_dict({'kpi'})),
+                         {'schema', 'exchange_rate', 'kpi'})
+
+    def test_unselected_sections_are_not_built(self):
+        built = AssertionError('已組裝')
+        with patch.object(type(self.result), '_legacy_cash_flow', side_effect=built), \
+                patch.object(type(self.result), 'annual_projections', side_effect=built):
+            self.assertEqual(list(self.result.to_dict({'kpi'})), ['kpi'])
+
+
+class TestStageTiming(unittest.TestCase):
+    """試算階段計時測試"""
+
+    def test_evaluate_records_stages_only_when_enabled(self):
+        from engine.timing import current_timer, stage_timing, suspended_timing
+
+        self.assertIsNone(current_timer())
+        with stage_timing() as timer:
+            result = evaluate(SAMPLE_PAYLOAD)
+            with suspended_timing():
+                evaluate(SAMPLE_PAYLOAD)
+        self.assertIsNone(current_timer())
+        self.assertEqual(list(timer.stages),
+                         ['parse', 'revenue', 'amortization', 'cash_flows', 'irr'])
+        self.assertTrue(all(duration >= 0 for duration in timer.stages.values()))
+        self.assertRegex(timer.server_timing(), r'^parse;dur=[0-9.]+, .*, total;dur=[0-9.]+$')
+        self.assertEqual(result, evaluate(SAMPLE_PAYLOAD))
+
+
+if __name__ == '__main__':
+    unittest.main()
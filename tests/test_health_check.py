@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+健康檢查快照與斷路器單元測試
+"""
+
+import unittest
+from unittest.mock import MagicMock, patch
+
+from config.health_check import CircuitBreaker, HealthChecker
+from config.state_backend import MemoryStateBackend
+from tests.test_rate_limiter import FakeClock
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def test_opens_after_failures_and_probes_after_timeout(self):
+        clock = FakeClock(0.0)
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'closed')
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        clock.now += 30
+        self.assertEqual(breaker.state, 'half_open')
+        # 試探失敗：重新計時
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        clock.now += 30
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+
+
+class TestHealthSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.checker = HealthChecker(backend=MemoryStateBackend(), sample_interval=10)
+        self.checker.start_sampler = MagicMock()
+
+    @patch('requests.get')
+    def test_status_is_served_from_snapshot(self, get):
+        get.return_value = MagicMock(status_code=200)
+        self.checker.refresh()
+        for _ in range(5):
+            status = self.checker.get_health_status()
+        self.assertEqual(get.call_count, 1)
+        self.assertFalse(status['stale'])
+        self.assertEqual(status['dependencies']['google_analytics']['circuit'], 'closed')
+
+        self.checker._snapshot_at -= 31
+        self.assertTrue(self.checker.get_health_status()['stale'])
+
+    @patch('requests.get', side_effect=TimeoutError('timeout'))
+    def test_failing_dependency_stops_being_called(self, get):
+        for _ in range(5):
+            status = self.checker.refresh()
+        self.assertEqual(get.call_count, 3)
+        self.assertEqual(status['dependencies']['google_analytics']['circuit'], 'open')
+        self.assertEqual(status['status'], 'healthy')
+
+    def test_sampler_failures_are_logged_once_per_streak(self):
+        failure = RuntimeError('psutil')
+        self.checker.refresh = MagicMock(side_effect=[failure, failure, None, failure])
+        # 第四次取樣後結束迴圈
+        sleep = MagicMock(side_effect=[None, None, None, KeyboardInterrupt])
+        with patch('config.health_check.time.sleep', sleep), \
+                self.assertLogs('config.health_check') as logs:
+            with self.assertRaises(KeyboardInterrupt):
+                self.checker._sample_loop()
+        levels = [record.levelname for record in logs.records]
+        self.assertEqual(levels, ['ERROR', 'WARNING', 'ERROR'])
+
+    @patch('requests.get')
+    def test_first_status_does_not_wait_for_dependencies(self, get):
+        status = self.checker.get_health_status()
+        get.assert_not_called()
+        self.assertEqual(status['dependencies'], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+JSON 序列化單元測試
+"""
+
+import json
+import unittest
+
+from config import json_provider
+
+
+class TestJsonProvider(unittest.TestCase):
+
+    def test_non_finite_floats_become_null(self):
+        payload = {'dcr': float('inf'), 'values': [1.5, float('nan')],
+                   'nested': {'x': -float('inf')}}
+        expected = {'dcr': None, 'values': [1.5, None], 'nested': {'x': None}}
+        self.assertEqual(json.loads(json_provider.dumps(payload)), expected)
+        self.assertEqual(json.loads(json_provider._stdlib_dumps(payload)), expected)
+
+    def test_matches_stdlib_output(self):
+        from engine import evaluate
+        from engine.samples import SAMPLE_PAYLOAD
+
+        response = evaluate(SAMPLE_PAYLOAD).to_dict()
+        self.assertEqual(json_provider.loads(json_provider.dumps(response, sort_keys=True)),
+                         json.loads(json.dumps(response)))
+        # orjson 不支援的內容（非字串鍵）退回標準函式庫
+        self.assertEqual(json_provider.loads(json_provider.dumps({1: '日本'})), {'1': '日本'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+指標子系統單元測試
+"""
+
+import logging
+import os
+import queue
+import threading
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from config.logging_config import DeferredQueueHandler
+from config.metrics import MetricsRegistry, registry, setup_metrics
+
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_is_merged_across_threads(self):
+        counter = self.registry.counter('requests_total', '請求數', ('endpoint',))
+
+        def worker():
+            for _ in range(1000):
+                counter.inc('/calculate')
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc('/', amount=2)
+        self.assertEqual(counter.values(), {('/calculate',): 8000, ('/',): 2})
+
+    def test_finished_threads_are_folded_into_base(self):
+        """每個請求一個執行緒時，結束的執行緒分片不會累積"""
+        counter = self.registry.counter('requests_total', '請求數')
+        histogram = self.registry.histogram('latency_seconds', '延遲', buckets=(0.1,))
+
+        def worker():
+            counter.inc()
+            histogram.observe(0.5)
+
+        for _ in range(50):
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+        self.assertLessEqual(len(counter._shards), 1)
+        self.assertLessEqual(len(histogram._shards), 1)
+        self.assertEqual(counter.values(), {(): 50})
+        self.assertEqual(histogram.values(), {(): ([0, 50], 25.0, 50)})
+
+    def test_histogram_exposition(self):
+        histogram = self.registry.histogram('latency_seconds', '延遲', ('status',),
+                                            buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, '200')
+        text = self.registry.render()
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{status="200",le="0.1"} 2', text)
+        self.assertIn('latency_seconds_bucket{status="200",le="1"} 3', text)
+        self.assertIn('latency_seconds_bucket{status="200",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_sum{status="200"} 3.65', text)
+        self.assertIn('latency_seconds_count{status="200"} 4', text)
+
+    def test_label_escaping_and_callbacks(self):
+        counter = self.registry.counter('errors_total', '錯誤數', ('message',))
+        counter.inc('say "hi"\n')
+        self.registry.callback('cache_entries', '項目數', 'gauge', lambda: 3)
+        text = self.registry.render()
+        self.assertIn('errors_total{message="say \\"hi\\"\\n"} 1', text)
+        self.assertIn('cache_entries 3', text)
+        with self.assertRaises(ValueError):
+            self.registry.counter('errors_total', '重複')
+
+    def test_dropped_log_records_are_exported(self):
+        def dropped():
+            lines = registry.render().splitlines()
+            line = next(line for line in lines if line.startswith('log_records_dropped_total '))
+            return int(line.split()[1])
+
+        before = dropped()
+        handler = DeferredQueueHandler(queue.Queue(1))
+        for _ in range(3):
+            record = logging.LogRecord('test', logging.INFO, __file__, 1, 'message', None, None)
+            handler.handle(record)
+        self.assertEqual(dropped() - before, 2)
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def client(self, **env):
+        with patch.dict(os.environ, env):
+            if 'METRICS_TOKEN' not in env:
+                os.environ.pop('METRICS_TOKEN', None)
+            app = Flask(__name__)
+            setup_metrics(app)
+        return app.test_client()
+
+    def test_development_without_token_is_public(self):
+        self.assertEqual(self.client(ENVIRONMENT='development').get('/metrics').status_code, 200)
+
+    def test_production_without_token_fails_closed(self):
+        with self.assertLogs(level='WARNING'):
+            client = self.client(ENVIRONMENT='production')
+        self.assertEqual(client.get('/metrics').status_code, 401)
+        response = client.get('/metrics', headers={'Authorization': 'Bearer '})
+        self.assertEqual(response.status_code, 401)
+
+    def test_token_is_required_when_set(self):
+        client = self.client(ENVIRONMENT='production', METRICS_TOKEN='scrape-token')
+        self.assertEqual(client.get('/metrics').status_code, 401)
+        response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-token'})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
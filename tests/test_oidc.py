@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+OIDC 中繼資料快取與登入流程測試（以本機 OIDC 替身取代 Google）
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import auth
+from config.oidc import DocumentCache
+from main import create_app
+from models import User, db
+from tests.oidc_server import OIDCServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDocumentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.fetched = []
+        self.fetch_done = threading.Event()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def fetch(self, url):
+        self.fetched.append(url)
+        self.fetch_done.set()
+        return {'version': len(self.fetched)}
+
+    def cache(self, fetch=None):
+        return DocumentCache(self.cache_dir, ttl=60, stale_ttl=600, fetch=fetch or self.fetch,
+                             clock=self.clock)
+
+    def test_fresh_document_is_served_from_memory_and_disk(self):
+        self.assertEqual(self.cache().get('https://idp/config'), {'version': 1})
+        self.assertEqual(self.cache().get('https://idp/config'), {'version': 1})
+        self.assertEqual(len(self.fetched), 1)
+
+    def test_stale_document_is_served_while_revalidating(self):
+        cache = self.cache()
+        cache.get('https://idp/config')
+        self.fetch_done.clear()
+        self.clock.now += 120
+        self.assertEqual(cache.get('https://idp/config'), {'version': 1})
+        self.assertTrue(self.fetch_done.wait(2))
+        for _ in range(100):
+            if cache.get('https://idp/config') == {'version': 2}:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(cache.get('https://idp/config'), {'version': 2})
+
+    def test_expired_document_is_used_when_refresh_fails(self):
+        self.cache().get('https://idp/config')
+        self.clock.now += 10000
+
+        def failing_fetch(url):
+            raise ConnectionError('offline')
+
+        self.assertEqual(self.cache(failing_fetch).get('https://idp/config'), {'version': 1})
+        with self.assertRaises(ConnectionError):
+            self.cache(failing_fetch).get('https://idp/other')
+
+    def test_future_fetched_at_is_treated_as_expired(self):
+        cache = self.cache()
+        cache.get('https://idp/config')
+        path = cache._path('https://idp/config')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'url': 'https://idp/config', 'fetched_at': self.clock.now + 10 ** 9,
+                       'document': {'planted': True}}, f)
+        self.assertEqual(self.cache().get('https://idp/config'), {'version': 2})
+
+    def test_insecure_cache_dir_is_not_used(self):
+        self.cache().get('https://idp/config')
+        os.chmod(self.cache_dir, 0o777)
+        self.assertEqual(self.cache().get('https://idp/config'), {'version': 2})
+        self.assertEqual(len(self.fetched), 2)
+
+
+class TestLoginRoundTrip(unittest.TestCase):
+
+    def setUp(self):
+        self.server = OIDCServer().start()
+        self.cache_dir = tempfile.mkdtemp()
+        self.db_fd, self.db_path = tempfile.mkstemp()
+        self.env = patch.dict(os.environ, {
+            'SECRET_KEY': 'oidc-test-secret-key-00000000000',
+            'OIDC_ISSUER': self.server.issuer,
+            'OIDC_CACHE_DIR': self.cache_dir,
+            'GOOGLE_CLIENT_ID': 'test-client-id',
+            'GOOGLE_CLIENT_SECRET': 'test-client-secret',
+            'DATABASE_URL': f'sqlite:///{self.db_path}',
+        })
+        self.env.start()
+        auth.oauth = auth.google = None
+        auth.identity_cache.clear()
+        self.app = create_app()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        auth.oauth = auth.google = None
+        self.env.stop()
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.server.stop()
+        shutil.rmtree(self.cache_dir)
+        os.close(self.db_fd)
+        os.unlink(self.db_path)
+
+    def login(self):
+        response = self.client.get('/auth/login')
+        self.assertEqual(response.status_code, 302)
+        callback = self.server.authorize(response.headers['Location'])
+        response = self.client.get(callback)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('login=success', response.headers['Location'])
+
+    def test_login_creates_then_updates_user(self):
+        self.login()
+        status = self.client.get('/auth/status').get_json()
+        self.assertTrue(status['authenticated'])
+        self.assertEqual(status['user']['email'], 'stub@example.com')
+
+        self.server.user = dict(self.server.user, name='Renamed User')
+        self.client.get('/auth/logout')
+        self.login()
+        with self.app.app_context():
+            users = User.query.all()
+        self.assertEqual([user.name for user in users], ['Renamed User'])
+
+        # discovery 文件與 JWKS 各只下載一次
+        self.assertEqual(self.server.requests['/.well-known/openid-configuration'], 1)
+        self.assertEqual(self.server.requests['/jwks'], 1)
+        self.assertEqual(self.server.requests['/token'], 2)
+
+    def test_identity_cache_skips_database_and_is_invalidated(self):
+        self.login()
+        hits = auth.identity_cache.hits
+        with patch('auth.db.session.get', wraps=db.session.get) as get:
+            for _ in range(3):
+                self.assertTrue(self.client.get('/auth/status').get_json()['authenticated'])
+            get.assert_not_called()
+        self.assertEqual(auth.identity_cache.hits - hits, 3)
+
+        response = self.client.post('/auth/profile', json={'preferences': {'theme': 'dark'}})
+        self.assertEqual(response.status_code, 200)
+        profile = self.client.get('/auth/profile').get_json()
+        self.assertEqual(profile['preferences'], {'theme': 'dark'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+請求頻率限制器單元測試
+"""
+
+import threading
+import unittest
+
+from config.rate_limiter import SlidingWindowRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestSlidingWindowRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock(6000.0)  # 視窗起點
+        self.limiter = SlidingWindowRateLimiter(window=60, clock=self.clock)
+
+    def test_limit_within_window(self):
+        decisions = [self.limiter.hit('1.1.1.1', 5) for _ in range(6)]
+        self.assertEqual([d.allowed for d in decisions], [True] * 5 + [False])
+        self.assertEqual([d.remaining for d in decisions[:5]], [4, 3, 2, 1, 0])
+        headers = decisions[-1].headers()
+        self.assertEqual(headers['X-RateLimit-Limit'], '5')
+        self.assertIn('Retry-After', headers)
+        # 其他來源不受影響
+        self.assertTrue(self.limiter.hit('2.2.2.2', 5).allowed)
+
+    def test_previous_window_is_weighted(self):
+        for _ in range(10):
+            self.limiter.hit('ip', 10)
+        # 下一視窗過了一半：估計值為 10 * 0.5 = 5
+        self.clock.now += 90
+        decisions = [self.limiter.hit('ip', 10) for _ in range(6)]
+        self.assertEqual([d.allowed for d in decisions], [True] * 5 + [False])
+
+    def test_retry_after_is_sufficient(self):
+        for _ in range(3):
+            self.limiter.hit('ip', 3)
+        self.clock.now += 20
+        blocked = self.limiter.hit('ip', 3)
+        self.assertFalse(blocked.allowed)
+        self.clock.now += blocked.retry_after - 1
+        self.assertFalse(self.limiter.hit('ip', 3).allowed)
+        self.clock.now += 1
+        self.assertTrue(self.limiter.hit('ip', 3).allowed)
+
+    def test_tracked_keys_are_bounded_and_expire(self):
+        limiter = SlidingWindowRateLimiter(window=60, max_keys=100, clock=self.clock)
+        for index in range(500):
+            limiter.hit(f'10.0.0.{index}', 10)
+        self.assertEqual(len(limiter), 100)
+        self.clock.now += 120
+        limiter.hit('new', 10)
+        self.assertEqual(len(limiter), 1)
+
+    def test_concurrent_hits_are_counted_exactly(self):
+        limiter = SlidingWindowRateLimiter(window=60, clock=self.clock)
+        allowed = []
+
+        def worker():
+            for _ in range(100):
+                allowed.append(limiter.hit('ip', 250).allowed)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(allowed.count(True), 250)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+共用狀態後端單元測試
+"""
+
+import io
+import multiprocessing
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+from config.rate_limiter import SharedRateLimiter, SlidingWindowRateLimiter, create_rate_limiter
+from config.state_backend import (
+    MemoryStateBackend, RedisStateBackend, SQLiteStateBackend, SharedCounter, StateBackendError,
+    StateBackendReplyError, create_state_backend,
+)
+from tests.resp_server import RespServer
+from tests.test_rate_limiter import FakeClock
+
+
+def _sqlite_worker(path, hits, results):
+    limiter = SharedRateLimiter(SQLiteStateBackend(path), 'test')
+    results.put(sum(limiter.hit('ip', 50).allowed for _ in range(hits)))
+
+
+class BackendContract:
+    """三種後端共同的行為"""
+
+    def test_incr_and_read(self):
+        self.assertEqual(self.backend.incr_and_read('a', 2), (2, []))
+        self.assertEqual(self.backend.incr_and_read('a', 3, read_keys=('b', 'a')), (5, [0, 5]))
+        self.assertEqual(self.backend.incr_and_read('a', -1)[0], 4)
+        self.assertEqual(self.backend.get_many(['a', 'missing']), [4, 0])
+
+    def test_shared_limiter_matches_local_limiter(self):
+        clock = FakeClock(6000.0)
+        shared = SharedRateLimiter(self.backend, 'test', window=60, clock=clock)
+        local = SlidingWindowRateLimiter(window=60, clock=clock)
+        for step in range(40):
+            expected = local.hit('ip', 10)
+            self.assertEqual(shared.hit('ip', 10), expected)
+            clock.now += 4
+
+
+class TestMemoryStateBackend(BackendContract, unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.backend = MemoryStateBackend(clock=self.clock)
+
+    def test_ttl_set_on_creation(self):
+        self.backend.incr_and_read('k', 1, ttl=10)
+        self.clock.now += 5
+        self.backend.incr_and_read('k', 1, ttl=10)
+        self.clock.now += 5
+        self.assertEqual(self.backend.get_many(['k']), [0])
+        self.assertEqual(self.backend.incr_and_read('k', 1, ttl=10)[0], 1)
+
+
+class TestSQLiteStateBackend(BackendContract, unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        self.clock = FakeClock()
+        self.backend = SQLiteStateBackend(self.path, clock=self.clock)
+
+    def tearDown(self):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_ttl_set_on_creation(self):
+        self.backend.incr_and_read('k', 1, ttl=10)
+        self.clock.now += 10
+        self.assertEqual(self.backend.get_many(['k']), [0])
+        self.assertEqual(self.backend.incr_and_read('k', 1, ttl=10)[0], 1)
+
+    def test_limit_is_shared_across_processes(self):
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = [context.Process(target=_sqlite_worker, args=(self.path, 30, results))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        allowed = sum(results.get(timeout=30) for _ in processes)
+        for process in processes:
+            process.join()
+        self.assertEqual(allowed, 50)
+
+    def test_factory_parses_url(self):
+        backend = create_state_backend(f'sqlite:///{self.path}')
+        self.assertIsInstance(backend, SQLiteStateBackend)
+        self.assertIsInstance(create_rate_limiter('x', backend), SharedRateLimiter)
+        self.assertIsInstance(create_rate_limiter('x', MemoryStateBackend()),
+                              SlidingWindowRateLimiter)
+
+
+class TestRedisStateBackend(BackendContract, unittest.TestCase):
+
+    def setUp(self):
+        self.server = RespServer().start()
+        self.backend = create_state_backend(self.server.url)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_pipeline_is_single_round_trip(self):
+        self.assertIsInstance(self.backend, RedisStateBackend)
+        self.backend.incr_and_read('k', 1, ttl=60, read_keys=('j',))
+        self.assertEqual(self.server.commands, 3)
+        self.assertIsNotNone(self.server.values['k'][1])
+
+    def test_error_reply_does_not_desynchronize_pipeline(self):
+        with self.assertRaises(StateBackendError):
+            self.backend.execute(('UNKNOWN',), ('INCRBY', 'k', 5), ('MGET', 'k'))
+        self.assertEqual(self.backend.incr_and_read('k', 1, read_keys=('k',)), (6, [6]))
+
+    def test_failed_auth_closes_connection(self):
+        backend = RedisStateBackend(*self.server.server_address, password='secret')
+        with self.assertRaises(StateBackendError):
+            backend.get_many(['k'])
+        self.assertIsNone(backend._local.sock)
+
+    def test_malformed_reply_closes_connection(self):
+        for reply in (b':abc\r\n', b'$x\r\n', b'*1x\r\n', b'+\xff\r\n'):
+            with self.subTest(reply=reply):
+                backend = RedisStateBackend(*self.server.server_address)
+                backend._local.sock = socket.socket()
+                backend._local.reader = io.BytesIO(reply)
+                with self.assertRaises(StateBackendReplyError):
+                    backend._read_replies(1)
+                self.assertIsNone(backend._local.sock)
+
+    def test_reply_timeout_is_not_resent(self):
+        """指令送出後讀取逾時不重送，避免重複計數"""
+        backend = RedisStateBackend(*self.server.server_address, timeout=0.2)
+        self.server.delay = 0.4
+        with self.assertRaises(StateBackendReplyError):
+            backend.incr_and_read('k', 1)
+        self.assertIsNone(backend._local.sock)
+
+        counter = SharedCounter(backend, 'requests', flush_interval=0)
+        counter.add(3)
+        time.sleep(0.5)
+        self.server.delay = 0
+        self.assertEqual(self.server.commands, 2)
+        self.assertEqual(backend.get_many(['k', 'requests']), [1, 3])
+        self.assertEqual(counter.value, 3)
+
+    def test_unavailable_backend_fails_open(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        backend = RedisStateBackend('127.0.0.1', port, timeout=0.2)
+        with self.assertRaises(StateBackendError):
+            backend.get_many(['k'])
+        with self.assertLogs('config.rate_limiter', 'WARNING'):
+            self.assertTrue(SharedRateLimiter(backend, 'test').hit('ip', 1).allowed)
+
+        counter = SharedCounter(backend, 'requests', flush_interval=0)
+        counter.add(3)
+        self.assertEqual(counter.value, 3)
+
+
+class TestSharedCounter(unittest.TestCase):
+
+    def test_increments_are_buffered(self):
+        backend = MemoryStateBackend()
+        clock = FakeClock(0.0)
+        counter = SharedCounter(backend, 'requests', flush_interval=1.0, clock=clock)
+        for _ in range(5):
+            counter.add()
+        self.assertEqual(backend.get_many(['requests']), [0])
+        clock.now += 1
+        counter.add()
+        self.assertEqual(backend.get_many(['requests']), [6])
+        counter.add()
+        self.assertEqual(counter.value, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+靜態資源指紋網址單元測試
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+
+from flask import Flask, render_template_string
+
+from config.static_assets import IMMUTABLE_CACHE_CONTROL, build_manifest, setup_static_assets
+
+
+class TestFingerprintedAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.static_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.static_dir, 'js'))
+        self.script = b'console.log("v1");\n'
+        with open(os.path.join(self.static_dir, 'js', 'app.js'), 'wb') as f:
+            f.write(self.script)
+        with open(os.path.join(self.static_dir, 'js', 'app.js.gz'), 'wb') as f:
+            f.write(b'')
+
+        self.app = Flask(__name__, static_folder=self.static_dir, static_url_path='/static')
+        setup_static_assets(self.app)
+        self.client = self.app.test_client()
+        self.digest = hashlib.sha256(self.script).hexdigest()[:12]
+
+    def tearDown(self):
+        shutil.rmtree(self.static_dir)
+
+    def test_manifest_skips_precompressed_siblings(self):
+        self.assertEqual(build_manifest(self.static_dir), {'js/app.js': f'js/app.{self.digest}.js'})
+
+    def test_asset_url_and_immutable_caching(self):
+        with self.app.test_request_context():
+            url = render_template_string("{{ asset_url('js/app.js') }}")
+        self.assertEqual(url, f'/static/js/app.{self.digest}.js')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, self.script)
+        self.assertEqual(response.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        response.close()
+
+        # 原始網址仍可存取，但每次需重新驗證
+        response = self.client.get('/static/js/app.js')
+        self.assertNotIn('immutable', response.headers['Cache-Control'])
+        response.close()
+
+    def test_precompressed_copy_is_used_only_when_current(self):
+        source = os.path.join(self.static_dir, 'js', 'app.js')
+        compressed = gzip.compress(self.script)
+        with open(source + '.gz', 'wb') as f:
+            f.write(compressed)
+        stat = os.stat(source)
+        os.utime(source + '.gz', ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        response = self.client.get('/static/js/app.js', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers.get('Content-Encoding'), 'gzip')
+        self.assertEqual(response.data, compressed)
+        response.close()
+
+        # 修改原檔後壓縮檔過期，改提供原檔
+        updated = b'console.log("v2");\n'
+        with open(source, 'wb') as f:
+            f.write(updated)
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000_000))
+
+        response = self.client.get('/static/js/app.js', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, updated)
+        response.close()
+
+    def test_debug_mode_uses_plain_urls(self):
+        self.app.debug = True
+        with self.app.test_request_context():
+            url = render_template_string("{{ asset_url('js/app.js') }}")
+        self.assertEqual(url, '/static/js/app.js')
+
+
+if __name__ == '__main__':
+    unittest.main()